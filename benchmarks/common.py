@@ -0,0 +1,148 @@
+import asyncio
+import json
+import math
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+import uvicorn
+
+# Метрики, у которых больше - лучше; у остальных (время, задержки) лучше меньше
+HIGHER_IS_BETTER = ("_per_sec", "_ratio")
+
+
+class Fault:
+    """
+    Модель задержки и сбоев заглушки
+
+    Каждый запрос ждет latency ± jitter секунд, доля slow_rate - еще
+    slow_latency, а доля error_rate завершается ошибкой.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+
+    def delay(self) -> float:
+        """Задержка очередного запроса (секунды)"""
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if self.slow_rate and random.random() < self.slow_rate:
+            delay += self.slow_latency
+        return max(delay, 0.0)
+
+    def fails(self) -> bool:
+        """Очередной запрос должен завершиться ошибкой"""
+        return bool(self.error_rate) and random.random() < self.error_rate
+
+
+@asynccontextmanager
+async def serve(app, host: str, port: int) -> AsyncIterator[uvicorn.Server]:
+    """
+    Запустить ASGI-приложение в текущем цикле событий
+
+    Заглушки делят процессор с ботом, зато без межпроцессного обмена:
+    сравнивать имеет смысл прогоны на одной машине с одними настройками.
+    """
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off"))
+    # Сигналы остаются у бенчмарка
+    server.install_signal_handlers = lambda: None
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+            raise RuntimeError(f"Заглушка на порту {port} не запустилась")
+        await asyncio.sleep(0.01)
+    try:
+        yield server
+    finally:
+        server.should_exit = True
+        await task
+
+
+def percentile(samples: Sequence[float], q: float) -> Optional[float]:
+    """Перцентиль по ближайшему рангу, None для пустой выборки"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def latency_metrics(prefix: str, samples: Sequence[float]) -> Dict[str, float]:
+    """p50, p99 и максимум выборки под именами prefix_p50 и т.д."""
+    if not samples:
+        return {}
+    return {
+        f"{prefix}_p50": percentile(samples, 0.5),
+        f"{prefix}_p99": percentile(samples, 0.99),
+        f"{prefix}_max": max(samples)
+    }
+
+
+def compare(metrics: Dict[str, float], baseline: Dict[str, float], tolerance: float, min_delta: float) -> List[str]:
+    """
+    Сравнить результаты с базовыми
+
+    Args:
+        metrics: Текущие метрики
+        baseline: Метрики базового прогона
+        tolerance: Допустимое ухудшение, доля от базового значения
+        min_delta: Ухудшение меньше этого по модулю не считается (шум таймеров)
+
+    Returns:
+        Описания ухудшившихся метрик
+    """
+    regressions = []
+    for name, base in baseline.items():
+        value = metrics.get(name)
+        if value is None or base is None:
+            continue
+        if name.endswith(HIGHER_IS_BETTER):
+            worse = base - value
+        else:
+            worse = value - base
+        if worse > max(abs(base) * tolerance, min_delta):
+            regressions.append(f"{name}: {base:.6g} -> {value:.6g}")
+    return regressions
+
+
+def print_metrics(title: str, metrics: Dict[str, float]):
+    """Вывести метрики столбцом"""
+    print(f"\n{title}")
+    width = max((len(name) for name in metrics), default=0)
+    for name, value in metrics.items():
+        print(f"  {name:<{width}}  {value:.6g}" if isinstance(value, float) else f"  {name:<{width}}  {value}")
+
+
+def finish(result: Dict, output: Optional[str], baseline: Optional[str], tolerance: float, min_delta: float) -> int:
+    """
+    Сохранить результат и сравнить с базовым прогоном
+
+    Returns:
+        Код выхода: 1, если какая-то метрика ухудшилась сверх допуска
+    """
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if not baseline:
+        return 0
+
+    with open(baseline, "r", encoding="utf-8") as f:
+        reference = json.load(f)
+    regressions = compare(result["metrics"], reference["metrics"], tolerance, min_delta)
+    if regressions:
+        print(f"\nУхудшение больше {tolerance:.0%} относительно {baseline}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nУхудшений относительно {baseline} нет")
+    return 0
@@ -0,0 +1,383 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from telegram import Update
+from benchmarks.common import Fault, finish, latency_metrics, print_metrics, serve
+from benchmarks.fake_gpt import ANSWER_PREFIX, COMPLETION_PATH, END_MARK, FakeYandexGPT
+from benchmarks.fake_telegram import FakeTelegram
+
+HOST = "127.0.0.1"
+# Чаты виртуальных пользователей и получателей пачки напоминаний не пересекаются
+USER_CHAT_BASE = 10_000
+BURST_CHAT_BASE = 1_000_000
+BURST_PREFIX = "🔔 Напоминание: burst "
+
+ACTIONS = ("chat", "set_reminder", "my_reminders")
+
+Done = Callable[[str], bool]
+
+
+def any_reply(text: str) -> bool:
+    return True
+
+
+def final_answer(text: str) -> bool:
+    """Окончательный ответ GPT: полный текст заглушки или сообщение об отказе"""
+    if text.startswith(ANSWER_PREFIX):
+        return text.endswith(END_MARK)
+    # Заглушку потокового ответа пользователь видит сразу, но это еще не ответ
+    return not text.startswith("✍️")
+
+
+def configure_environment(args: argparse.Namespace) -> str:
+    """
+    Направить бота на заглушки и изолировать его данные
+
+    Вызывается до импорта бота: Config читает окружение при импорте.
+    Остальные настройки бота берутся из окружения как обычно.
+
+    Returns:
+        Временный рабочий каталог бота
+    """
+    os.environ.update({
+        "TELEGRAM_BOT_TOKEN": "123456:bench",
+        "TELEGRAM_API_URL": f"http://{HOST}:{args.telegram_port}/bot",
+        "YANDEX_API_KEY": "bench",
+        "YANDEX_FOLDER_ID": "bench",
+        "YANDEX_ENDPOINT": f"http://{HOST}:{args.gpt_port}{COMPLETION_PATH}",
+        "ADMIN_CHAT_ID": "1",
+        "WEBHOOK_URL": ""
+    })
+    # Хранилища бота пишут в data/ относительно текущего каталога
+    workdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    os.chdir(workdir)
+    return workdir
+
+
+def make_update(update_id: int, chat_id: int, text: str) -> Dict:
+    """Обновление Telegram с текстовым сообщением пользователя"""
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"},
+        "text": text
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def seed_notifications(storage, notifications: List[Dict]):
+    """Записать готовые напоминания в хранилище бота (в потоке, не в цикле событий)"""
+    with storage._lock:
+        for n in notifications:
+            storage._insert(n)
+        storage._persist()
+        storage.flush()
+
+
+class _Waiter:
+    """Ожидание ответа бота на одно обновление"""
+
+    __slots__ = ("done", "future", "started", "first")
+
+    def __init__(self, done: Done, future: asyncio.Future):
+        self.done = done
+        self.future = future
+        self.started = time.monotonic()
+        self.first: Optional[float] = None
+
+
+class Traffic:
+    """
+    Синтетические пользователи
+
+    Каждый пользователь - замкнутый цикл: отправляет обновление, ждет
+    ответа бота и только потом отправляет следующее. Задержка - от
+    постановки обновления в очередь приложения до получения заглушкой
+    Telegram ответа (для вопросов GPT - окончательного текста).
+    """
+
+    def __init__(self, application, telegram: FakeTelegram, args: argparse.Namespace):
+        self.application = application
+        self.timeout = args.timeout
+        self.think = args.think
+        self.weights = (args.chat_weight, args.reminder_weight, args.list_weight)
+        self.prompts = [f"Вопрос {i}: как дела?" for i in range(args.prompts)]
+        # Популярность вопросов по Ципфу: часть ответов попадает в кэш
+        self.prompt_weights = [1 / (i + 1) for i in range(args.prompts)]
+        self.latencies: Dict[str, List[float]] = {action: [] for action in ACTIONS}
+        self.first_replies: List[float] = []
+        self.timeouts = 0
+        self.updates = 0
+        # Ответы, полученные до конца нагрузки: по ним считается пропускная способность
+        self.answered_in_time = 0
+        self.deadline = 0.0
+        self._waiting: Dict[int, _Waiter] = {}
+        self._update_id = 0
+        telegram.add_listener(self.on_message)
+
+    def on_message(self, chat_id: int, text: str, received: float):
+        waiter = self._waiting.get(chat_id)
+        if waiter is None or waiter.future.done():
+            return
+        if waiter.first is None:
+            waiter.first = received
+        if waiter.done(text):
+            waiter.future.set_result(received)
+
+    async def send(self, chat_id: int, text: str, done: Done) -> Optional[float]:
+        """
+        Отправить обновление и дождаться ответа
+
+        Returns:
+            Задержка ответа или None по таймауту
+        """
+        self._update_id += 1
+        self.updates += 1
+        waiter = _Waiter(done, asyncio.get_running_loop().create_future())
+        self._waiting[chat_id] = waiter
+        update = Update.de_json(make_update(self._update_id, chat_id, text), self.application.bot)
+        await self.application.update_queue.put(update)
+        try:
+            received = await asyncio.wait_for(waiter.future, self.timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            del self._waiting[chat_id]
+        self.first_replies.append(waiter.first - waiter.started)
+        if received <= self.deadline:
+            self.answered_in_time += 1
+        return received - waiter.started
+
+    def script(self, action: str, rng: random.Random) -> List[Tuple[str, Done]]:
+        """Сообщения пользователя для действия"""
+        if action == "chat":
+            return [(rng.choices(self.prompts, self.prompt_weights)[0], final_answer)]
+        if action == "set_reminder":
+            date = (datetime.now() + timedelta(days=rng.randint(1, 365))).strftime('%d.%m.%Y')
+            return [
+                ("/set_reminder", any_reply),
+                (date, any_reply),
+                (f"Бенчмарк {rng.randint(0, 10**6)}", any_reply),
+                ("нет", any_reply)
+            ]
+        return [("/my_reminders", any_reply)]
+
+    async def user(self, chat_id: int, deadline: float, rng: random.Random):
+        """Один пользователь до окончания прогона"""
+        while time.monotonic() < deadline:
+            action = rng.choices(ACTIONS, self.weights)[0]
+            for text, done in self.script(action, rng):
+                latency = await self.send(chat_id, text, done)
+                if latency is None:
+                    self.timeouts += 1
+                    # Не оставляем пользователя посреди разговора
+                    if action == "set_reminder":
+                        await self.send(chat_id, "/cancel", any_reply)
+                    break
+                self.latencies[action].append(latency)
+            if self.think:
+                await asyncio.sleep(rng.expovariate(1 / self.think))
+
+    async def run(self, users: int, duration: float, seed: int):
+        self.deadline = time.monotonic() + duration
+        await asyncio.gather(*(
+            self.user(USER_CHAT_BASE + i, self.deadline, random.Random(seed + i))
+            for i in range(users)
+        ))
+
+
+class ReminderBurst:
+    """
+    Пачка напоминаний с одним временем срабатывания
+
+    Напоминания пишутся прямо в хранилище бота, каждое в свой чат, чтобы
+    мерить планировщик и доставку, а не лимит сообщений на чат.
+    Опоздание - от даты напоминания до получения заглушкой Telegram.
+    """
+
+    def __init__(self, bot, telegram: FakeTelegram, size: int):
+        self.bot = bot
+        self.size = size
+        self.due_at = 0.0
+        self.lags: Dict[int, float] = {}
+        self._complete = asyncio.Event()
+        telegram.add_listener(self.on_message)
+
+    def on_message(self, chat_id: int, text: str, received: float):
+        if not text.startswith(BURST_PREFIX) or chat_id in self.lags:
+            return
+        self.lags[chat_id] = time.time() - self.due_at
+        if len(self.lags) >= self.size:
+            self._complete.set()
+
+    async def schedule(self, lead: float):
+        """Поставить пачку на срабатывание через lead секунд"""
+        self.due_at = time.time() + lead
+        date = datetime.fromtimestamp(self.due_at).isoformat()
+        created = datetime.now().isoformat()
+        notifications = [
+            {
+                "id": f"burst-{i}",
+                "chatId": BURST_CHAT_BASE + i,
+                "date": date,
+                "text": f"burst {i}",
+                "sent": False,
+                "createdAt": created
+            }
+            for i in range(self.size)
+        ]
+        await asyncio.to_thread(seed_notifications, self.bot.storage.storage, notifications)
+        self.bot.scheduler.notify(self.due_at)
+
+    async def wait(self, timeout: float):
+        """Дождаться доставки всей пачки, но не дольше timeout"""
+        if not self.size:
+            return
+        try:
+            await asyncio.wait_for(self._complete.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    """Прогнать бота на заглушках и собрать результаты"""
+    from bot.telegram_bot import TelegramBot
+
+    telegram = FakeTelegram(
+        Fault(args.telegram_latency, args.telegram_jitter, args.telegram_error_rate),
+        flood_rate=args.telegram_flood_rate
+    )
+    gpt = FakeYandexGPT(
+        Fault(args.gpt_latency, args.gpt_jitter, args.gpt_error_rate, args.gpt_slow_rate, args.gpt_slow_latency),
+        chunks=args.gpt_chunks,
+        chunk_delay=args.gpt_chunk_delay
+    )
+
+    handler_errors = {"count": 0}
+
+    async def count_error(update, context):
+        # Ошибки обработчиков считаем, а не печатаем: при инъекции сбоев их тысячи
+        handler_errors["count"] += 1
+
+    async with serve(telegram.app, HOST, args.telegram_port), serve(gpt.app, HOST, args.gpt_port):
+        bot = TelegramBot()
+        application = bot.build_application(polling=False)
+        application.add_error_handler(count_error)
+        await application.initialize()
+        await bot.post_init(application)
+        await application.start()
+        try:
+            traffic = Traffic(application, telegram, args)
+            burst = ReminderBurst(bot, telegram, args.burst)
+            if args.burst:
+                await burst.schedule(args.burst_lead)
+
+            started = time.monotonic()
+            await traffic.run(args.users, args.duration, args.seed)
+            elapsed = time.monotonic() - started
+            await burst.wait(args.burst_timeout)
+            gpt_stats = bot.gpt.get_stats()
+            # Обработчик дописывает память диалога уже после ответа пользователю
+            while bot.updates.get_stats()["in_flight"]:
+                await asyncio.sleep(0.05)
+        finally:
+            await application.stop()
+            await application.shutdown()
+            await bot.post_shutdown(application)
+
+    completed = sum(len(samples) for samples in traffic.latencies.values())
+    metrics = {"updates_per_sec": traffic.answered_in_time / args.duration}
+    metrics.update(latency_metrics("latency", [x for samples in traffic.latencies.values() for x in samples]))
+    metrics.update(latency_metrics("first_reply", traffic.first_replies))
+    for action, samples in traffic.latencies.items():
+        metrics.update(latency_metrics(f"{action}_latency", samples))
+    metrics.update(latency_metrics("delivery_lag", list(burst.lags.values())))
+    metrics["timeouts"] = traffic.timeouts
+    metrics["undelivered_reminders"] = args.burst - len(burst.lags)
+
+    info = {
+        "elapsed": round(elapsed, 3),
+        "updates_sent": traffic.updates,
+        "updates_answered": completed,
+        "handler_errors": handler_errors["count"],
+        "cache_hit_ratio": gpt_stats["cache"]["hit_ratio"],
+        "telegram": telegram.stats,
+        "gpt": gpt.stats
+    }
+    return {"benchmark": "e2e", "config": vars(args), "metrics": metrics, "info": info}
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Нагрузочный прогон TelegramBot на заглушках Telegram Bot API и YandexGPT"
+    )
+    traffic = parser.add_argument_group("нагрузка")
+    traffic.add_argument("--users", type=int, default=50, help="одновременных пользователей")
+    traffic.add_argument("--duration", type=float, default=30, help="длительность нагрузки, секунд")
+    traffic.add_argument("--think", type=float, default=0.0, help="средняя пауза пользователя между действиями")
+    traffic.add_argument("--chat-weight", type=float, default=0.7, help="доля вопросов GPT")
+    traffic.add_argument("--reminder-weight", type=float, default=0.15, help="доля /set_reminder")
+    traffic.add_argument("--list-weight", type=float, default=0.15, help="доля /my_reminders")
+    traffic.add_argument("--prompts", type=int, default=200, help="различных вопросов")
+    traffic.add_argument("--timeout", type=float, default=30, help="ожидание ответа на обновление")
+    traffic.add_argument("--burst", type=int, default=300, help="напоминаний в пачке (0 - без пачки)")
+    traffic.add_argument("--burst-lead", type=float, default=10, help="через сколько секунд срабатывает пачка")
+    traffic.add_argument("--burst-timeout", type=float, default=120, help="ожидание доставки пачки после нагрузки")
+    traffic.add_argument("--seed", type=int, default=1)
+
+    fakes = parser.add_argument_group("заглушки")
+    fakes.add_argument("--telegram-port", type=int, default=18081)
+    fakes.add_argument("--telegram-latency", type=float, default=0.03)
+    fakes.add_argument("--telegram-jitter", type=float, default=0.01)
+    fakes.add_argument("--telegram-error-rate", type=float, default=0.0, help="доля ответов 500")
+    fakes.add_argument("--telegram-flood-rate", type=float, default=0.0, help="доля ответов 429 на отправку")
+    fakes.add_argument("--gpt-port", type=int, default=18082)
+    fakes.add_argument("--gpt-latency", type=float, default=0.5, help="время до начала ответа")
+    fakes.add_argument("--gpt-jitter", type=float, default=0.2)
+    fakes.add_argument("--gpt-error-rate", type=float, default=0.0, help="доля ответов 503")
+    fakes.add_argument("--gpt-slow-rate", type=float, default=0.0, help="доля медленных ответов")
+    fakes.add_argument("--gpt-slow-latency", type=float, default=5.0)
+    fakes.add_argument("--gpt-chunks", type=int, default=5, help="строк потокового ответа")
+    fakes.add_argument("--gpt-chunk-delay", type=float, default=0.05)
+
+    gate = parser.add_argument_group("сравнение")
+    gate.add_argument("--output", help="сохранить результат в JSON")
+    gate.add_argument("--baseline", help="JSON базового прогона: код выхода 1 при ухудшении")
+    gate.add_argument("--tolerance", type=float, default=0.25, help="допустимое ухудшение, доля")
+    gate.add_argument("--min-delta", type=float, default=0.01, help="меньшее ухудшение считается шумом")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> int:
+    args = parse_args(argv)
+    for name in ("output", "baseline"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=args.log_level)
+    cwd = os.getcwd()
+    workdir = configure_environment(args)
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_metrics("Метрики", result["metrics"])
+    print_metrics("Сведения", {k: v for k, v in result["info"].items() if not isinstance(v, dict)})
+    return finish(result, args.output, args.baseline, args.tolerance, args.min_delta)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from benchmarks.common import Fault
+
+COMPLETION_PATH = "/foundationModels/v1/completion"
+
+# Ответ заглушки начинается с ANSWER_PREFIX и заканчивается END_MARK:
+# по ним бенчмарк отличает окончательный ответ от промежуточного
+ANSWER_PREFIX = "Ответ:"
+END_MARK = "[конец]"
+
+
+def answer_text(prompt: str, words: int) -> str:
+    """Детерминированный ответ на запрос"""
+    body = " ".join(f"слово{i}" for i in range(words))
+    return f"{ANSWER_PREFIX} {prompt[:40]} {body} {END_MARK}"
+
+
+def chunk(text: str, final: bool) -> Dict:
+    """Одна строка ответа YandexGPT"""
+    return {
+        "result": {
+            "alternatives": [{
+                "message": {"role": "assistant", "text": text},
+                "status": "ALTERNATIVE_STATUS_FINAL" if final else "ALTERNATIVE_STATUS_PARTIAL"
+            }],
+            "usage": {"inputTextTokens": "0", "completionTokens": "0", "totalTokens": "0"},
+            "modelVersion": "bench"
+        }
+    }
+
+
+class FakeYandexGPT:
+    """
+    Заглушка эндпоинта completion YandexGPT
+
+    Задержка модели fault - время до начала ответа. В потоковом режиме
+    ответ приходит chunks строками с паузой chunk_delay, каждая строка
+    содержит весь текст на данный момент, как у настоящего API. Доля
+    fault.error_rate отвечает 503 (перегрузка).
+    """
+
+    def __init__(self, fault: Fault = None, words: int = 30, chunks: int = 5, chunk_delay: float = 0.05):
+        self.fault = fault or Fault()
+        self.words = words
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+        self.stats = {"requests": 0, "streams": 0, "errors": 0}
+        self.app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
+        self.app.add_api_route(COMPLETION_PATH, self.completion, methods=["POST"])
+
+    async def completion(self, request: Request) -> Response:
+        self.stats["requests"] += 1
+        payload = await request.json()
+        await asyncio.sleep(self.fault.delay())
+
+        if self.fault.fails():
+            self.stats["errors"] += 1
+            return JSONResponse({"error": {"message": "overloaded"}}, status_code=503)
+
+        text = answer_text(payload["messages"][-1]["text"], self.words)
+        if not payload.get("completionOptions", {}).get("stream"):
+            return JSONResponse(chunk(text, final=True))
+
+        self.stats["streams"] += 1
+        return StreamingResponse(self._stream(text), media_type="application/json")
+
+    async def _stream(self, text: str) -> AsyncIterator[bytes]:
+        """Нарастающий текст ответа построчно"""
+        step = max(len(text) // self.chunks, 1)
+        for end in range(step, len(text), step):
+            yield json.dumps(chunk(text[:end], final=False), ensure_ascii=False).encode("utf-8") + b"\n"
+            await asyncio.sleep(self.chunk_delay)
+        yield json.dumps(chunk(text, final=True), ensure_ascii=False).encode("utf-8") + b"\n"
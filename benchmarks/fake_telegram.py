@@ -0,0 +1,112 @@
+import asyncio
+import json
+import random
+import time
+from typing import Callable, Dict, List
+from urllib.parse import parse_qsl
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from benchmarks.common import Fault
+
+# Методы, которыми бот отправляет пользователю текст
+MESSAGE_METHODS = ("sendMessage", "editMessageText")
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+
+Listener = Callable[[int, str, float], None]
+
+
+class FakeTelegram:
+    """
+    Заглушка Telegram Bot API
+
+    Отвечает на вызовы бота как настоящий Bot API, но никуда ничего
+    не отправляет. Каждое сообщение бота передается подписчикам в момент
+    получения запроса, ответ бот получает через задержку модели fault.
+    Доля fault.error_rate отвечает 500, доля flood_rate - 429 с
+    retry_after, как при превышении лимитов Telegram.
+    """
+
+    def __init__(self, fault: Fault = None, flood_rate: float = 0.0, retry_after: int = 1):
+        self.fault = fault or Fault()
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self._listeners: List[Listener] = []
+        self._message_id = 0
+        self.stats = {"requests": 0, "messages": 0, "errors": 0, "floods": 0}
+        self.app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
+        self.app.add_api_route("/bot{token}/{method}", self.handle, methods=["POST", "GET"])
+
+    def add_listener(self, listener: Listener):
+        """
+        Подписаться на сообщения бота
+
+        Args:
+            listener: Функция (chat_id, текст, time.monotonic() получения)
+        """
+        self._listeners.append(listener)
+
+    @staticmethod
+    async def _params(request: Request) -> Dict:
+        """Параметры вызова: PTB шлет форму, значения-объекты - в JSON"""
+        body = await request.body()
+        if request.headers.get("content-type", "").startswith("application/json"):
+            return json.loads(body or b"{}")
+        return dict(parse_qsl(body.decode("utf-8")))
+
+    async def handle(self, token: str, method: str, request: Request) -> JSONResponse:
+        self.stats["requests"] += 1
+        params = await self._params(request)
+        delay = self.fault.delay()
+
+        if self.fault.fails():
+            self.stats["errors"] += 1
+            await asyncio.sleep(delay)
+            return JSONResponse(
+                {"ok": False, "error_code": 500, "description": "Internal Server Error"},
+                status_code=500
+            )
+        if self.flood_rate and method in MESSAGE_METHODS and random.random() < self.flood_rate:
+            self.stats["floods"] += 1
+            await asyncio.sleep(delay)
+            return JSONResponse(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after}
+                },
+                status_code=429
+            )
+
+        result = self._result(method, params)
+        await asyncio.sleep(delay)
+        return JSONResponse({"ok": True, "result": result})
+
+    def _result(self, method: str, params: Dict):
+        """Выполнить вызов и вернуть поле result"""
+        if method == "getMe":
+            return BOT_USER
+        if method not in MESSAGE_METHODS:
+            return True
+
+        chat_id = int(params["chat_id"])
+        text = params.get("text", "")
+        if method == "sendMessage":
+            self._message_id += 1
+            message_id = self._message_id
+        else:
+            message_id = int(params.get("message_id", 0))
+
+        self.stats["messages"] += 1
+        received = time.monotonic()
+        for listener in self._listeners:
+            listener(chat_id, text, received)
+
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": text
+        }
@@ -0,0 +1,179 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+from benchmarks.common import finish, latency_metrics, print_metrics
+
+# Наступившие напоминания в наборе: их забирают get_pending_notifications и record_deliveries
+DUE_COUNT = 100
+DELIVERY_BATCH = 10
+REMINDERS_PER_CHAT = 10
+
+
+def make_notifications(count: int, now: datetime) -> List[Dict]:
+    """
+    Набор напоминаний: DUE_COUNT уже наступивших, остальные в будущем
+
+    По REMINDERS_PER_CHAT напоминаний на чат, с шагом в 30 секунд.
+    """
+    created = now.isoformat()
+    notifications = []
+    for i in range(count):
+        if i < DUE_COUNT:
+            date = now - timedelta(minutes=DUE_COUNT - i)
+        else:
+            date = now + timedelta(seconds=30 * i)
+        notifications.append({
+            "id": f"bench-{i}",
+            "chatId": chat_id(i, count),
+            "date": date.isoformat(),
+            "text": f"Напоминание {i}",
+            "sent": False,
+            "createdAt": created
+        })
+    return notifications
+
+
+def chat_id(i: int, count: int) -> int:
+    return 100_000 + i % max(count // REMINDERS_PER_CHAT, 1)
+
+
+def open_storage(backend: str):
+    """Открыть хранилище в data/ текущего каталога"""
+    if backend == "json":
+        from services.storage import Storage
+        return Storage()
+    if backend == "journal":
+        from services.journal_storage import JournalStorage
+        return JournalStorage()
+    if backend == "sqlite":
+        from services.sqlite_storage import SQLiteStorage
+        # Путь задаем сами, чтобы SQLITE_PATH из окружения не указал на рабочую базу
+        return SQLiteStorage(os.path.join("data", "notifications.db"))
+    raise ValueError(f"Неизвестный тип хранилища: {backend}")
+
+
+def measure(op: Callable[[], object], budget: float, max_ops: int) -> List[float]:
+    """
+    Замерить операцию несколько раз
+
+    Хотя бы один раз, дальше - пока не кончится время budget или
+    не наберется max_ops замеров.
+    """
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < max_ops and (not samples or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        op()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def timed(func: Callable[[], object]):
+    """Выполнить func и вернуть (результат, секунды)"""
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+def run_case(backend: str, size: int, args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Замеры одного хранилища на наборе из size напоминаний
+
+    Returns:
+        Метрики с префиксом backend.size.
+    """
+    from services.storage import DATA_DIR, DATA_FILE
+
+    rng = random.Random(args.seed)
+    os.makedirs(DATA_DIR)
+    # Все хранилища умеют импортировать notifications.json при первом запуске
+    notifications = make_notifications(size, datetime.now())
+    with open(DATA_FILE, "w", encoding="utf-8") as f:
+        json.dump(notifications, f, ensure_ascii=False)
+    del notifications
+
+    metrics = {}
+    storage, metrics["import_s"] = timed(lambda: open_storage(backend))
+    storage.flush()
+    del storage
+    gc.collect()
+    storage, metrics["load_s"] = timed(lambda: open_storage(backend))
+
+    def add():
+        storage.add_notification(chat_id(rng.randrange(size), size), "01.01.2099", "Новое напоминание")
+
+    def user_list():
+        storage.get_user_notifications(chat_id(rng.randrange(size), size))
+
+    due_ids = [n["id"] for n in storage.get_pending_notifications()]
+
+    def deliver():
+        batch = [due_ids.pop() for _ in range(min(DELIVERY_BATCH, len(due_ids)))]
+        storage.record_deliveries(batch)
+
+    operations = (
+        ("user_list", user_list, args.max_ops),
+        ("pending", storage.get_pending_notifications, args.max_ops),
+        ("next_due", storage.next_due_at, args.max_ops),
+        ("add", add, args.max_ops),
+        ("deliver", deliver, max(len(due_ids) // DELIVERY_BATCH, 1)),
+    )
+    for name, op, max_ops in operations:
+        metrics.update(latency_metrics(name, measure(op, args.budget, max_ops)))
+
+    metrics["file_bytes"] = storage.get_stats()["file_bytes"]
+    return {f"{backend}.{size}.{name}": value for name, value in metrics.items()}
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Микробенчмарки хранилищ напоминаний")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="размеры наборов через запятую")
+    parser.add_argument("--backends", default="json,journal,sqlite", help="хранилища через запятую")
+    parser.add_argument("--budget", type=float, default=2.0, help="время на замеры одной операции, секунд")
+    parser.add_argument("--max-ops", type=int, default=200, help="замеров одной операции")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="сохранить результат в JSON")
+    parser.add_argument("--baseline", help="JSON базового прогона: код выхода 1 при ухудшении")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимое ухудшение, доля")
+    parser.add_argument("--min-delta", type=float, default=0.002, help="меньшее ухудшение считается шумом")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=args.log_level)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+
+    metrics = {}
+    cwd = os.getcwd()
+    for size in (int(s) for s in args.sizes.split(",")):
+        for backend in args.backends.split(","):
+            # Хранилища пишут в data/ относительно текущего каталога
+            workdir = tempfile.mkdtemp(prefix=f"bench-storage-{backend}-")
+            os.chdir(workdir)
+            try:
+                case = run_case(backend, size, args)
+            finally:
+                os.chdir(cwd)
+                shutil.rmtree(workdir, ignore_errors=True)
+                gc.collect()
+            print_metrics(f"{backend}, {size} напоминаний", case)
+            metrics.update(case)
+
+    result = {"benchmark": "storage", "config": vars(args), "metrics": metrics}
+    return finish(result, output, baseline, args.tolerance, args.min_delta)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+logger = logging.getLogger(__name__)
+
+
+class _Batch:
+    """Накопленные сообщения чата и таймер их обработки"""
+
+    __slots__ = ("items", "first_at", "task")
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.first_at = time.monotonic()
+        self.task: asyncio.Task = None
+
+
+class Debouncer:
+    """
+    Склейка сообщений, пришедших подряд
+
+    Каждое новое сообщение чата откладывает обработку еще на window
+    секунд и отменяет отложенную обработку предыдущих. Когда чат
+    замолкает, handler получает все накопленные сообщения одним списком.
+    Дольше max_delay с первого сообщения пачка не ждет.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        handler: Callable[[List[Any]], Awaitable[None]],
+        max_delay: float = None
+    ):
+        self.window = window
+        self.handler = handler
+        self.max_delay = max_delay if max_delay is not None else window * 5
+        self._batches: Dict[Hashable, _Batch] = {}
+        self._stats = {"messages": 0, "batches": 0, "superseded": 0}
+
+    def push(self, key: Hashable, item: Any):
+        """
+        Добавить сообщение в пачку чата
+
+        Args:
+            key: Ключ пачки (ID чата)
+            item: Сообщение
+        """
+        self._stats["messages"] += 1
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch()
+        elif batch.task is not None:
+            batch.task.cancel()
+            self._stats["superseded"] += 1
+
+        batch.items.append(item)
+        delay = min(self.window, batch.first_at + self.max_delay - time.monotonic())
+        batch.task = asyncio.create_task(self._flush(key, batch, max(delay, 0)))
+
+    async def _flush(self, key: Hashable, batch: _Batch, delay: float):
+        """Обработать пачку, если за delay не пришло новых сообщений"""
+        await asyncio.sleep(delay)
+        # Дальше пачка уже не отменяется: новые сообщения начнут следующую
+        if self._batches.get(key) is batch:
+            del self._batches[key]
+        batch.task = None
+        self._stats["batches"] += 1
+
+        try:
+            await self.handler(batch.items)
+        except Exception as e:
+            logger.error(f"Ошибка обработки склеенных сообщений {key}: {e}")
+
+    async def close(self):
+        """Отменить отложенные пачки"""
+        tasks = [batch.task for batch in self._batches.values() if batch.task is not None]
+        self._batches.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        """
+        Получить статистику склейки
+
+        Returns:
+            Словарь со статистикой
+        """
+        return {**self._stats, "pending": len(self._batches)}
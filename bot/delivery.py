@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Tuple
+from telegram.error import BadRequest, NetworkError, RetryAfter
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Окно для расчета пропускной способности (секунды)
+THROUGHPUT_WINDOW = 60
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, не больше capacity"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        """Пополнить токены за прошедшее время"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def idle(self) -> bool:
+        """Ведро полное и не заблокировано"""
+        now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+    def pause(self, seconds: float):
+        """Запретить отправку на seconds секунд (RetryAfter от Telegram)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        """Дождаться и забрать один токен"""
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    """Пауза из RetryAfter в секундах (int или timedelta в разных версиях PTB)"""
+    retry_after = error.retry_after
+    if hasattr(retry_after, "total_seconds"):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class DeliveryPipeline:
+    """
+    Параллельная доставка напоминаний с ограничением частоты
+
+    Отправка идет в concurrency потоков через общий token bucket
+    (глобальный лимит Telegram) и ведро на каждый чат. RetryAfter
+    приостанавливает глобальное ведро, сетевые ошибки уходят в очередь
+    повторов с экспоненциальной паузой. Остальные ошибки считаются
+    окончательными для этого прохода.
+    """
+
+    def __init__(self, send: Callable[[Dict], Awaitable[None]]):
+        self.send = send
+        self.concurrency = Config.DELIVERY_CONCURRENCY
+        self.max_attempts = Config.DELIVERY_MAX_ATTEMPTS
+        self.retry_delay = Config.DELIVERY_RETRY_DELAY
+        self.chat_rate = Config.DELIVERY_CHAT_RATE
+        self._global_bucket = TokenBucket(Config.DELIVERY_GLOBAL_RATE)
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+
+        self._backlog = 0
+        self._retrying = 0
+        self._in_flight = 0
+        self._stats = {"sent": 0, "failed": 0, "retried": 0, "rate_limited": 0}
+        self._sent_times = deque()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        """Ведро частоты для чата"""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, 1)
+        return bucket
+
+    async def deliver(self, notifications: List[Dict]) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Доставить пачку напоминаний
+
+        Args:
+            notifications: Напоминания для отправки
+
+        Returns:
+            ID доставленных напоминаний и ID недоставленных -> текст ошибки
+        """
+        if not notifications:
+            return [], {}
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        for n in notifications:
+            queue.put_nowait((n, 0))
+
+        sent_ids: List[str] = []
+        failed: Dict[str, str] = {}
+        unresolved = len(notifications)
+        finished = asyncio.Event()
+        self._backlog += unresolved
+
+        def resolve():
+            nonlocal unresolved
+            unresolved -= 1
+            self._backlog -= 1
+            if unresolved == 0:
+                finished.set()
+
+        def retry(n: Dict, attempt: int, delay: float):
+            self._stats["retried"] += 1
+            self._retrying += 1
+
+            def requeue():
+                self._retrying -= 1
+                queue.put_nowait((n, attempt))
+
+            loop.call_later(delay, requeue)
+
+        async def worker():
+            while True:
+                n, attempt = await queue.get()
+                await self._chat_bucket(n["chatId"]).acquire()
+                await self._global_bucket.acquire()
+
+                self._in_flight += 1
+                try:
+                    await self.send(n)
+                except RetryAfter as e:
+                    # Telegram просит подождать: тормозим всю отправку
+                    delay = retry_after_seconds(e)
+                    self._stats["rate_limited"] += 1
+                    self._global_bucket.pause(delay)
+                    if attempt + 1 < self.max_attempts:
+                        retry(n, attempt + 1, delay)
+                        continue
+                    failed[n["id"]] = str(e)
+                except BadRequest as e:
+                    failed[n["id"]] = str(e)
+                except NetworkError as e:
+                    if attempt + 1 < self.max_attempts:
+                        retry(n, attempt + 1, self.retry_delay * 2 ** attempt)
+                        continue
+                    failed[n["id"]] = str(e)
+                except Exception as e:
+                    failed[n["id"]] = str(e)
+                else:
+                    sent_ids.append(n["id"])
+                    self._stats["sent"] += 1
+                    self._record_sent(time.monotonic())
+                    logger.info(f"Отправлено напоминание {n['id']}")
+                finally:
+                    self._in_flight -= 1
+
+                if n["id"] in failed:
+                    self._stats["failed"] += 1
+                    logger.error(f"Ошибка отправки напоминания {n['id']}: {failed[n['id']]}")
+                resolve()
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(self.concurrency, len(notifications)))
+        ]
+        try:
+            await finished.wait()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._drop_idle_buckets()
+
+        return sent_ids, failed
+
+    def _record_sent(self, now: float):
+        """Учесть отправку в окне пропускной способности"""
+        self._sent_times.append(now)
+        self._trim_sent(now)
+
+    def _trim_sent(self, now: float):
+        """Забыть отправки старше окна пропускной способности"""
+        while self._sent_times and self._sent_times[0] < now - THROUGHPUT_WINDOW:
+            self._sent_times.popleft()
+
+    def _drop_idle_buckets(self):
+        """Забыть ведра чатов, которые уже полностью восстановились"""
+        for chat_id in [c for c, bucket in self._chat_buckets.items() if bucket.idle]:
+            del self._chat_buckets[chat_id]
+
+    def get_stats(self) -> dict:
+        """
+        Получить статистику доставки
+
+        Returns:
+            Словарь со статистикой
+        """
+        self._trim_sent(time.monotonic())
+
+        return {
+            **self._stats,
+            "backlog": self._backlog,
+            "retrying": self._retrying,
+            "in_flight": self._in_flight,
+            "throughput": len(self._sent_times) / THROUGHPUT_WINDOW
+        }
@@ -0,0 +1,145 @@
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, BaseHandler, ContextTypes, ConversationHandler
+from services.metrics import REGISTRY
+from services.upstream import CircuitBreaker
+
+Callback = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[Any]]
+
+# Опоздание напоминания: миллисекунды в норме, часы после простоя бота
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0, 86400.0)
+
+HANDLER_DURATION = REGISTRY.histogram(
+    "bot_handler_duration_seconds",
+    "Время обработчиков обновлений Telegram",
+    ["handler"]
+)
+HANDLER_ERRORS = REGISTRY.counter(
+    "bot_handler_errors_total",
+    "Исключения в обработчиках обновлений Telegram",
+    ["handler"]
+)
+REMINDER_LAG = REGISTRY.histogram(
+    "reminder_delivery_lag_seconds",
+    "Опоздание отправки напоминания относительно его даты",
+    buckets=LAG_BUCKETS
+)
+
+# Показатели подсистем снимаются из их get_stats() при каждой выгрузке
+REMINDERS_PENDING = REGISTRY.gauge("reminders_pending", "Неотправленные напоминания")
+STORAGE_FILE_BYTES = REGISTRY.gauge("storage_file_bytes", "Размер файлов хранилища напоминаний")
+DELIVERIES = REGISTRY.counter("reminder_deliveries_total", "Попытки отправки напоминаний", ["result"])
+DELIVERY_BACKLOG = REGISTRY.gauge("reminder_delivery_backlog", "Напоминания в очереди на отправку")
+
+CACHE_HIT_RATIO = REGISTRY.gauge("gpt_cache_hit_ratio", "Доля обращений к кэшу ответов GPT, обслуженных из кэша")
+CACHE_LOOKUPS = REGISTRY.counter("gpt_cache_lookups_total", "Обращения к кэшу ответов GPT", ["result"])
+CACHE_REMOVALS = REGISTRY.counter("gpt_cache_removals_total", "Записи, покинувшие кэш в памяти", ["reason"])
+CACHE_BYTES = REGISTRY.gauge("gpt_cache_bytes", "Объем кэша ответов GPT в памяти")
+CACHE_ENTRIES = REGISTRY.gauge("gpt_cache_entries", "Записи кэша ответов GPT в памяти")
+
+GPT_CONCURRENCY_LIMIT = REGISTRY.gauge("gpt_concurrency_limit", "Текущий адаптивный лимит запросов к GPT")
+GPT_IN_FLIGHT = REGISTRY.gauge("gpt_requests_in_flight", "Запросы к GPT в работе")
+GPT_BREAKER_OPEN = REGISTRY.gauge("gpt_breaker_open", "1 - автомат запросов к GPT разомкнут или пробует")
+GPT_BREAKER_REJECTED = REGISTRY.counter("gpt_breaker_rejected_total", "Запросы, отклоненные автоматом")
+GPT_QUEUE_DEPTH = REGISTRY.gauge("gpt_queue_depth", "Вопросы в очереди к GPT")
+GPT_QUEUE_REQUESTS = REGISTRY.counter("gpt_queue_requests_total", "Вопросы к очереди GPT", ["result"])
+
+UPDATES_IN_FLIGHT = REGISTRY.gauge("bot_updates_in_flight", "Обновления в обработке")
+UPDATES_WAITING = REGISTRY.gauge("bot_updates_waiting", "Принятые обновления, ждущие обработчика")
+UPDATES_PROCESSED = REGISTRY.counter("bot_updates_processed_total", "Обработанные обновления")
+
+
+def instrument(callback: Callback) -> Callback:
+    """
+    Обернуть обработчик замером времени и подсчетом ошибок
+
+    Серии метрик привязываются один раз здесь, а не на каждом обновлении.
+    Результат обработчика возвращается как есть: от него зависит
+    переход ConversationHandler.
+    """
+    duration = HANDLER_DURATION.labels(callback.__name__)
+    errors = HANDLER_ERRORS.labels(callback.__name__)
+
+    @functools.wraps(callback)
+    async def timed(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Any:
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except ApplicationHandlerStop:
+            raise
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started)
+
+    return timed
+
+
+def instrument_handlers(handlers: Dict[int, List[BaseHandler]]):
+    """
+    Обернуть замером все обработчики приложения, включая шаги разговоров
+
+    Args:
+        handlers: Application.handlers - группа -> обработчики
+    """
+    for group in handlers.values():
+        for handler in group:
+            _instrument_handler(handler)
+
+
+def _instrument_handler(handler: BaseHandler):
+    if isinstance(handler, ConversationHandler):
+        nested = handler.entry_points + handler.fallbacks
+        for state in handler.states.values():
+            nested = nested + state
+        for child in nested:
+            _instrument_handler(child)
+    else:
+        handler.callback = instrument(handler.callback)
+
+
+async def collect(bot):
+    """
+    Перенести статистику подсистем бота в метрики
+
+    Args:
+        bot: TelegramBot
+    """
+    storage = await bot.storage.get_stats()
+    REMINDERS_PENDING.set(storage["pending"])
+    STORAGE_FILE_BYTES.set(storage["file_bytes"])
+
+    delivery = bot.delivery.get_stats()
+    for result in ("sent", "failed", "retried", "rate_limited"):
+        DELIVERIES.labels(result).set(delivery[result])
+    DELIVERY_BACKLOG.set(delivery["backlog"])
+
+    gpt = bot.gpt.get_stats()
+    cache = gpt["cache"]
+    if cache["hit_ratio"] is not None:
+        CACHE_HIT_RATIO.set(cache["hit_ratio"])
+    for result in ("hits", "backend_hits", "stale_hits", "misses"):
+        CACHE_LOOKUPS.labels(result).set(cache[result])
+    for reason in ("evictions", "expirations", "rejections"):
+        CACHE_REMOVALS.labels(reason).set(cache[reason])
+    CACHE_BYTES.set(cache["bytes"])
+    CACHE_ENTRIES.set(cache["size"])
+
+    upstream = gpt["upstream"]
+    GPT_CONCURRENCY_LIMIT.set(upstream["limit"])
+    GPT_IN_FLIGHT.set(upstream["in_flight"])
+    GPT_BREAKER_OPEN.set(0 if upstream["breaker"]["state"] == CircuitBreaker.CLOSED else 1)
+    GPT_BREAKER_REJECTED.labels().set(upstream["breaker"]["rejected"])
+
+    queue = bot.gpt.queue.get_stats()
+    GPT_QUEUE_DEPTH.set(queue["depth"])
+    for result in ("admitted", "rejected", "shed"):
+        GPT_QUEUE_REQUESTS.labels(result).set(queue[result])
+
+    updates = bot.updates.get_stats()
+    UPDATES_IN_FLIGHT.set(updates["in_flight"])
+    UPDATES_WAITING.set(updates["waiting"])
+    UPDATES_PROCESSED.labels().set(updates["processed"])
@@ -0,0 +1,109 @@
+from typing import Dict, Optional, Tuple
+from telegram import Update
+from telegram.ext import BasePersistence, ContextTypes, ConversationHandler, PersistenceInput
+from services.session_store import SessionStore
+
+ConversationKey = Tuple[int, int]
+
+
+def session_key(conversation: str, chat_id: int, user_id: int) -> str:
+    """Ключ сессии разговора в хранилище"""
+    return f"{conversation}:{chat_id}:{user_id}"
+
+
+class SessionPersistence(BasePersistence):
+    """
+    Хранение состояний ConversationHandler в SessionStore
+
+    Состояние разговора - поле step сессии, которую обработчики пишут
+    сами вместе с введенными данными и с проверкой версии. Поэтому
+    периодическая запись PTB здесь ничего не делает, а при старте
+    разговоры восстанавливаются из живых сессий. Данные user_data,
+    chat_data и bot_data бот не использует и не хранит.
+    """
+
+    def __init__(self, store: SessionStore):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=False, callback_data=False)
+        )
+        self.store = store
+
+    async def get_conversations(self, name: str) -> Dict[ConversationKey, object]:
+        conversations = {}
+        for key, session in await self.store.items(f"{name}:"):
+            chat_id, user_id = key[len(name) + 1:].split(":")
+            conversations[(int(chat_id), int(user_id))] = session["step"]
+        return conversations
+
+    async def update_conversation(self, name: str, key: ConversationKey, new_state: Optional[object]):
+        # Состояние уже записано обработчиком вместе с сессией
+        pass
+
+    async def get_user_data(self) -> Dict:
+        return {}
+
+    async def get_chat_data(self) -> Dict:
+        return {}
+
+    async def get_bot_data(self) -> Dict:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def update_user_data(self, user_id: int, data: Dict):
+        pass
+
+    async def update_chat_data(self, chat_id: int, data: Dict):
+        pass
+
+    async def update_bot_data(self, data: Dict):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_user_data(self, user_id: int):
+        pass
+
+    async def drop_chat_data(self, chat_id: int):
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict):
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict):
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict):
+        pass
+
+    async def flush(self):
+        pass
+
+
+class SessionConversationHandler(ConversationHandler):
+    """
+    ConversationHandler, состояние которого берется из SessionStore
+
+    Другой процесс бота мог продвинуть разговор, поэтому перед каждым
+    обновлением состояние перечитывается из хранилища обработчиком
+    sync_state, зарегистрированным в более ранней группе.
+    """
+
+    def __init__(self, *args, store: SessionStore, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.store = store
+
+    async def sync_state(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Перечитать состояние разговора для этого обновления"""
+        if update.effective_chat is None or update.effective_user is None:
+            return
+
+        chat_id, user_id = update.effective_chat.id, update.effective_user.id
+        session, _ = await self.store.get(session_key(self.name, chat_id, user_id))
+        # Своего API для этого у ConversationHandler нет
+        if session is None:
+            self._conversations.pop((chat_id, user_id), None)
+        else:
+            self._conversations[(chat_id, user_id)] = session["step"]
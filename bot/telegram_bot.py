@@ -1,27 +1,60 @@
 import logging
 import asyncio
+import time
 from datetime import datetime
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, ForceReply
+from typing import Dict, List, Optional, Tuple
+from dateutil import parser as date_parser
+from telegram import Message, Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, ForceReply
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import (
     Application,
     CommandHandler,
     MessageHandler,
     ConversationHandler,
     ContextTypes,
+    TypeHandler,
     filters,
     JobQueue
 )
 from config.config import Config
-from services.gpt_service import GPTService
-from services.storage import Storage
+from bot.debounce import Debouncer
+from bot.delivery import DeliveryPipeline, retry_after_seconds
+from bot.monitoring import REMINDER_LAG, collect, instrument_handlers
+from bot.persistence import SessionConversationHandler, SessionPersistence, session_key
+from bot.update_processor import ChatOrderedUpdateProcessor
+from services.conversation_memory import ConversationMemory
+from services.fair_queue import QueueRejected
+from services.gpt_service import GPTService, GPTUnavailableError
+from services.async_storage import AsyncStorage
+from services.leases import LeaseManager
+from services.metrics import REGISTRY, start_server
+from services.notification_index import due_timestamp
+from services.recurrence import describe_rule, iter_occurrences, parse_repeat
+from services.scheduler import ReminderScheduler
+from services.session_store import VersionConflict, create_session_store
+from services.storage import create_storage
 
 logger = logging.getLogger(__name__)
 
 # Состояния для напоминаний
-(AWAITING_DATE, AWAITING_TEXT) = range(2)
+(AWAITING_DATE, AWAITING_TEXT, AWAITING_REPEAT) = range(3)
+REMINDER_CONVERSATION = "reminder_conversation"
 
-# Хранилище состояний пользователей
-user_states = {}
+# Сколько следующих срабатываний показывать для повторяющихся напоминаний
+UPCOMING_OCCURRENCES = 3
+
+# Заглушка ответа GPT до первых слов
+STREAM_PLACEHOLDER = "✍️ …"
+
+# Ответы, когда запрос к GPT не принят в очередь
+BUSY_REPLIES = {
+    QueueRejected.FULL: "⏳ Сейчас слишком много вопросов. Попробуйте через минуту.",
+    QueueRejected.USER_LIMIT: "⏳ Я еще отвечаю на ваши предыдущие сообщения, подождите немного.",
+    QueueRejected.DEADLINE: "⏳ Не успел ответить из-за нагрузки. Попробуйте еще раз чуть позже.",
+}
+
+# Ответ, когда сессию одновременно изменило другое сообщение
+SESSION_CONFLICT_REPLY = "⚠️ Сообщения пришли одновременно. Повторите, пожалуйста, последний ввод."
 
 
 class TelegramBot:
@@ -29,34 +62,74 @@ class TelegramBot:
     
     def __init__(self):
         self.gpt = GPTService()
-        self.storage = Storage()
+        # Сообщения, отправленные подряд, уходят в GPT одним запросом
+        self.debouncer = None
+        if Config.GPT_DEBOUNCE_MS > 0:
+            self.debouncer = Debouncer(Config.GPT_DEBOUNCE_MS / 1000, self.answer_batch)
+        self.memory = ConversationMemory(
+            summarizer=self.gpt.summarize if Config.GPT_MEMORY_SUMMARY else None
+        )
+        self.storage = AsyncStorage(create_storage())
+        # Состояния разговоров вынесены из процесса, чтобы их видели все копии бота
+        self.sessions = create_session_store()
+        self.leases = LeaseManager() if Config.SCHEDULER_SHARDING else None
+        self.scheduler = ReminderScheduler(self.storage, self.deliver_reminders, self.leases)
+        self.delivery = DeliveryPipeline(self.send_reminder)
+        # Обновления разных чатов обрабатываются параллельно, одного чата - по порядку
+        self.updates = ChatOrderedUpdateProcessor(Config.UPDATE_WORKERS, Config.UPDATE_MAX_PENDING)
+        self.metrics_server = None
         self.app = None
     
     async def start_scheduler(self, application: Application):
         """Запуск планировщика для проверки напоминаний"""
+        # Планировщик спит до ближайшего напоминания
+        await self.scheduler.start()
+        
         job_queue = application.job_queue
         
-        # Запускаем проверку каждую минуту
+        # Раз в сутки переносим в архив просроченные напоминания
         job_queue.run_repeating(
-            self.check_notifications,
-            interval=60,
-            first=10
+            self.archive_expired,
+            interval=24 * 60 * 60,
+            first=60
         )
     
-    async def check_notifications(self, context: ContextTypes.DEFAULT_TYPE):
-        """Проверить и отправить ожидающие напоминания"""
-        pending = self.storage.get_pending_notifications()
+    async def send_reminder(self, notification: dict):
+        """Отправить одно напоминание"""
+        # Аренда истекает посреди пачки, если ее не удается продлить
+        if self.leases is not None and not self.leases.owns(notification["chatId"]):
+            raise RuntimeError("Аренда партиции потеряна")
         
-        for notification in pending:
-            try:
-                await context.bot.send_message(
-                    chat_id=notification["chatId"],
-                    text=f"🔔 Напоминание: {notification['text']}"
-                )
-                self.storage.mark_as_sent(notification["id"])
-                logger.info(f"Отправлено напоминание {notification['id']}")
-            except Exception as e:
-                logger.error(f"Ошибка отправки напоминания: {e}")
+        await self.app.bot.send_message(
+            chat_id=notification["chatId"],
+            text=f"🔔 Напоминание: {notification['text']}"
+        )
+        REMINDER_LAG.observe(time.time() - due_timestamp(notification["date"]))
+    
+    async def deliver_reminders(self, pending: list):
+        """Отправить наступившие напоминания"""
+        sent_ids, failed = await self.delivery.deliver(pending)
+        
+        # Напоминания потерянных партиций доставит новый владелец
+        if self.leases is not None:
+            chats = {n["id"]: n["chatId"] for n in pending}
+            failed = {i: e for i, e in failed.items() if self.leases.owns(chats[i])}
+        
+        # Все результаты прохода сохраняем одной записью
+        if sent_ids or failed:
+            await self.storage.record_deliveries(sent_ids, failed)
+    
+    async def archive_expired(self, context: ContextTypes.DEFAULT_TYPE):
+        """Перенести в архив напоминания, которые так и не удалось отправить"""
+        if self.leases is None:
+            count = await self.storage.archive_expired()
+        else:
+            count = await self.storage.archive_expired(
+                partitions=self.leases.owned(),
+                partition_count=self.leases.partitions
+            )
+        if count:
+            logger.info(f"В архив перенесено {count} просроченных напоминаний")
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
@@ -67,7 +140,8 @@ class TelegramBot:
             "📌 Доступные команды:\n"
             "/help - получить помощь\n"
             "/set_reminder - создать напоминание\n"
-            "/my_reminders - ваши напоминания",
+            "/my_reminders - ваши напоминания\n"
+            "/reset - начать разговор с GPT заново",
             parse_mode="Markdown"
         )
     
@@ -75,7 +149,8 @@ class TelegramBot:
         """Обработчик команды /help"""
         await update.message.reply_text(
             "📖 *Как пользоваться ботом:*\n\n"
-            "1. Просто напишите мне вопрос для получения ответа от YandexGPT\n\n"
+            "1. Просто напишите мне вопрос для получения ответа от YandexGPT.\n"
+            "   Я помню недавний разговор, /reset - начать заново\n\n"
             "2. Для напоминаний:\n"
             "   - /set_reminder - создать новое\n"
             "   - /my_reminders - просмотреть активные\n\n"
@@ -83,10 +158,49 @@ class TelegramBot:
             parse_mode="Markdown"
         )
     
+    async def reset_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /reset - забыть разговор с GPT"""
+        self.memory.clear(update.effective_chat.id)
+        await update.message.reply_text("🧹 Начнем разговор заново")
+    
+    @staticmethod
+    def reminder_session_key(update: Update) -> str:
+        """Ключ сессии создания напоминания"""
+        return session_key(REMINDER_CONVERSATION, update.effective_chat.id, update.effective_user.id)
+    
+    async def load_session(self, update: Update) -> Tuple[Optional[dict], int]:
+        """Прочитать сессию создания напоминания и ее версию"""
+        return await self.sessions.get(self.reminder_session_key(update))
+    
+    async def save_session(self, update: Update, version: int, session: Optional[dict]) -> bool:
+        """
+        Записать сессию создания напоминания
+        
+        Args:
+            update: Обновление, из-за которого меняется сессия
+            version: Версия, под которой сессию прочитали
+            session: Новая сессия или None, чтобы удалить ее
+            
+        Returns:
+            False, если сессию успело изменить другое сообщение
+        """
+        key = self.reminder_session_key(update)
+        try:
+            if session is None:
+                await self.sessions.delete(key, version)
+            else:
+                await self.sessions.put(key, session, version)
+            return True
+        except VersionConflict:
+            logger.warning(f"Конфликт версий сессии {key}")
+            await update.message.reply_text(SESSION_CONFLICT_REPLY)
+            return False
+    
     async def set_reminder_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Начало создания напоминания"""
-        user_id = update.effective_user.id
-        user_states[user_id] = {"action": "awaiting_date"}
+        _, version = await self.load_session(update)
+        if not await self.save_session(update, version, {"step": AWAITING_DATE}):
+            return ConversationHandler.END
         
         await update.message.reply_text(
             "📅 Введите дату в формате ДД.ММ.ГГГГ (например, 25.12.2024):",
@@ -96,8 +210,8 @@ class TelegramBot:
     
     async def set_reminder_date(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Получение даты напоминания"""
-        user_id = update.effective_user.id
         date_text = update.message.text
+        _, version = await self.load_session(update)
         
         try:
             # Проверка формата даты
@@ -105,11 +219,12 @@ class TelegramBot:
             
             # Проверка что дата в будущем
             if date <= datetime.now():
-                del user_states[user_id]
-                await update.message.reply_text("❌ Дата должна быть в будущем")
+                if await self.save_session(update, version, None):
+                    await update.message.reply_text("❌ Дата должна быть в будущем")
                 return ConversationHandler.END
             
-            user_states[user_id] = {"action": "awaiting_text", "date": date_text}
+            if not await self.save_session(update, version, {"step": AWAITING_TEXT, "date": date_text}):
+                return ConversationHandler.END
             
             await update.message.reply_text(
                 "✏️ Введите текст напоминания:",
@@ -122,40 +237,79 @@ class TelegramBot:
             return AWAITING_DATE
     
     async def set_reminder_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Получение текста напоминания и создание"""
-        user_id = update.effective_user.id
+        """Получение текста напоминания"""
         text = update.message.text
+        session, version = await self.load_session(update)
         
-        if user_id not in user_states or user_states[user_id].get("action") != "awaiting_text":
+        if session is None or session["step"] != AWAITING_TEXT:
             await update.message.reply_text("Начните создание напоминания с команды /set_reminder")
             return ConversationHandler.END
         
-        date_text = user_states[user_id]["date"]
+        session = {"step": AWAITING_REPEAT, "date": session["date"], "text": text}
+        if not await self.save_session(update, version, session):
+            return ConversationHandler.END
         
-        # Создаем напоминание
-        reminder = self.storage.add_notification(user_id, date_text, text)
+        await update.message.reply_text(
+            "🔁 Повторять напоминание? Выберите вариант или введите cron-выражение "
+            "(минута час день месяц день недели, например `0 9 * * 1-5`):",
+            reply_markup=ReplyKeyboardMarkup(
+                [["нет"], ["ежедневно", "еженедельно", "ежемесячно"]],
+                one_time_keyboard=True,
+                resize_keyboard=True
+            ),
+            parse_mode="Markdown"
+        )
+        return AWAITING_REPEAT
+    
+    async def set_reminder_repeat(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Получение правила повтора и создание напоминания"""
+        user_id = update.effective_user.id
+        session, version = await self.load_session(update)
         
-        del user_states[user_id]
+        if session is None or session["step"] != AWAITING_REPEAT:
+            await update.message.reply_text("Начните создание напоминания с команды /set_reminder")
+            return ConversationHandler.END
+        
+        try:
+            rule = parse_repeat(update.message.text)
+        except ValueError:
+            await update.message.reply_text(
+                "❌ Не понял периодичность. Выберите вариант на клавиатуре или введите cron-выражение"
+            )
+            return AWAITING_REPEAT
+        
+        # Удаление с проверкой версии гарантирует, что напоминание создаст только один процесс
+        if not await self.save_session(update, version, None):
+            return ConversationHandler.END
+        
+        # Создаем напоминание
+        reminder = await self.storage.add_notification(user_id, session["date"], session["text"], rule)
         
         if reminder:
             formatted_date = self.storage.format_date(reminder["date"])
+            repeat = f"\n🔁 Повтор: {describe_rule(rule)}" if rule else ""
             await update.message.reply_text(
                 f"✅ Напоминание создано!\n\n"
                 f"📅 Дата: {formatted_date}\n"
                 f"📝 Текст: {reminder['text']}"
+                f"{repeat}",
+                reply_markup=ReplyKeyboardRemove()
             )
         else:
-            await update.message.reply_text("❌ Ошибка при создании напоминания")
+            await update.message.reply_text(
+                "❌ Ошибка при создании напоминания",
+                reply_markup=ReplyKeyboardRemove()
+            )
         
         return ConversationHandler.END
     
     async def cancel_reminder(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Отмена создания напоминания"""
-        user_id = update.effective_user.id
+        session, _ = await self.load_session(update)
         
-        if user_id in user_states:
-            del user_states[user_id]
-            await update.message.reply_text("Текущее действие отменено")
+        if session is not None:
+            await self.sessions.delete(self.reminder_session_key(update))
+            await update.message.reply_text("Текущее действие отменено", reply_markup=ReplyKeyboardRemove())
         else:
             await update.message.reply_text("Нет активных действий для отмены")
         
@@ -164,7 +318,7 @@ class TelegramBot:
     async def my_reminders(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать напоминания пользователя"""
         user_id = update.effective_user.id
-        reminders = self.storage.get_user_notifications(user_id)
+        reminders = await self.storage.get_user_notifications(user_id)
         
         if not reminders:
             await update.message.reply_text("📋 У вас нет активных напоминаний")
@@ -174,6 +328,13 @@ class TelegramBot:
         for i, r in enumerate(reminders, 1):
             formatted_date = self.storage.format_date(r["date"])
             message += f"{i}. {formatted_date} - {r['text']}\n"
+            
+            # Следующие срабатывания считаем на лету, в хранилище их нет
+            if r.get("rule"):
+                occurrences = iter_occurrences(r["rule"], date_parser.parse(r["date"]), UPCOMING_OCCURRENCES + 1)
+                next(occurrences)
+                upcoming = ", ".join(dt.strftime('%d.%m.%Y') for dt in occurrences)
+                message += f"   🔁 {describe_rule(r['rule'])}, далее: {upcoming}\n"
         
         await update.message.reply_text(message)
     
@@ -183,7 +344,8 @@ class TelegramBot:
         text = update.message.text
         
         # Проверяем, если пользователь в процессе создания напоминания
-        if user_id in user_states:
+        session, _ = await self.load_session(update)
+        if session is not None:
             await update.message.reply_text(
                 "Завершите текущее действие или отмените его командой /cancel"
             )
@@ -193,24 +355,149 @@ class TelegramBot:
         if text.startswith('/'):
             return
         
+        if self.debouncer is not None:
+            self.debouncer.push(update.effective_chat.id, update)
+            return
+        
+        await self.answer(update, text)
+    
+    async def answer_batch(self, updates: List[Update]):
+        """Ответить на несколько сообщений подряд как на одно"""
+        text = "\n".join(u.message.text for u in updates)
+        update = updates[-1]
+        # Пачка отвечается из таймера склейки, поэтому сама встает в очередь чата
+        await self.updates.run_in_chat(update.effective_chat.id, self.answer(update, text))
+    
+    async def answer(self, update: Update, text: str):
+        """
+        Ответить на запрос к GPT с учетом памяти диалога
+        
+        Args:
+            update: Сообщение, на которое отвечаем
+            text: Текст запроса
+        """
+        chat_id = update.effective_chat.id
+        history = self.memory.context(chat_id, text)
+        
+        response = await self.ask_gpt(update, text, history)
+        if response:
+            self.memory.append(chat_id, "user", text)
+            self.memory.append(chat_id, "assistant", response)
+            # Сжатие старых реплик - отдельный запрос к GPT, ответ пользователю его не ждет
+            self.app.create_task(self.memory.summarize(chat_id))
+    
+    async def ask_gpt(self, update: Update, text: str, history: List[Dict] = None) -> Optional[str]:
+        """
+        Получить ответ GPT и отправить его пользователю
+        
+        Returns:
+            Ответ или None, если получить его не удалось
+        """
+        if Config.GPT_STREAMING:
+            return await self.stream_reply(update, text, history)
+        
+        response = None
         try:
             await update.message.chat.send_action("typing")
-            response = await self.gpt.generate_response(text)
+            response = await self.gpt.generate_response(text, history, user_id=update.effective_user.id)
             
             if response:
                 await update.message.reply_text(response)
             else:
                 await update.message.reply_text("Не удалось получить ответ")
                 
+        except QueueRejected as e:
+            await update.message.reply_text(BUSY_REPLIES[e.reason])
+        except GPTUnavailableError as e:
+            await update.message.reply_text(e.reply)
         except Exception as e:
             logger.error(f"Ошибка GPT: {e}")
             await update.message.reply_text("Произошла ошибка. Попробуйте позже.")
+        return response
+    
+    async def stream_reply(self, update: Update, text: str, history: List[Dict] = None) -> Optional[str]:
+        """
+        Ответить GPT в потоковом режиме
+        
+        Сразу отправляет заглушку и дописывает в нее ответ по мере
+        генерации, редактируя сообщение не чаще GPT_STREAM_EDIT_INTERVAL.
+        
+        Returns:
+            Окончательный ответ или None, если получить его не удалось
+        """
+        reply = await update.message.reply_text(STREAM_PLACEHOLDER)
+        shown = STREAM_PLACEHOLDER
+        last_edit = time.monotonic()
+        answer = None
+        
+        try:
+            async for answer in self.gpt.stream_response(text, history, user_id=update.effective_user.id):
+                if answer and answer != shown and time.monotonic() - last_edit >= Config.GPT_STREAM_EDIT_INTERVAL:
+                    if await self.edit_reply(reply, answer):
+                        shown = answer
+                    last_edit = time.monotonic()
+        except QueueRejected as e:
+            await self.edit_reply(reply, BUSY_REPLIES[e.reason], final=True)
+            return None
+        except GPTUnavailableError as e:
+            await self.edit_reply(reply, e.reply, final=True)
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка GPT: {e}")
+            await self.edit_reply(reply, "Произошла ошибка. Попробуйте позже.", final=True)
+            return None
+        
+        if not answer:
+            await self.edit_reply(reply, "Не удалось получить ответ", final=True)
+        elif answer != shown:
+            await self.edit_reply(reply, answer, final=True)
+        return answer
+    
+    async def edit_reply(self, reply: Message, text: str, final: bool = False) -> bool:
+        """
+        Заменить текст ответа
+        
+        Args:
+            reply: Сообщение бота
+            text: Новый текст
+            final: Окончательный текст: при лимите Telegram ждем, а не пропускаем
+            
+        Returns:
+            True если сообщение обновлено
+        """
+        while True:
+            try:
+                await reply.get_bot().edit_message_text(
+                    text=text,
+                    chat_id=reply.chat_id,
+                    message_id=reply.message_id
+                )
+                return True
+            except RetryAfter as e:
+                # Промежуточное обновление при лимите просто пропускаем
+                if not final:
+                    return False
+                await asyncio.sleep(retry_after_seconds(e))
+            except BadRequest as e:
+                if "not modified" in str(e).lower():
+                    return True
+                logger.error(f"Не удалось обновить ответ в чате {reply.chat_id}: {e}")
+                return False
+    
+    async def collect_metrics(self):
+        """Снять показатели подсистем перед выгрузкой метрик"""
+        await collect(self)
     
     async def post_init(self, application: Application):
         """Действия после инициализации бота"""
         # Запускаем планировщик
         await self.start_scheduler(application)
         
+        REGISTRY.add_collector(self.collect_metrics)
+        # В режиме вебхука /metrics отдает само веб-приложение
+        if application.updater is not None and Config.METRICS_PORT:
+            self.metrics_server = await start_server(Config.METRICS_HOST, Config.METRICS_PORT)
+        
         # Отправляем уведомление админу
         try:
             await application.bot.send_message(
@@ -220,37 +507,80 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"Не удалось отправить уведомление админу: {e}")
     
-    def run(self):
-        """Запуск бота"""
-        # Проверяем конфигурацию
-        Config.validate()
+    async def post_shutdown(self, application: Application):
+        """Действия при остановке бота"""
+        REGISTRY.remove_collector(self.collect_metrics)
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            await self.metrics_server.wait_closed()
+        
+        await self.scheduler.stop()
+        if self.debouncer is not None:
+            await self.debouncer.close()
+        await self.gpt.close()
         
-        # Создаем приложение
-        self.app = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).build()
+        # Сбрасываем на диск отложенные записи
+        await self.storage.close()
+        await self.sessions.close()
+    
+    def build_application(self, polling: bool = True) -> Application:
+        """
+        Создать приложение с обработчиками
+        
+        Args:
+            polling: Получать обновления long polling; без него обновления
+                кладет в update_queue вебхук
+            
+        Returns:
+            Приложение бота
+        """
+        builder = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).base_url(Config.TELEGRAM_API_URL)
+        builder = builder.persistence(SessionPersistence(self.sessions))
+        builder = builder.concurrent_updates(self.updates)
+        if not polling:
+            builder = builder.updater(None)
+        self.app = builder.build()
         
         # Обработчики команд
         self.app.add_handler(CommandHandler("start", self.start_command))
         self.app.add_handler(CommandHandler("help", self.help_command))
         self.app.add_handler(CommandHandler("my_reminders", self.my_reminders))
+        self.app.add_handler(CommandHandler("reset", self.reset_command))
         
         # Обработчик напоминаний с состояниями
-        reminder_handler = ConversationHandler(
+        reminder_handler = SessionConversationHandler(
             entry_points=[CommandHandler("set_reminder", self.set_reminder_start)],
             states={
                 AWAITING_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.set_reminder_date)],
                 AWAITING_TEXT: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.set_reminder_text)],
+                AWAITING_REPEAT: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.set_reminder_repeat)],
             },
             fallbacks=[CommandHandler("cancel", self.cancel_reminder)],
-            name="reminder_conversation",
-            persistent=False
+            name=REMINDER_CONVERSATION,
+            persistent=True,
+            store=self.sessions
         )
+        # Перед разбором обновления берем состояние разговора из общего хранилища
+        self.app.add_handler(TypeHandler(Update, reminder_handler.sync_state), group=-1)
         self.app.add_handler(reminder_handler)
         
         # Обработчик сообщений
         self.app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
         
+        # Время и ошибки каждого обработчика, включая шаги разговора
+        instrument_handlers(self.app.handlers)
+        
         # Пост-инициализация
         self.app.post_init = self.post_init
+        self.app.post_shutdown = self.post_shutdown
+        return self.app
+    
+    def run(self):
+        """Запуск бота"""
+        # Проверяем конфигурацию
+        Config.validate()
+        
+        self.build_application()
         
         # Запуск
         logger.info("Запуск бота...")
@@ -265,6 +595,11 @@ def main():
         level=logging.INFO
     )
     
+    if Config.WEBHOOK_URL:
+        from bot.webhook import run_webhook
+        run_webhook()
+        return
+    
     bot = TelegramBot()
     bot.run()
 
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Any, Awaitable, Dict, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Сколько чатов с самой длинной очередью показывать в статистике
+TOP_CHATS = 10
+
+
+class _ChatQueue:
+    """Очередь обновлений одного чата"""
+
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        # asyncio.Lock пропускает ждущих по порядку прихода
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Параллельная обработка обновлений с сохранением порядка внутри чата
+
+    Обновления разных чатов обрабатываются одновременно, не больше
+    workers сразу, а обновления одного чата - строго по очереди, в
+    порядке получения. Семафор базового класса ограничивает только
+    число принятых обновлений (max_pending): место обработчика
+    занимается уже после очереди чата, иначе сообщения одного
+    активного чата заняли бы все места, ожидая друг друга.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        super().__init__(max(max_pending, workers))
+        self.workers = workers
+        self._slots = asyncio.Semaphore(workers)
+        self._chats: Dict[int, _ChatQueue] = {}
+        self._pending = 0
+        self._in_flight = 0
+        self._processed = 0
+
+    @staticmethod
+    def _chat_id(update: object) -> Optional[int]:
+        """Чат обновления или None, если порядок не важен"""
+        if isinstance(update, Update) and update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]):
+        await self.run_in_chat(self._chat_id(update), coroutine)
+
+    async def run_in_chat(self, chat_id: Optional[int], coroutine: Awaitable[Any]):
+        """
+        Выполнить работу в очереди чата наравне с его обновлениями
+
+        Нужно для работы, начатой вне обработчика обновления (например,
+        ответа на склеенные сообщения): она не пересекается с
+        обработкой других сообщений того же чата.
+
+        Args:
+            chat_id: ID чата или None, если порядок не важен
+            coroutine: Работа
+        """
+        self._pending += 1
+        try:
+            if chat_id is None:
+                await self._run(coroutine)
+                return
+
+            queue = self._chats.get(chat_id)
+            if queue is None:
+                queue = self._chats[chat_id] = _ChatQueue()
+            queue.pending += 1
+            try:
+                async with queue.lock:
+                    await self._run(coroutine)
+            finally:
+                queue.pending -= 1
+                if not queue.pending:
+                    del self._chats[chat_id]
+        finally:
+            self._pending -= 1
+
+    async def _run(self, coroutine: Awaitable[Any]):
+        """Обработать обновление, заняв место обработчика"""
+        async with self._slots:
+            self._in_flight += 1
+            try:
+                await coroutine
+            finally:
+                self._in_flight -= 1
+                self._processed += 1
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def get_stats(self) -> dict:
+        """
+        Получить статистику обработки
+
+        Returns:
+            Словарь со статистикой: обрабатываются сейчас, ждут очереди,
+            длины очередей самых загруженных чатов
+        """
+        busiest = sorted(self._chats.items(), key=lambda item: item[1].pending, reverse=True)[:TOP_CHATS]
+        return {
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "waiting": self._pending - self._in_flight,
+            "processed": self._processed,
+            "chats": len(self._chats),
+            "max_chat_queue": busiest[0][1].pending if busiest else 0,
+            "chat_queues": {chat_id: queue.pending for chat_id, queue in busiest if queue.pending > 1}
+        }
@@ -0,0 +1,114 @@
+import asyncio
+import hmac
+import logging
+from contextlib import asynccontextmanager
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from telegram import Bot, Update
+from config.config import Config
+from bot.telegram_bot import TelegramBot
+from services.metrics import CONTENT_TYPE, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def create_app() -> FastAPI:
+    """
+    ASGI-приложение приема обновлений Telegram через вебхук
+
+    Каждый процесс uvicorn создает свое приложение со своим ботом.
+    Обновление с верным секретом ставится в очередь Application, и
+    Telegram сразу получает 200, не дожидаясь обработки.
+
+    Returns:
+        Приложение FastAPI
+    """
+    bot = TelegramBot()
+    application = bot.build_application(polling=False)
+    secret = Config.WEBHOOK_SECRET.encode("utf-8")
+
+    @asynccontextmanager
+    async def lifespan(api: FastAPI):
+        # Тот же порядок, что и в Application.run_polling
+        await application.initialize()
+        await bot.post_init(application)
+        await application.start()
+        try:
+            yield
+        finally:
+            await application.stop()
+            await application.shutdown()
+            await bot.post_shutdown(application)
+
+    api = FastAPI(lifespan=lifespan, docs_url=None, redoc_url=None, openapi_url=None)
+
+    @api.post(Config.WEBHOOK_PATH)
+    async def telegram_update(request: Request) -> Response:
+        """Принять обновление от Telegram"""
+        token = request.headers.get(SECRET_HEADER, "").encode("utf-8")
+        if not hmac.compare_digest(token, secret):
+            return Response(status_code=403)
+
+        try:
+            update = Update.de_json(await request.json(), application.bot)
+        except Exception as e:
+            logger.warning(f"Некорректное обновление от вебхука: {e}")
+            update = None
+        if update is None:
+            return Response(status_code=400)
+
+        application.update_queue.put_nowait(update)
+        return Response(status_code=200)
+
+    @api.get("/healthz")
+    async def healthz() -> dict:
+        """Процесс жив и цикл событий отвечает"""
+        return {"status": "ok"}
+
+    @api.get("/readyz")
+    async def readyz() -> JSONResponse:
+        """Процесс принимает обновления"""
+        if not application.running:
+            return JSONResponse({"status": "starting"}, status_code=503)
+        return JSONResponse({
+            "status": "ready",
+            "queue": application.update_queue.qsize(),
+            "updates": bot.updates.get_stats()
+        })
+
+    @api.get("/metrics")
+    async def metrics() -> Response:
+        """Метрики этого процесса в формате Prometheus"""
+        return Response(await REGISTRY.expose(), headers={"Content-Type": CONTENT_TYPE})
+
+    return api
+
+
+async def set_webhook():
+    """Зарегистрировать вебхук в Telegram"""
+    async with Bot(Config.TELEGRAM_BOT_TOKEN, base_url=Config.TELEGRAM_API_URL) as bot:
+        await bot.set_webhook(
+            url=f"{Config.WEBHOOK_URL.rstrip('/')}{Config.WEBHOOK_PATH}",
+            secret_token=Config.WEBHOOK_SECRET,
+            allowed_updates=Update.ALL_TYPES
+        )
+
+
+def run_webhook():
+    """Запуск бота в режиме вебхука"""
+    Config.validate()
+
+    # Вебхук регистрирует один раз родительский процесс, а не каждый воркер
+    asyncio.run(set_webhook())
+    logger.info(f"Вебхук зарегистрирован, запуск {Config.WEBHOOK_WORKERS} воркеров на порту {Config.PORT}")
+
+    uvicorn.run(
+        "bot.webhook:create_app",
+        factory=True,
+        host=Config.WEBHOOK_HOST,
+        port=Config.PORT,
+        workers=Config.WEBHOOK_WORKERS
+    )
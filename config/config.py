@@ -11,16 +11,127 @@ class Config:
     YANDEX_API_KEY = os.getenv('YANDEX_API_KEY')
     YANDEX_FOLDER_ID = os.getenv('YANDEX_FOLDER_ID')
     YANDEX_GPT_MODEL = 'yandexgpt-lite'
-    YANDEX_ENDPOINT = 'https://llm.api.cloud.yandex.net/foundationModels/v1/completion'
+    YANDEX_ENDPOINT = os.getenv('YANDEX_ENDPOINT', 'https://llm.api.cloud.yandex.net/foundationModels/v1/completion')
+    
+    # HTTP клиент YandexGPT: таймауты по фазам (секунды) и пул соединений
+    GPT_CONNECT_TIMEOUT = float(os.getenv('GPT_CONNECT_TIMEOUT', 2))
+    GPT_READ_TIMEOUT = float(os.getenv('GPT_READ_TIMEOUT', 5))
+    GPT_WRITE_TIMEOUT = float(os.getenv('GPT_WRITE_TIMEOUT', 5))
+    GPT_POOL_TIMEOUT = float(os.getenv('GPT_POOL_TIMEOUT', 5))
+    GPT_MAX_CONNECTIONS = int(os.getenv('GPT_MAX_CONNECTIONS', 100))
+    GPT_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('GPT_MAX_KEEPALIVE_CONNECTIONS', 20))
+    GPT_KEEPALIVE_EXPIRY = float(os.getenv('GPT_KEEPALIVE_EXPIRY', 30))
+    # Потоковые ответы GPT: сообщение обновляется не чаще раза в интервал (секунды)
+    GPT_STREAMING = os.getenv('GPT_STREAMING', 'true').lower() == 'true'
+    GPT_STREAM_EDIT_INTERVAL = float(os.getenv('GPT_STREAM_EDIT_INTERVAL', 1.0))
+    # Защита апстрима: адаптивный лимит одновременных запросов и целевая задержка (секунды)
+    GPT_CONCURRENCY_INITIAL = int(os.getenv('GPT_CONCURRENCY_INITIAL', 8))
+    GPT_CONCURRENCY_MIN = int(os.getenv('GPT_CONCURRENCY_MIN', 1))
+    GPT_CONCURRENCY_MAX = int(os.getenv('GPT_CONCURRENCY_MAX', 64))
+    GPT_LATENCY_TARGET = float(os.getenv('GPT_LATENCY_TARGET', 3.0))
+    # Автомат: доля ошибок среди последних вызовов, размер окна и пауза до пробного вызова
+    GPT_BREAKER_THRESHOLD = float(os.getenv('GPT_BREAKER_THRESHOLD', 0.5))
+    GPT_BREAKER_WINDOW = int(os.getenv('GPT_BREAKER_WINDOW', 20))
+    GPT_BREAKER_COOLDOWN = float(os.getenv('GPT_BREAKER_COOLDOWN', 30))
+    # Дублирующий запрос, если ответа нет дольше p95 (но не раньше минимальной задержки)
+    GPT_HEDGE = os.getenv('GPT_HEDGE', 'false').lower() == 'true'
+    GPT_HEDGE_MIN_DELAY = float(os.getenv('GPT_HEDGE_MIN_DELAY', 0.5))
+    # Очередь запросов к GPT: общая глубина, запросов на пользователя, срок ожидания (секунды)
+    GPT_QUEUE_MAX_DEPTH = int(os.getenv('GPT_QUEUE_MAX_DEPTH', 200))
+    GPT_QUEUE_MAX_PER_USER = int(os.getenv('GPT_QUEUE_MAX_PER_USER', 3))
+    GPT_QUEUE_DEADLINE = float(os.getenv('GPT_QUEUE_DEADLINE', 20))
+    # Окно склейки сообщений одного чата в один запрос (миллисекунды, 0 - отключено)
+    GPT_DEBOUNCE_MS = int(os.getenv('GPT_DEBOUNCE_MS', 0))
+    # Память диалогов: реплик на чат, бюджет токенов запроса, общие лимиты,
+    # забывание после простоя (секунды) и сжатие старых реплик в краткое содержание
+    GPT_MEMORY_TURNS = int(os.getenv('GPT_MEMORY_TURNS', 20))
+    GPT_CONTEXT_TOKENS = int(os.getenv('GPT_CONTEXT_TOKENS', 2000))
+    GPT_MEMORY_MAX_CHATS = int(os.getenv('GPT_MEMORY_MAX_CHATS', 10000))
+    GPT_MEMORY_MAX_CHARS = int(os.getenv('GPT_MEMORY_MAX_CHARS', 5_000_000))
+    GPT_MEMORY_IDLE_TTL = float(os.getenv('GPT_MEMORY_IDLE_TTL', 3600))
+    GPT_MEMORY_SUMMARY = os.getenv('GPT_MEMORY_SUMMARY', 'false').lower() == 'true'
     
     # Telegram настройки
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+    # Адрес Bot API: свой сервер Bot API или заглушка в бенчмарках
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org/bot')
     
     # Сервер настройки
     PORT = int(os.getenv('PORT', 3000))
+    # Параллельная обработка обновлений: обработчиков одновременно и предел принятых
+    # обновлений, включая ждущие своей очереди в чате
+    UPDATE_WORKERS = int(os.getenv('UPDATE_WORKERS', 16))
+    UPDATE_MAX_PENDING = int(os.getenv('UPDATE_MAX_PENDING', 1000))
+    # Вебхук: публичный адрес (пустой - long polling), путь, секрет для Telegram,
+    # адрес прослушивания и число процессов uvicorn
+    WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+    WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+    WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 1))
+    # Метрики Prometheus: в режиме вебхука - GET /metrics на PORT, при long polling -
+    # отдельный сервер на METRICS_PORT (0 - выключен)
+    METRICS_HOST = os.getenv('METRICS_HOST', '0.0.0.0')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+    
+    # Хранилище напоминаний: json, journal или sqlite
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json')
+    SQLITE_PATH = os.getenv('SQLITE_PATH', 'data/notifications.db')
+    
+    # Состояния разговоров (создание напоминания): memory или sqlite (общее для процессов),
+    # срок жизни незавершенного разговора (секунды)
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'sqlite')
+    SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', 'data/sessions.db')
+    SESSION_TTL = float(os.getenv('SESSION_TTL', 3600))
+    
+    # Журнал: число записей в логе до фоновой компакции в снапшот
+    JOURNAL_COMPACT_THRESHOLD = int(os.getenv('JOURNAL_COMPACT_THRESHOLD', 1000))
+    JOURNAL_FSYNC = os.getenv('JOURNAL_FSYNC', 'true').lower() == 'true'
+    
+    # Интервал группового сброса записей на диск (секунды)
+    STORAGE_FLUSH_INTERVAL = float(os.getenv('STORAGE_FLUSH_INTERVAL', 0.05))
+    
+    # Пауза перед повторной отправкой напоминания (секунды, растет вдвое)
+    REMINDER_RETRY_DELAY = float(os.getenv('REMINDER_RETRY_DELAY', 30))
+    REMINDER_RETRY_MAX_DELAY = float(os.getenv('REMINDER_RETRY_MAX_DELAY', 3600))
+    
+    # Доставка напоминаний: параллельность и лимиты Telegram (сообщений в секунду)
+    DELIVERY_CONCURRENCY = int(os.getenv('DELIVERY_CONCURRENCY', 16))
+    DELIVERY_GLOBAL_RATE = float(os.getenv('DELIVERY_GLOBAL_RATE', 30))
+    DELIVERY_CHAT_RATE = float(os.getenv('DELIVERY_CHAT_RATE', 1))
+    DELIVERY_MAX_ATTEMPTS = int(os.getenv('DELIVERY_MAX_ATTEMPTS', 3))
+    DELIVERY_RETRY_DELAY = float(os.getenv('DELIVERY_RETRY_DELAY', 1))
+    
+    # Шардирование планировщика между процессами (только со STORAGE_BACKEND=sqlite)
+    SCHEDULER_SHARDING = os.getenv('SCHEDULER_SHARDING', 'false').lower() == 'true'
+    SCHEDULER_PARTITIONS = int(os.getenv('SCHEDULER_PARTITIONS', 64))
+    SCHEDULER_LEASE_TTL = float(os.getenv('SCHEDULER_LEASE_TTL', 15))
+    
+    # Через сколько дней неотправленное напоминание уходит в архив
+    ARCHIVE_EXPIRE_DAYS = int(os.getenv('ARCHIVE_EXPIRE_DAYS', 30))
     
     # Кэш настройки
     CACHE_TTL = int(os.getenv('CACHE_TTL', 3600))
+    # Объем кэша в памяти (байты)
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    # Сколько секунд после истечения отдавать запись, обновляя ее в фоне (0 - отключено)
+    CACHE_SWR_TTL = int(os.getenv('CACHE_SWR_TTL', 300))
+    # Второй уровень кэша: sqlite, redis (общий для нескольких копий бота) или none
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite')
+    # Дисковый уровень кэша: путь к SQLite (пустой - отключен) и предел объема
+    CACHE_DISK_PATH = os.getenv('CACHE_DISK_PATH', 'data/cache.db')
+    CACHE_DISK_MAX_BYTES = int(os.getenv('CACHE_DISK_MAX_BYTES', 64 * 1024 * 1024))
+    # Сколько секунд после истечения хранить запись на втором уровне для ответа при недоступном GPT
+    CACHE_STALE_TTL = int(os.getenv('CACHE_STALE_TTL', 24 * 60 * 60))
+    # Redis для общего кэша: адрес, префикс ключей, таймаут команды (секунды)
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    REDIS_PREFIX = os.getenv('REDIS_PREFIX', 'tgbot:cache:')
+    REDIS_TIMEOUT = float(os.getenv('REDIS_TIMEOUT', 1.0))
+    # Сколько секунд запись из общего кэша живет в памяти процесса без перечитывания
+    CACHE_NEAR_TTL = int(os.getenv('CACHE_NEAR_TTL', 60))
+    # Поиск ответа GPT по похожему запросу (MinHash/LSH) и порог сходства
+    GPT_CACHE_FUZZY = os.getenv('GPT_CACHE_FUZZY', 'false').lower() == 'true'
+    GPT_CACHE_SIMILARITY = float(os.getenv('GPT_CACHE_SIMILARITY', 0.9))
     
     # ID администратора для уведомлений
     ADMIN_CHAT_ID = int(os.getenv('ADMIN_CHAT_ID', 625281378))
@@ -40,4 +151,19 @@ class Config:
                 missing.append(var)
         
         if missing:
-            raise ValueError(f"Отсутствуют обязательные переменные окружения: {', '.join(missing)}")
\ No newline at end of file
+            raise ValueError(f"Отсутствуют обязательные переменные окружения: {', '.join(missing)}")
+        
+        if cls.CACHE_BACKEND not in ('sqlite', 'redis', 'none'):
+            raise ValueError(f"Неизвестный CACHE_BACKEND: {cls.CACHE_BACKEND}")
+        
+        if cls.SCHEDULER_SHARDING and cls.STORAGE_BACKEND != 'sqlite':
+            raise ValueError("SCHEDULER_SHARDING требует общего хранилища STORAGE_BACKEND=sqlite")
+        
+        if cls.WEBHOOK_URL and not cls.WEBHOOK_SECRET:
+            raise ValueError("Режим вебхука требует WEBHOOK_SECRET")
+        
+        # Каждый воркер запускает свой планировщик: без шардирования напоминания задвоятся
+        if cls.WEBHOOK_WORKERS > 1 and not cls.SCHEDULER_SHARDING:
+            raise ValueError("WEBHOOK_WORKERS > 1 требует SCHEDULER_SHARDING=true")
+        if cls.WEBHOOK_WORKERS > 1 and cls.SESSION_BACKEND != 'sqlite':
+            raise ValueError("WEBHOOK_WORKERS > 1 требует общего хранилища сессий SESSION_BACKEND=sqlite")
\ No newline at end of file
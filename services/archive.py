@@ -0,0 +1,121 @@
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+from services.notification_index import due_timestamp
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.path.join("data", "archive")
+SEGMENT_PREFIX = "notifications-"
+SEGMENT_SUFFIX = ".jsonl.gz"
+
+
+class NotificationArchive:
+    """
+    Архив отправленных и просроченных напоминаний
+
+    Записи лежат в сжатых сегментах по месяцу даты напоминания
+    (data/archive/notifications-YYYY-MM.jsonl.gz). Каждый сброс дописывает
+    в сегмент новый gzip-member, чтение идет потоково по строкам.
+    """
+
+    def __init__(self, archive_dir: str = ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+
+    @staticmethod
+    def _month(notification: Dict) -> str:
+        """Месяц напоминания в UTC в формате YYYY-MM"""
+        due = due_timestamp(notification["date"])
+        return datetime.fromtimestamp(due, tz=timezone.utc).strftime("%Y-%m")
+
+    def _segment_path(self, month: str) -> str:
+        """Путь к сегменту месяца"""
+        return os.path.join(self.archive_dir, f"{SEGMENT_PREFIX}{month}{SEGMENT_SUFFIX}")
+
+    def append(self, notifications: List[Dict]):
+        """
+        Дописать напоминания в архив
+
+        Args:
+            notifications: Напоминания для архивации
+        """
+        if not notifications:
+            return
+
+        if not os.path.exists(self.archive_dir):
+            os.makedirs(self.archive_dir)
+
+        segments: Dict[str, List[bytes]] = {}
+        for n in notifications:
+            line = json.dumps(n, ensure_ascii=False, separators=(',', ':')) + "\n"
+            segments.setdefault(self._month(n), []).append(line.encode('utf-8'))
+
+        for month, lines in segments.items():
+            # Член gzip собираем целиком и дописываем одной записью, чтобы
+            # несколько процессов не перемешивали данные в одном сегменте
+            member = gzip.compress(b"".join(lines))
+            with open(self._segment_path(month), 'ab') as raw:
+                raw.write(member)
+                raw.flush()
+                os.fsync(raw.fileno())
+
+    def months(self) -> List[str]:
+        """Список месяцев, для которых есть сегменты"""
+        if not os.path.exists(self.archive_dir):
+            return []
+
+        return sorted(
+            name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+            for name in os.listdir(self.archive_dir)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def query(
+        self,
+        chat_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Iterator[Dict]:
+        """
+        Потоково прочитать архивные напоминания
+
+        Args:
+            chat_id: Только напоминания этого чата
+            since: Только напоминания с датой не раньше
+            until: Только напоминания с датой раньше
+
+        Yields:
+            Архивные напоминания в порядке месяцев
+        """
+        since_ts = since.timestamp() if since else None
+        until_ts = until.timestamp() if until else None
+        since_month = datetime.fromtimestamp(since_ts, tz=timezone.utc).strftime("%Y-%m") if since else None
+        until_month = datetime.fromtimestamp(until_ts, tz=timezone.utc).strftime("%Y-%m") if until else None
+
+        for month in self.months():
+            # Сегменты вне диапазона даже не открываем
+            if since_month and month < since_month:
+                continue
+            if until_month and month > until_month:
+                break
+
+            path = self._segment_path(month)
+            try:
+                with gzip.open(path, 'rb') as f:
+                    for line in f:
+                        n = json.loads(line)
+                        if chat_id is not None and n["chatId"] != chat_id:
+                            continue
+                        if since_ts is not None or until_ts is not None:
+                            due = due_timestamp(n["date"])
+                            if since_ts is not None and due < since_ts:
+                                continue
+                            if until_ts is not None and due >= until_ts:
+                                continue
+                        yield n
+            except (EOFError, OSError, ValueError) as e:
+                # Оборванный последний member после падения
+                logger.warning(f"Поврежденный сегмент архива {path}: {e}")
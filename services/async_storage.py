@@ -0,0 +1,380 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Collection, List, Dict, Optional
+from config.config import Config
+from services.metrics import REGISTRY
+from services.notification_index import notification_due
+from services.storage import Storage
+
+logger = logging.getLogger(__name__)
+
+STORAGE_DURATION = REGISTRY.histogram(
+    "storage_operation_duration_seconds",
+    "Время операций хранилища в его потоке, без ожидания очереди",
+    ["operation"]
+)
+
+# Методы Storage, которые AsyncStorage выполняет в потоке хранилища
+STORAGE_OPERATIONS = (
+    "add_notification",
+    "archive_expired",
+    "delete_notification",
+    "flush",
+    "get_notification",
+    "get_pending_notifications",
+    "get_stats",
+    "get_user_notifications",
+    "mark_as_sent",
+    "next_due_at",
+    "query_archive",
+    "record_deliveries",
+)
+
+
+def timed(func: Callable) -> Callable:
+    """
+    Обернуть функцию хранилища учетом ее времени
+
+    Серия метрики выбирается один раз при обертывании, а не на каждый вызов.
+
+    Args:
+        func: Функция хранилища; ее имя - метка операции
+
+    Returns:
+        Функция с тем же результатом
+    """
+    observe = STORAGE_DURATION.labels(func.__name__).observe
+
+    def wrapper(*args) -> Any:
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+class AsyncStorage:
+    """
+    Асинхронный фасад над Storage
+
+    Вся работа с диском выполняется в отдельном потоке, поэтому event loop
+    не блокируется. Записи, сделанные в пределах flush_interval, сбрасываются
+    на диск одним flush(). Корутина записи завершается только после того,
+    как ее изменения записаны на диск.
+    """
+
+    def __init__(self, storage: Storage, flush_interval: float = None):
+        self.storage = storage
+        self.flush_interval = Config.STORAGE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.storage.autoflush = False
+
+        # Один поток: операции над хранилищем выполняются строго по порядку
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+        # Методы хранилища оборачиваются метрикой один раз, а не на каждый вызов
+        self._operations = {name: timed(getattr(storage, name)) for name in STORAGE_OPERATIONS}
+        self._waiters: List[asyncio.Future] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._listeners: List[Callable[[float], None]] = []
+
+    def add_listener(self, callback: Callable[[float], None]):
+        """
+        Подписаться на добавление и удаление напоминаний
+
+        Args:
+            callback: Функция, получающая время срабатывания напоминания
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[float], None]):
+        """Отписаться от изменений напоминаний"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, notification: Dict):
+        """Сообщить подписчикам об изменении напоминания"""
+        due_at = notification_due(notification)
+        for callback in self._listeners:
+            try:
+                callback(due_at)
+            except Exception as e:
+                logger.error(f"Ошибка подписчика хранилища: {e}")
+
+    async def _run(self, operation: str, *args) -> Any:
+        """Выполнить операцию хранилища в потоке хранилища"""
+        return await self._call(self._operations[operation], *args)
+
+    async def _call(self, func: Callable, *args) -> Any:
+        """Выполнить функцию в потоке хранилища"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    async def _write(self, operation: str, *args) -> Any:
+        """
+        Выполнить запись и дождаться ее сброса на диск
+
+        Args:
+            operation: Имя метода хранилища
+            *args: Аргументы метода
+
+        Returns:
+            Результат метода
+
+        Raises:
+            IOError: Если сбросить изменения на диск не удалось
+        """
+        result = await self._run(operation, *args)
+        await self._flushed()
+        return result
+
+    async def _flushed(self):
+        """
+        Дождаться группового сброса на диск уже выполненных записей
+
+        Raises:
+            IOError: Если сбросить изменения на диск не удалось
+        """
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_interval, self._start_flush)
+
+        await waiter
+
+    def _start_flush(self):
+        """Запустить групповой сброс накопленных записей"""
+        self._flush_handle = None
+        waiters, self._waiters = self._waiters, []
+        asyncio.ensure_future(self._flush(waiters))
+
+    async def _flush(self, waiters: List[asyncio.Future]):
+        """Сбросить изменения и разбудить ожидающие записи"""
+        try:
+            await self._run("flush")
+        except Exception as e:
+            logger.error(f"Ошибка сброса хранилища на диск: {e}")
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(IOError("Не удалось сохранить изменения"))
+            return
+
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def add_notification(self, chat_id: int, date: str, text: str, rule: Dict = None) -> Optional[Dict]:
+        """
+        Добавить новое напоминание
+
+        Args:
+            chat_id: ID чата пользователя
+            date: Дата в формате DD.MM.YYYY
+            text: Текст напоминания
+            rule: Правило повтора, None - разовое напоминание
+
+        Returns:
+            Созданное напоминание или None
+        """
+        notification = await self._run("add_notification", chat_id, date, text, rule)
+        if notification is None:
+            return None
+
+        try:
+            await self._flushed()
+        except IOError:
+            # Иначе запись сохранится при следующем сбросе, и пользователь,
+            # получивший ошибку, все равно получит напоминание
+            await self._run("delete_notification", notification["id"])
+            return None
+
+        self._notify(notification)
+        return notification
+
+    async def get_user_notifications(self, chat_id: int) -> List[Dict]:
+        """
+        Получить активные напоминания пользователя
+
+        Args:
+            chat_id: ID чата пользователя
+
+        Returns:
+            Список активных напоминаний
+        """
+        return await self._run("get_user_notifications", chat_id)
+
+    async def get_pending_notifications(
+        self,
+        partitions: Optional[Collection[int]] = None,
+        partition_count: int = None
+    ) -> List[Dict]:
+        """
+        Получить напоминания, которые пора отправить
+
+        Args:
+            partitions: Только чаты из этих партиций
+            partition_count: Общее число партиций, по умолчанию SCHEDULER_PARTITIONS
+
+        Returns:
+            Список ожидающих отправки напоминаний
+        """
+        return await self._run("get_pending_notifications", partitions, partition_count)
+
+    async def next_due_at(self, partitions: Optional[Collection[int]] = None, partition_count: int = None) -> Optional[float]:
+        """
+        Время ближайшего неотправленного напоминания
+
+        Args:
+            partitions: Только чаты из этих партиций
+            partition_count: Общее число партиций, по умолчанию SCHEDULER_PARTITIONS
+
+        Returns:
+            UTC epoch или None, если ожидающих напоминаний нет
+        """
+        return await self._run("next_due_at", partitions, partition_count)
+
+    async def mark_as_sent(self, notification_id: str) -> bool:
+        """
+        Отметить напоминание как отправленное
+
+        Args:
+            notification_id: ID напоминания
+
+        Returns:
+            True если успешно, False иначе
+        """
+        try:
+            return await self._write("mark_as_sent", notification_id)
+        except IOError:
+            return False
+
+    async def mark_many_sent(self, notification_ids: List[str]) -> int:
+        """
+        Отметить несколько напоминаний отправленными одной записью
+
+        Args:
+            notification_ids: ID напоминаний
+
+        Returns:
+            Количество отмеченных напоминаний
+        """
+        return await self.record_deliveries(notification_ids)
+
+    async def record_deliveries(self, sent_ids: List[str], failed: Dict[str, str] = None) -> int:
+        """
+        Записать результаты доставки за один проход планировщика
+
+        Args:
+            sent_ids: ID доставленных напоминаний
+            failed: ID недоставленных напоминаний -> текст ошибки
+
+        Returns:
+            Количество напоминаний, отмеченных отправленными
+        """
+        try:
+            return await self._write("record_deliveries", sent_ids, failed)
+        except IOError:
+            return 0
+
+    async def delete_notification(self, notification_id: str) -> bool:
+        """
+        Удалить напоминание
+
+        Args:
+            notification_id: ID напоминания
+
+        Returns:
+            True если успешно, False иначе
+        """
+        notification = await self._run("get_notification", notification_id)
+        try:
+            deleted = await self._write("delete_notification", notification_id)
+        except IOError:
+            return False
+
+        if deleted and notification:
+            self._notify(notification)
+        return deleted
+
+    async def archive_expired(
+        self,
+        max_age_days: int = None,
+        partitions: Optional[Collection[int]] = None,
+        partition_count: int = None
+    ) -> int:
+        """
+        Перенести в архив напоминания, которые так и не удалось отправить
+
+        Args:
+            max_age_days: Сколько дней после даты напоминания ждать отправки
+            partitions: Только чаты из этих партиций
+            partition_count: Общее число партиций, по умолчанию SCHEDULER_PARTITIONS
+
+        Returns:
+            Количество перенесенных напоминаний
+        """
+        try:
+            return await self._write("archive_expired", max_age_days, partitions, partition_count)
+        except IOError:
+            return 0
+
+    async def query_archive(
+        self,
+        chat_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        batch_size: int = 500
+    ) -> AsyncIterator[Dict]:
+        """
+        Потоково прочитать архив, не загружая его целиком
+
+        Args:
+            chat_id: Только напоминания этого чата
+            since: Только напоминания с датой не раньше
+            until: Только напоминания с датой раньше
+            batch_size: Сколько записей читать за один заход в поток хранилища
+
+        Yields:
+            Архивные напоминания
+        """
+        records = await self._run("query_archive", chat_id, since, until)
+
+        def read_archive_batch() -> List[Dict]:
+            return list(islice(records, batch_size))
+
+        read_batch = timed(read_archive_batch)
+        while True:
+            batch = await self._call(read_batch)
+            if not batch:
+                return
+            for n in batch:
+                yield n
+
+    async def get_stats(self) -> dict:
+        """
+        Получить статистику хранилища
+
+        Returns:
+            Словарь: количество неотправленных напоминаний и размер файлов
+        """
+        return await self._run("get_stats")
+
+    def format_date(self, iso_date: str) -> str:
+        """Форматировать ISO дату в DD.MM.YYYY"""
+        return self.storage.format_date(iso_date)
+
+    async def close(self):
+        """Сбросить незаписанные изменения и остановить поток хранилища"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        waiters, self._waiters = self._waiters, []
+        await self._flush(waiters)
+        self._executor.shutdown(wait=True)
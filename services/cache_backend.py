@@ -0,0 +1,94 @@
+import asyncio
+from typing import Any, List, Optional, Protocol, Tuple
+from config.config import Config
+from services.disk_cache import DiskCache
+
+Entry = Tuple[Any, float]
+
+
+class CacheBackend(Protocol):
+    """
+    Второй уровень кэша за памятью процесса
+
+    Хранит пары (значение, срок годности по time.time()). Истекшие записи
+    еще некоторое время доступны через get(stale=True). shared - уровень
+    общий для нескольких копий бота: тогда память процесса служит для него
+    ближним кэшем и не держит записи дольше CACHE_NEAR_TTL.
+    """
+
+    shared: bool
+
+    async def get(self, key: str, stale: bool = False) -> Optional[Entry]:
+        ...
+
+    async def set(self, key: str, value: Any, expires_at: float):
+        ...
+
+    async def delete(self, key: str):
+        ...
+
+    async def clear(self):
+        ...
+
+    def hottest(self, limit: int) -> List[Tuple[str, Any, float]]:
+        """Записи для прогрева памяти при старте (синхронно)"""
+        ...
+
+    async def close(self):
+        ...
+
+    def get_stats(self) -> dict:
+        ...
+
+
+class SQLiteBackend:
+    """Второй уровень кэша в локальном файле SQLite"""
+
+    shared = False
+
+    def __init__(self, disk: DiskCache = None):
+        self.disk = disk or DiskCache()
+
+    async def get(self, key: str, stale: bool = False) -> Optional[Entry]:
+        return await asyncio.to_thread(self.disk.get, key, stale)
+
+    async def set(self, key: str, value: Any, expires_at: float):
+        await asyncio.to_thread(self.disk.set, key, value, expires_at)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self.disk.delete, key)
+
+    async def clear(self):
+        await asyncio.to_thread(self.disk.clear)
+
+    def hottest(self, limit: int) -> List[Tuple[str, Any, float]]:
+        return self.disk.hottest(limit)
+
+    async def close(self):
+        await asyncio.to_thread(self.disk.close)
+
+    def get_stats(self) -> dict:
+        return {"backend": "sqlite", **self.disk.get_stats()}
+
+
+def create_backend() -> Optional[CacheBackend]:
+    """
+    Создать второй уровень кэша по CACHE_BACKEND
+
+    Returns:
+        Уровень кэша или None, если он отключен
+
+    Raises:
+        ValueError: Неизвестный CACHE_BACKEND
+    """
+    backend = Config.CACHE_BACKEND
+
+    if backend == "none" or (backend == "sqlite" and not Config.CACHE_DISK_PATH):
+        return None
+    if backend == "sqlite":
+        return SQLiteBackend()
+    if backend == "redis":
+        from services.redis_cache import RedisBackend
+        return RedisBackend()
+
+    raise ValueError(f"Неизвестный тип кэша: {backend}")
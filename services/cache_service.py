@@ -1,20 +1,119 @@
 import asyncio
+import json
 import logging
-from typing import Any, Optional
-from cachetools import TTLCache
+import sys
+import time
+from typing import Any, Callable, List, Optional, Tuple
 from config.config import Config
+from services.cache_backend import CacheBackend, create_backend
+from services.tinylfu import TinyLFUCache
+from services.upstream import LatencyWindow
 
 logger = logging.getLogger(__name__)
 
+# Накладные расходы записи в памяти сверх ключа и значения: узлы словарей, кортежи
+ENTRY_OVERHEAD = 256
+# Средний размер записи для оценки их числа (ответ GPT - несколько сотен символов)
+AVG_ENTRY_BYTES = 1024
+
+
+def entry_size(key: str, value: Any) -> int:
+    """Оценка объема записи в памяти в байтах"""
+    if isinstance(value, str):
+        value_size = sys.getsizeof(value)
+    else:
+        value_size = len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+    return sys.getsizeof(key) + value_size + ENTRY_OVERHEAD
+
 
 class CacheService:
-    """Сервис кэширования с TTL"""
+    """
+    Сервис кэширования с TTL
     
-    def __init__(self):
-        self.cache = TTLCache(
-            maxsize=1000,  # Максимальное количество элементов
-            ttl=Config.CACHE_TTL  # Время жизни в секундах
+    Память процесса ограничена объемом в байтах (CACHE_MAX_BYTES) и
+    вытесняет записи по W-TinyLFU, так что поток разовых запросов не
+    вымывает популярные. За памятью стоит второй уровень (CACHE_BACKEND):
+    локальный SQLite, который переживает перезапуск, или общий для всех
+    копий бота Redis, для которого память служит ближним кэшем.
+    
+    Истекшая запись еще CACHE_SWR_TTL секунд отдается через get_entry()
+    с пометкой stale, чтобы вызывающий обновил ее в фоне.
+    """
+    
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.ttl = Config.CACHE_TTL  # Время жизни в секундах
+        self.swr_ttl = Config.CACHE_SWR_TTL
+        self.near_ttl = Config.CACHE_NEAR_TTL
+        self.cache = TinyLFUCache(
+            max_bytes=Config.CACHE_MAX_BYTES,
+            expected_entries=max(Config.CACHE_MAX_BYTES // AVG_ENTRY_BYTES, 64),
+            on_evict=self._evicted
         )
+        self._eviction_listeners: List[Callable[[str], None]] = []
+        self._stats = {
+            "hits": 0,
+            "backend_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "backend_errors": 0
+        }
+        self._latency = LatencyWindow()
+        self._backend_latency = LatencyWindow()
+        
+        self.backend = backend
+        if backend is None:
+            try:
+                self.backend = create_backend()
+                if self.backend is not None:
+                    self._warm()
+            except Exception as e:
+                logger.error(f"Второй уровень кэша недоступен, работаем только в памяти: {e}")
+                self.backend = None
+    
+    def _warm(self):
+        """Прогреть память записями второго уровня"""
+        entries = self.backend.hottest(self.cache.expected_entries)
+        # Самые свежие добавляем последними, чтобы они вытеснялись позже
+        for key, value, expires_at in reversed(entries):
+            self._store(key, value, expires_at)
+        if entries:
+            logger.info(f"Кэш прогрет со второго уровня: {len(entries)} записей")
+    
+    def _store(self, key: str, value: Any, expires_at: float):
+        """Положить запись в память"""
+        # В памяти держим и истекшую запись, пока ее можно отдавать с обновлением
+        deadline = expires_at + self.swr_ttl
+        if self.backend is not None and self.backend.shared:
+            # Ближний кэш общего уровня: чужие изменения увидим не позже near_ttl
+            deadline = min(deadline, time.time() + self.near_ttl)
+        self.cache.set(key, (value, expires_at), entry_size(key, value), deadline)
+    
+    def add_eviction_listener(self, listener: Callable[[str], None]):
+        """
+        Подписаться на удаление ключей из памяти
+        
+        Args:
+            listener: Вызывается с ключом, покинувшим память
+        """
+        self._eviction_listeners.append(listener)
+    
+    def remove_eviction_listener(self, listener: Callable[[str], None]):
+        """Отписаться от удаления ключей"""
+        if listener in self._eviction_listeners:
+            self._eviction_listeners.remove(listener)
+    
+    def _evicted(self, key: str):
+        """Сообщить подписчикам об удалении ключа"""
+        for listener in self._eviction_listeners:
+            try:
+                listener(key)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика вытеснения из кэша {key}: {e}")
+    
+    def keys(self) -> List[str]:
+        """Ключи, находящиеся в памяти"""
+        return list(self.cache)
     
     async def get(self, key: str) -> Optional[Any]:
         """
@@ -26,9 +125,84 @@ class CacheService:
         Returns:
             Значение из кэша или None
         """
+        value, _ = await self._lookup(key, allow_stale=False)
+        return value
+    
+    async def get_entry(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Получить значение, в том числе истекшее не более CACHE_SWR_TTL назад
+        
+        Args:
+            key: Ключ для поиска
+            
+        Returns:
+            Значение или None и признак того, что оно устарело и его пора обновить
+        """
+        return await self._lookup(key, allow_stale=True)
+    
+    async def _lookup(self, key: str, allow_stale: bool) -> Tuple[Optional[Any], bool]:
+        """Найти запись в памяти, затем на втором уровне"""
+        started = time.perf_counter()
+        try:
+            entry = self.cache.get(key)
+            counter = "hits"
+            if entry is None and self.backend is not None:
+                entry = await self._read_backend(key)
+                counter = "backend_hits"
+            
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.time():
+                    self._stats[counter] += 1
+                    return value, False
+                if allow_stale:
+                    self._stats["stale_hits"] += 1
+                    return value, True
+            
+            self._stats["misses"] += 1
+            return None, False
+        except Exception as e:
+            logger.error(f"Ошибка получения из кэша {key}: {e}")
+            return None, False
+        finally:
+            self._latency.add(time.perf_counter() - started)
+    
+    async def _read_backend(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Прочитать запись второго уровня и поднять ее в память"""
+        started = time.perf_counter()
+        try:
+            entry = await self.backend.get(key, stale=self.swr_ttl > 0)
+        except Exception as e:
+            self._stats["backend_errors"] += 1
+            logger.error(f"Ошибка чтения второго уровня кэша {key}: {e}")
+            return None
+        finally:
+            self._backend_latency.add(time.perf_counter() - started)
+        
+        if entry is None or entry[1] + self.swr_ttl <= time.time():
+            return None
+        self._store(key, *entry)
+        return entry
+    
+    async def get_stale(self, key: str) -> Optional[Any]:
+        """
+        Получить значение, даже если оно истекло, но еще хранится на втором уровне
+        
+        Args:
+            key: Ключ для поиска
+            
+        Returns:
+            Значение или None
+        """
+        value, _ = await self.get_entry(key)
+        if value is not None or self.backend is None:
+            return value
+        
         try:
-            return self.cache.get(key)
+            entry = await self.backend.get(key, stale=True)
+            return entry[0] if entry is not None else None
         except Exception as e:
+            self._stats["backend_errors"] += 1
             logger.error(f"Ошибка получения из кэша {key}: {e}")
             return None
     
@@ -43,12 +217,22 @@ class CacheService:
         Returns:
             True если успешно, False иначе
         """
+        expires_at = time.time() + self.ttl
         try:
-            self.cache[key] = value
-            return True
+            self._store(key, value, expires_at)
+            self._stats["sets"] += 1
         except Exception as e:
             logger.error(f"Ошибка сохранения в кэш {key}: {e}")
             return False
+        
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, value, expires_at)
+            except Exception as e:
+                # Значение уже в памяти, потерян только второй уровень
+                self._stats["backend_errors"] += 1
+                logger.error(f"Ошибка сохранения во второй уровень кэша {key}: {e}")
+        return True
     
     async def delete(self, key: str) -> bool:
         """
@@ -61,8 +245,9 @@ class CacheService:
             True если успешно, False иначе
         """
         try:
-            if key in self.cache:
-                del self.cache[key]
+            self.cache.pop(key)
+            if self.backend is not None:
+                await self.backend.delete(key)
             return True
         except Exception as e:
             logger.error(f"Ошибка удаления из кэша {key}: {e}")
@@ -77,11 +262,19 @@ class CacheService:
         """
         try:
             self.cache.clear()
+            if self.backend is not None:
+                await self.backend.clear()
             return True
         except Exception as e:
             logger.error(f"Ошибка очистки кэша: {e}")
             return False
     
+    async def close(self):
+        """Закрыть второй уровень"""
+        if self.backend is not None:
+            await self.backend.close()
+            self.backend = None
+    
     def get_stats(self) -> dict:
         """
         Получить статистику кэша
@@ -89,8 +282,17 @@ class CacheService:
         Returns:
             Словарь со статистикой
         """
+        lookups = sum(self._stats[name] for name in ("hits", "backend_hits", "stale_hits", "misses"))
+        served = lookups - self._stats["misses"]
         return {
             "size": len(self.cache),
-            "maxsize": self.cache.maxsize,
-            "currsize": self.cache.currsize
-        }
\ No newline at end of file
+            "bytes": self.cache.currsize,
+            "max_bytes": self.cache.max_bytes,
+            **self._stats,
+            **self.cache.get_stats(),
+            "hit_ratio": round(served / lookups, 3) if lookups else None,
+            "get_p50": self._latency.percentile(0.5),
+            "get_p95": self._latency.percentile(0.95),
+            "backend_p95": self._backend_latency.percentile(0.95),
+            "backend": self.backend.get_stats() if self.backend is not None else None
+        }
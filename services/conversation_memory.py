@@ -0,0 +1,235 @@
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Роли храним кодом, а не строкой в каждой реплике
+ROLES = ("user", "assistant")
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+# Грубая оценка токенов без обращения к токенизатору: для русского
+# текста у YandexGPT выходит около трех символов на токен
+CHARS_PER_TOKEN = 3
+
+# Сколько вытесненных реплик копить перед сжатием в краткое содержание
+SUMMARY_BATCH = 4
+
+Turn = Tuple[int, str]
+Summarizer = Callable[[Optional[str], List[Dict]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Оценка числа токенов в тексте"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class _History:
+    """История одного чата: кольцевой буфер реплик и краткое содержание"""
+
+    __slots__ = ("turns", "summary", "evicted", "chars", "touched", "summarizing")
+
+    def __init__(self, max_turns: int):
+        self.turns: deque = deque(maxlen=max_turns)
+        self.summary: Optional[str] = None
+        # Реплики, вытесненные из буфера и еще не вошедшие в краткое содержание
+        self.evicted: List[Turn] = []
+        self.chars = 0
+        self.touched = time.monotonic()
+        self.summarizing = False
+
+
+class ConversationMemory:
+    """
+    Память диалогов с GPT по чатам
+
+    Каждый чат хранит последние max_turns реплик в кольцевом буфере.
+    Контекст запроса собирается от новых реплик к старым, пока хватает
+    бюджета токенов, старые отбрасываются. Если задан summarizer,
+    вытесненные из буфера реплики сжимаются в краткое содержание,
+    которое идет в контекст отдельной системной репликой.
+
+    Общий объем ограничен числом чатов и суммой символов: при
+    превышении и по простою вытесняются давно молчавшие чаты.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = None,
+        token_budget: int = None,
+        max_chats: int = None,
+        max_chars: int = None,
+        idle_ttl: float = None,
+        summarizer: Optional[Summarizer] = None
+    ):
+        self.max_turns = max_turns or Config.GPT_MEMORY_TURNS
+        self.token_budget = token_budget or Config.GPT_CONTEXT_TOKENS
+        self.max_chats = max_chats or Config.GPT_MEMORY_MAX_CHATS
+        self.max_chars = max_chars or Config.GPT_MEMORY_MAX_CHARS
+        self.idle_ttl = idle_ttl or Config.GPT_MEMORY_IDLE_TTL
+        self.summarizer = summarizer
+
+        # Чаты в порядке последнего обращения: давно молчавшие - в начале
+        self._chats: "OrderedDict[int, _History]" = OrderedDict()
+        self._chars = 0
+
+    def _touch(self, chat_id: int, create: bool = False) -> Optional[_History]:
+        """Найти историю чата и отметить обращение"""
+        history = self._chats.get(chat_id)
+        now = time.monotonic()
+        if history is not None and now - history.touched > self.idle_ttl:
+            self._drop(chat_id)
+            history = None
+
+        if history is None:
+            if not create:
+                return None
+            history = self._chats[chat_id] = _History(self.max_turns)
+
+        history.touched = now
+        self._chats.move_to_end(chat_id)
+        return history
+
+    def _drop(self, chat_id: int):
+        """Забыть чат"""
+        history = self._chats.pop(chat_id, None)
+        if history is not None:
+            self._chars -= history.chars
+
+    def _resize(self, history: _History, delta: int):
+        """Учесть изменение объема истории"""
+        history.chars += delta
+        self._chars += delta
+
+    def _enforce(self):
+        """Вытеснить простаивающие чаты и уложиться в общие лимиты"""
+        now = time.monotonic()
+        while self._chats:
+            chat_id, history = next(iter(self._chats.items()))
+            idle = now - history.touched > self.idle_ttl
+            over = len(self._chats) > self.max_chats or self._chars > self.max_chars
+            if not idle and not over:
+                break
+            self._drop(chat_id)
+
+    def append(self, chat_id: int, role: str, text: str):
+        """
+        Запомнить реплику
+
+        Args:
+            chat_id: ID чата
+            role: "user" или "assistant"
+            text: Текст реплики
+        """
+        history = self._touch(chat_id, create=True)
+
+        if len(history.turns) == history.turns.maxlen:
+            oldest = history.turns[0]
+            if self.summarizer is not None:
+                history.evicted.append(oldest)
+            else:
+                self._resize(history, -len(oldest[1]))
+
+        history.turns.append((ROLE_CODES[role], text))
+        self._resize(history, len(text))
+        self._enforce()
+
+    def context(self, chat_id: int, prompt: str) -> List[Dict]:
+        """
+        Контекст для запроса в пределах бюджета токенов
+
+        Args:
+            chat_id: ID чата
+            prompt: Новый запрос пользователя, его токены тоже входят в бюджет
+
+        Returns:
+            Сообщения для GPT от старых к новым
+        """
+        history = self._touch(chat_id)
+        if history is None:
+            return []
+
+        budget = self.token_budget - estimate_tokens(prompt)
+        head = []
+        if history.summary:
+            cost = estimate_tokens(history.summary)
+            if cost <= budget:
+                budget -= cost
+                head.append({
+                    "role": "system",
+                    "text": f"Краткое содержание предыдущего разговора: {history.summary}"
+                })
+
+        turns = []
+        for code, text in reversed(history.turns):
+            cost = estimate_tokens(text)
+            if cost > budget:
+                break
+            budget -= cost
+            turns.append({"role": ROLES[code], "text": text})
+
+        turns.reverse()
+        return head + turns
+
+    async def summarize(self, chat_id: int):
+        """
+        Сжать вытесненные реплики чата в краткое содержание
+
+        Ничего не делает без summarizer или пока вытесненных реплик мало.
+        """
+        if self.summarizer is None:
+            return
+
+        history = self._chats.get(chat_id)
+        if history is None or history.summarizing or len(history.evicted) < SUMMARY_BATCH:
+            return
+
+        batch = history.evicted
+        history.evicted = []
+        history.summarizing = True
+        try:
+            summary = await self.summarizer(
+                history.summary,
+                [{"role": ROLES[code], "text": text} for code, text in batch]
+            )
+        except Exception as e:
+            logger.error(f"Не удалось сжать историю чата {chat_id}: {e}")
+            # Реплики не теряем: попробуем вместе со следующими
+            history.evicted = batch + history.evicted
+            return
+        finally:
+            history.summarizing = False
+
+        if self._chats.get(chat_id) is not history:
+            # Чат вытеснили, пока шел запрос
+            return
+
+        old_chars = len(history.summary or "") + sum(len(text) for _, text in batch)
+        history.summary = summary
+        self._resize(history, len(summary) - old_chars)
+        self._enforce()
+
+    def clear(self, chat_id: int):
+        """
+        Забыть историю чата
+
+        Args:
+            chat_id: ID чата
+        """
+        self._drop(chat_id)
+
+    def get_stats(self) -> dict:
+        """
+        Получить статистику памяти
+
+        Returns:
+            Словарь со статистикой
+        """
+        return {
+            "chats": len(self._chats),
+            "max_chats": self.max_chats,
+            "chars": self._chars,
+            "max_chars": self.max_chars
+        }
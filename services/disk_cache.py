@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at);
+CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache (expires_at);
+"""
+
+SELECT_SQL = "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?"
+SELECT_STALE_SQL = "SELECT value, expires_at FROM cache WHERE key = ?"
+TOUCH_SQL = "UPDATE cache SET accessed_at = ? WHERE key = ?"
+UPSERT_SQL = (
+    "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at, size) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+DELETE_SQL = "DELETE FROM cache WHERE key = ?"
+EXPIRE_SQL = "DELETE FROM cache WHERE expires_at <= ?"
+SIZE_SQL = "SELECT COALESCE(SUM(size), 0) FROM cache"
+OLDEST_SQL = "SELECT key, size FROM cache ORDER BY accessed_at LIMIT ?"
+WARM_SQL = (
+    "SELECT key, value, expires_at FROM cache WHERE expires_at > ? "
+    "ORDER BY accessed_at DESC LIMIT ?"
+)
+
+# Как часто удалять истекшие записи (секунды)
+PURGE_INTERVAL = 60
+# При переполнении освобождаем место с запасом, чтобы не вытеснять на каждой записи
+EVICT_RATIO = 0.9
+EVICT_BATCH = 256
+
+
+class DiskCache:
+    """
+    Дисковый уровень кэша в SQLite
+
+    Хранит значения в JSON со сроком жизни каждой записи. Истекшие
+    записи еще stale_ttl секунд доступны через get(stale=True). Размер файла
+    базы ограничен max_bytes: при переполнении вытесняются давно не
+    читавшиеся записи, освобожденные страницы возвращаются файлу
+    через incremental vacuum. Методы синхронные и потокобезопасные.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None, stale_ttl: float = None):
+        self.path = path or Config.CACHE_DISK_PATH
+        self.max_bytes = max_bytes or Config.CACHE_DISK_MAX_BYTES
+        self.stale_ttl = Config.CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        # auto_vacuum действует только на новой базе, до создания таблиц
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Сумма размеров записей и во сколько раз файл больше нее (страницы, индексы)
+        self._bytes = self._conn.execute(SIZE_SQL).fetchone()[0]
+        self._overhead = self._used_bytes() / self._bytes if self._bytes else 1.0
+
+    def _used_bytes(self) -> int:
+        """Занятое место в файле базы без свободных страниц"""
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - freelist) * page_size
+
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        """Оценка места, занимаемого записью"""
+        return len(key.encode("utf-8")) + len(value.encode("utf-8"))
+
+    def get(self, key: str, stale: bool = False) -> Optional[Tuple[Any, float]]:
+        """
+        Прочитать значение
+
+        Args:
+            key: Ключ
+            stale: Вернуть и истекшую, но еще хранящуюся запись
+
+        Returns:
+            Пара (значение, срок годности) или None
+        """
+        now = time.time()
+        with self._lock:
+            if stale:
+                row = self._conn.execute(SELECT_STALE_SQL, (key,)).fetchone()
+            else:
+                row = self._conn.execute(SELECT_SQL, (key, now)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(TOUCH_SQL, (now, key))
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float):
+        """
+        Записать значение
+
+        Args:
+            key: Ключ
+            value: Значение, сериализуемое в JSON
+            expires_at: Срок годности по time.time()
+        """
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(UPSERT_SQL, (key, data, expires_at, now, self._entry_size(key, data)))
+            # Оценка сверху: перезапись ключа не вычитаем, точную сумму берем при вытеснении
+            self._bytes += self._entry_size(key, data)
+
+            if now - self._last_purge >= PURGE_INTERVAL:
+                self._purge(now)
+            if self._bytes * self._overhead > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str):
+        """Удалить значение"""
+        with self._lock:
+            self._conn.execute(DELETE_SQL, (key,))
+
+    def clear(self):
+        """Удалить все значения"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.executescript("PRAGMA incremental_vacuum;")
+            self._bytes = 0
+
+    def purge(self):
+        """Удалить истекшие записи"""
+        with self._lock:
+            self._purge(time.time())
+
+    def _purge(self, now: float):
+        """Удалить истекшие записи под блокировкой"""
+        self._last_purge = now
+        if self._conn.execute(EXPIRE_SQL, (now - self.stale_ttl,)).rowcount:
+            self._bytes = self._conn.execute(SIZE_SQL).fetchone()[0]
+
+    def _evict(self):
+        """Вытеснить давно не читавшиеся записи под блокировкой"""
+        # Счетчик мог разойтись с базой: ее делят несколько процессов
+        self._bytes = self._conn.execute(SIZE_SQL).fetchone()[0]
+        if self._bytes:
+            self._overhead = max(self._used_bytes() / self._bytes, 1.0)
+        target = self.max_bytes * EVICT_RATIO / self._overhead
+        removed = 0
+
+        while self._bytes > target:
+            batch = self._conn.execute(OLDEST_SQL, (EVICT_BATCH,)).fetchall()
+            if not batch:
+                break
+            victims = []
+            for key, size in batch:
+                if self._bytes <= target:
+                    break
+                victims.append((key,))
+                self._bytes -= size
+            self._conn.executemany(DELETE_SQL, victims)
+            removed += len(victims)
+
+        if removed:
+            self._conn.executescript("PRAGMA incremental_vacuum;")
+            logger.info(f"Из дискового кэша вытеснено {removed} записей")
+
+    def hottest(self, limit: int) -> List[Tuple[str, Any, float]]:
+        """
+        Недавно читавшиеся живые записи для прогрева памяти
+
+        Args:
+            limit: Максимум записей
+
+        Returns:
+            Список (ключ, значение, срок годности)
+        """
+        with self._lock:
+            rows = self._conn.execute(WARM_SQL, (time.time(), limit)).fetchall()
+        return [(key, json.loads(value), expires_at) for key, value, expires_at in rows]
+
+    def get_stats(self) -> dict:
+        """
+        Получить статистику дискового уровня
+
+        Returns:
+            Словарь со статистикой
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {
+            "entries": entries,
+            "bytes": self._bytes,
+            "used_bytes": round(self._bytes * self._overhead),
+            "max_bytes": self.max_bytes,
+            "file_size": os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        }
+
+    def close(self):
+        """Закрыть базу"""
+        with self._lock:
+            self._conn.close()
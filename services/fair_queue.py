@@ -0,0 +1,148 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict
+from config.config import Config
+from services.upstream import LatencyWindow
+
+
+class QueueRejected(Exception):
+    """Запрос не принят в очередь или снят с нее по сроку"""
+
+    FULL = "full"
+    USER_LIMIT = "user_limit"
+    DEADLINE = "deadline"
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class FairQueue:
+    """
+    Очередь запросов к GPT со справедливостью между пользователями
+
+    Выдает слоты обработки по кругу: по одному запросу от каждого
+    пользователя, у которого есть ожидающие, поэтому один активный
+    пользователь не задерживает остальных. Число слотов берется из
+    capacity() при каждой выдаче, что позволяет следовать адаптивному
+    лимиту апстрима.
+
+    Переполненная очередь сразу отказывает, запрос, не дождавшийся
+    слота за deadline секунд, снимается с очереди.
+    """
+
+    def __init__(
+        self,
+        capacity: Callable[[], int],
+        max_depth: int = None,
+        max_per_user: int = None,
+        deadline: float = None
+    ):
+        self.capacity = capacity
+        self.max_depth = max_depth or Config.GPT_QUEUE_MAX_DEPTH
+        self.max_per_user = max_per_user or Config.GPT_QUEUE_MAX_PER_USER
+        self.deadline = deadline or Config.GPT_QUEUE_DEADLINE
+
+        # Пользователь -> его ожидающие запросы; порядок ключей задает круг
+        self._waiting: "OrderedDict[int, deque]" = OrderedDict()
+        self._depth = 0
+        self._active = 0
+        self._wait = LatencyWindow()
+        self._stats = {"admitted": 0, "rejected": 0, "shed": 0}
+
+    def _dispatch(self):
+        """Выдать свободные слоты по кругу пользователей"""
+        while self._waiting and self._active < max(self.capacity(), 1):
+            user_id, waiters = next(iter(self._waiting.items()))
+            future = waiters.popleft()
+            self._depth -= 1
+            if waiters:
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+
+            if future.done():
+                # wait_for уже снял ожидание по сроку или отмене, но _remove еще не успел
+                continue
+            self._active += 1
+            future.set_result(None)
+
+    def _remove(self, user_id: int, future: asyncio.Future):
+        """Убрать ожидающий запрос из очереди"""
+        waiters = self._waiting.get(user_id)
+        if waiters is None or future not in waiters:
+            return
+        waiters.remove(future)
+        self._depth -= 1
+        if not waiters:
+            del self._waiting[user_id]
+
+    def _release(self):
+        """Освободить слот"""
+        self._active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user_id: int) -> AsyncIterator[None]:
+        """
+        Дождаться своей очереди на запрос к GPT
+
+        Args:
+            user_id: ID пользователя
+
+        Raises:
+            QueueRejected: Очередь переполнена или слот не выдан до срока
+        """
+        waiters = self._waiting.get(user_id)
+        if self._depth >= self.max_depth:
+            self._stats["rejected"] += 1
+            raise QueueRejected(QueueRejected.FULL)
+        if waiters is not None and len(waiters) >= self.max_per_user:
+            self._stats["rejected"] += 1
+            raise QueueRejected(QueueRejected.USER_LIMIT)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(future)
+        self._depth += 1
+        self._stats["admitted"] += 1
+        queued_at = time.monotonic()
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(future, self.deadline)
+        except asyncio.TimeoutError:
+            self._remove(user_id, future)
+            self._stats["shed"] += 1
+            raise QueueRejected(QueueRejected.DEADLINE)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Слот выдали одновременно с отменой
+                self._release()
+            else:
+                self._remove(user_id, future)
+            raise
+
+        self._wait.add(time.monotonic() - queued_at)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def get_stats(self) -> Dict:
+        """
+        Получить статистику очереди
+
+        Returns:
+            Словарь со статистикой
+        """
+        return {
+            **self._stats,
+            "depth": self._depth,
+            "users": len(self._waiting),
+            "active": self._active,
+            "capacity": self.capacity(),
+            "wait_p50": self._wait.percentile(0.5),
+            "wait_p95": self._wait.percentile(0.95)
+        }
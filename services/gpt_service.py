@@ -1,11 +1,55 @@
-import requests
+import asyncio
+import hashlib
+import httpx
+import json
 import logging
-from typing import List, Dict, Optional
+import time
+from contextlib import nullcontext
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
 from config.config import Config
 from services.cache_service import CacheService
+from services.fair_queue import FairQueue, QueueRejected
+from services.metrics import REGISTRY
+from services.prompt_index import PromptIndex, normalize_prompt
+from services.single_flight import SingleFlight
+from services.upstream import AdaptiveLimiter, CircuitBreaker, LatencyWindow, UpstreamUnavailable
 
 logger = logging.getLogger(__name__)
 
+CACHE_PREFIX = "gpt:"
+# Ответы с контекстом диалога кэшируются отдельно: ключ включает хеш контекста
+CONTEXT_CACHE_PREFIX = "gptctx:"
+
+# Ответ, когда GPT недоступен и в кэше ничего нет
+FALLBACK_REPLY = "🤖 Сервис ответов сейчас перегружен. Попробуйте, пожалуйста, через минуту."
+
+SUMMARY_PROMPT = (
+    "Сожми диалог пользователя с ассистентом в краткое содержание на русском языке, "
+    "сохранив факты, имена и договоренности, нужные для продолжения разговора. "
+    "Не больше 5 предложений."
+)
+
+GPT_REQUEST_DURATION = REGISTRY.histogram(
+    "gpt_request_duration_seconds",
+    "Время HTTP-запросов к YandexGPT (в потоковом режиме - до начала ответа)",
+    ["mode", "status"]
+)
+
+
+def status_label(response: httpx.Response) -> str:
+    """Класс ответа для метрик: 2xx, 4xx, 429, 5xx"""
+    if response.status_code == 429:
+        return "429"
+    return f"{response.status_code // 100}xx"
+
+
+class GPTUnavailableError(Exception):
+    """GPT недоступен и готового ответа нет; reply - текст для пользователя"""
+    
+    def __init__(self, reply: str = FALLBACK_REPLY):
+        super().__init__(reply)
+        self.reply = reply
+
 
 class GPTService:
     """Сервис для работы с YandexGPT"""
@@ -16,29 +60,283 @@ class GPTService:
         self.folder_id = Config.YANDEX_FOLDER_ID
         self.model = Config.YANDEX_GPT_MODEL
         self.endpoint = Config.YANDEX_ENDPOINT
+        # Одинаковые одновременные запросы идут в GPT один раз
+        self.single_flight = SingleFlight()
+        
+        # Защита апстрима: при деградации YandexGPT быстро отказываем, а не ждем таймаутов
+        self.limiter = AdaptiveLimiter(
+            initial=Config.GPT_CONCURRENCY_INITIAL,
+            min_limit=Config.GPT_CONCURRENCY_MIN,
+            max_limit=Config.GPT_CONCURRENCY_MAX,
+            latency_target=Config.GPT_LATENCY_TARGET
+        )
+        self.breaker = CircuitBreaker(
+            threshold=Config.GPT_BREAKER_THRESHOLD,
+            window=Config.GPT_BREAKER_WINDOW,
+            cooldown=Config.GPT_BREAKER_COOLDOWN
+        )
+        self.latency = LatencyWindow()
+        self._hedged = 0
+        # Запросы пользователей к апстриму выдаются по кругу в пределах адаптивного лимита
+        self.queue = FairQueue(capacity=lambda: int(self.limiter.limit))
+        # Фоновые обновления устаревших ответов
+        self._revalidations = set()
+        self._revalidated = 0
+        
+        # Индекс похожих запросов живет ровно столько, сколько их ответы в кэше
+        self.prompt_index = None
+        if Config.GPT_CACHE_FUZZY:
+            self.prompt_index = PromptIndex(
+                threshold=Config.GPT_CACHE_SIMILARITY,
+                max_entries=self.cache.cache.expected_entries
+            )
+            self.cache.add_eviction_listener(self.prompt_index.remove)
+            # Записи, прогретые с диска, тоже ищутся по сходству
+            for key in self.cache.keys():
+                if key.startswith(CACHE_PREFIX):
+                    self.prompt_index.add(key, key[len(CACHE_PREFIX):])
+        
+        # Общий пул соединений с keep-alive на все запросы
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                connect=Config.GPT_CONNECT_TIMEOUT,
+                read=Config.GPT_READ_TIMEOUT,
+                write=Config.GPT_WRITE_TIMEOUT,
+                pool=Config.GPT_POOL_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=Config.GPT_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.GPT_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=Config.GPT_KEEPALIVE_EXPIRY
+            )
+        )
     
-    async def generate_response(self, prompt: str, context: List[Dict] = None) -> Optional[str]:
+    async def close(self):
+        """Закрыть пул соединений и кэш"""
+        for task in list(self._revalidations):
+            task.cancel()
+        await asyncio.gather(*self._revalidations, return_exceptions=True)
+        await self.client.aclose()
+        await self.cache.close()
+    
+    async def generate_response(
+        self,
+        prompt: str,
+        context: List[Dict] = None,
+        user_id: Optional[int] = None
+    ) -> Optional[str]:
         """
         Генерирует ответ с помощью YandexGPT
         
         Args:
             prompt: Текст запроса
             context: Контекст предыдущих сообщений
+            user_id: ID пользователя для очереди к апстриму, None - без очереди
             
         Returns:
             Ответ от GPT или None в случае ошибки
-        """
-        if context is None:
-            context = []
             
-        # Проверяем кэш
-        cache_key = f"gpt:{prompt}"
-        cached_response = await self.cache.get(cache_key)
+        Raises:
+            GPTUnavailableError: GPT недоступен и ответа нет даже в устаревшем кэше
+            QueueRejected: Запрос к апстриму не принят в очередь
+        """
+        cache_key, cached_response = await self._lookup(prompt, context)
         if cached_response:
             return cached_response
         
-        # Формируем сообщения
+        messages = self._messages(prompt, context)
+        try:
+            return await self._coalesced(cache_key, lambda: self._request(messages, cache_key, user_id=user_id))
+        except UpstreamUnavailable as e:
+            return await self._fallback(cache_key, e)
+    
+    async def stream_response(
+        self,
+        prompt: str,
+        context: List[Dict] = None,
+        user_id: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        Генерирует ответ в потоковом режиме YandexGPT
+        
+        Каждый элемент - весь текст ответа на данный момент, последний -
+        окончательный ответ. Готовый ответ из кэша выдается сразу. Если
+        такой же запрос уже выполняется, ждем его результата.
+        
+        Args:
+            prompt: Текст запроса
+            context: Контекст предыдущих сообщений
+            user_id: ID пользователя для очереди к апстриму, None - без очереди
+            
+        Yields:
+            Нарастающий текст ответа
+            
+        Raises:
+            GPTUnavailableError: GPT недоступен и ответа нет даже в устаревшем кэше
+            QueueRejected: Запрос к апстриму не принят в очередь
+        """
+        cache_key, cached_response = await self._lookup(prompt, context)
+        if cached_response:
+            yield cached_response
+            return
+        
+        messages = self._messages(prompt, context)
+        partials: asyncio.Queue = asyncio.Queue()
+        # Частичные ответы приходят, только если этот вызов ведущий
+        result = asyncio.ensure_future(self._coalesced(
+            cache_key,
+            lambda: self._request(messages, cache_key, on_partial=partials.put_nowait, user_id=user_id)
+        ))
+        partial = None
+        try:
+            while True:
+                partial = asyncio.ensure_future(partials.get())
+                done, _ = await asyncio.wait({partial, result}, return_when=asyncio.FIRST_COMPLETED)
+                if partial not in done:
+                    break
+                yield partial.result()
+            try:
+                answer = result.result()
+            except UpstreamUnavailable as e:
+                answer = await self._fallback(cache_key, e)
+            yield answer
+        finally:
+            partial.cancel()
+            result.cancel()
+    
+    async def _coalesced(self, cache_key: str, request: Callable[[], Awaitable[str]]) -> str:
+        """
+        Выполнить запрос или дождаться такого же, уже идущего
+        
+        Слот очереди берет ведущий вызов под своим пользователем, поэтому
+        отказ очереди касается только его: присоединившиеся вызовы
+        повторяют попытку, и один из них становится ведущим.
+        
+        Args:
+            cache_key: Ключ кэша запроса
+            request: Фабрика корутины запроса от имени этого вызова
+            
+        Returns:
+            Ответ от GPT
+        """
+        while True:
+            led = False
+            
+            def lead() -> Awaitable[str]:
+                nonlocal led
+                led = True
+                return request()
+            
+            try:
+                return await self.single_flight.do(cache_key, lead)
+            except QueueRejected:
+                if led:
+                    raise
+    
+    async def _fallback(self, cache_key: str, error: UpstreamUnavailable) -> str:
+        """
+        Ответ при недоступном GPT: устаревший ответ из кэша или отказ
+        
+        Raises:
+            GPTUnavailableError: Если в кэше ничего нет
+        """
+        stale = await self.cache.get_stale(cache_key)
+        if stale:
+            logger.warning(f"GPT недоступен ({error}), отвечаем из устаревшего кэша")
+            return stale
+        raise GPTUnavailableError()
+    
+    async def summarize(self, summary: Optional[str], turns: List[Dict]) -> str:
+        """
+        Сжать реплики диалога в краткое содержание
+        
+        Args:
+            summary: Прежнее краткое содержание
+            turns: Реплики, которые нужно добавить к нему
+            
+        Returns:
+            Новое краткое содержание
+        """
+        dialog = "\n".join(f"{turn['role']}: {turn['text']}" for turn in turns)
+        if summary:
+            dialog = f"Прежнее краткое содержание: {summary}\n{dialog}"
+        
         messages = [
+            {"role": "system", "text": SUMMARY_PROMPT},
+            {"role": "user", "text": dialog}
+        ]
+        return await self._request(messages)
+    
+    @staticmethod
+    def _cache_key(normalized: str, context: Optional[List[Dict]]) -> str:
+        """Ключ кэша: без контекста - сам запрос, с контекстом - еще и хеш контекста"""
+        if not context:
+            return f"{CACHE_PREFIX}{normalized}"
+        
+        digest = hashlib.sha1(
+            json.dumps(context, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return f"{CONTEXT_CACHE_PREFIX}{digest}:{normalized}"
+    
+    async def _lookup(self, prompt: str, context: Optional[List[Dict]] = None) -> Tuple[str, Optional[str]]:
+        """
+        Найти готовый ответ в кэше
+        
+        Args:
+            prompt: Текст запроса
+            context: Контекст предыдущих сообщений
+            
+        Returns:
+            Ключ кэша запроса и найденный ответ или None
+        """
+        # Проверяем кэш по нормализованному запросу, затем по похожим
+        normalized = normalize_prompt(prompt)
+        cache_key = self._cache_key(normalized, context)
+        cached_response, stale = await self.cache.get_entry(cache_key)
+        if cached_response:
+            if stale:
+                self._revalidate(cache_key, self._messages(prompt, context))
+            return cache_key, cached_response
+        
+        # Похожие запросы ищем только без контекста: ответ зависит от диалога
+        if self.prompt_index is not None and not context:
+            similar_key = self.prompt_index.find(normalized)
+            if similar_key is not None:
+                cached_response = await self.cache.get(similar_key)
+                if cached_response:
+                    return cache_key, cached_response
+        
+        return cache_key, None
+    
+    def _revalidate(self, cache_key: str, messages: List[Dict]):
+        """Обновить устаревший ответ в кэше в фоне"""
+        # При открытом автомате запрос заведомо не пройдет, устаревший ответ лучше
+        if self.breaker.state == CircuitBreaker.OPEN:
+            return
+        
+        task = asyncio.ensure_future(
+            self.single_flight.do(cache_key, lambda: self._request(messages, cache_key))
+        )
+        self._revalidations.add(task)
+        task.add_done_callback(self._revalidation_done)
+    
+    def _revalidation_done(self, task: asyncio.Future):
+        """Учесть завершение фонового обновления"""
+        self._revalidations.discard(task)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.warning(f"Не удалось обновить устаревший ответ в кэше: {task.exception()}")
+        else:
+            self._revalidated += 1
+    
+    @staticmethod
+    def _messages(prompt: str, context: Optional[List[Dict]]) -> List[Dict]:
+        """Сообщения диалога для запроса"""
+        if context is None:
+            context = []
+        
+        return [
             {
                 "role": "system",
                 "text": "Ты - полезный ассистент в чат-боте. Отвечай кратко и по делу."
@@ -49,11 +347,36 @@ class GPTService:
                 "text": prompt
             }
         ]
+    
+    async def _request(
+        self,
+        messages: List[Dict],
+        cache_key: Optional[str] = None,
+        on_partial: Optional[Callable[[str], None]] = None,
+        user_id: Optional[int] = None
+    ) -> str:
+        """
+        Запрос к YandexGPT с сохранением ответа в кэш
         
+        Args:
+            messages: Сообщения диалога
+            cache_key: Ключ кэша для ответа, None - не кэшировать
+            on_partial: Если задан, запрос идет в потоковом режиме и
+                получает нарастающий текст ответа
+            user_id: ID пользователя, чей запрос ждет слота в очереди;
+                None - служебный запрос без очереди
+            
+        Returns:
+            Ответ от GPT
+            
+        Raises:
+            QueueRejected: Запрос не принят в очередь
+        """
         # Подготавливаем данные для запроса
         payload = {
             "modelUri": f"gpt://{self.folder_id}/{self.model}",
             "completionOptions": {
+                "stream": on_partial is not None,
                 "temperature": 0.3,
                 "maxTokens": 200
             },
@@ -66,30 +389,194 @@ class GPTService:
             "Content-Type": "application/json"
         }
         
+        # Очередь держим только на время обращения к апстриму
+        slot = self.queue.slot(user_id) if user_id is not None else nullcontext()
         try:
-            response = requests.post(
-                self.endpoint,
-                json=payload,
-                headers=headers,
-                timeout=5
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            answer = result["result"]["alternatives"][0]["message"]["text"]
+            async with slot:
+                if on_partial is None:
+                    result = await self._post(payload, headers)
+                    answer = result["result"]["alternatives"][0]["message"]["text"]
+                else:
+                    answer = await self._stream(payload, headers, on_partial)
             
             # Сохраняем в кэш
-            await self.cache.set(cache_key, answer)
+            if cache_key is not None and await self.cache.set(cache_key, answer):
+                # W-TinyLFU мог не принять запись или уже вытеснить ее: индексируем только то, что в памяти
+                if (
+                    self.prompt_index is not None
+                    and cache_key.startswith(CACHE_PREFIX)
+                    and cache_key in self.cache.cache
+                ):
+                    self.prompt_index.add(cache_key, cache_key[len(CACHE_PREFIX):])
             return answer
             
-        except requests.exceptions.RequestException as e:
+        except (UpstreamUnavailable, QueueRejected):
+            raise
+        except httpx.HTTPError as e:
             logger.error(f"Ошибка запроса к GPT: {e}")
-            if hasattr(e, 'response') and e.response is not None:
+            if isinstance(e, httpx.HTTPStatusError):
                 logger.error(f"Ответ сервера: {e.response.text}")
-            raise Exception("Не удалось получить ответ от GPT")
-        except (KeyError, IndexError) as e:
+                if not self._overloaded(e.response):
+                    raise Exception("Не удалось получить ответ от GPT")
+            # Сбой или перегрузка апстрима: вызывающий ответит из кэша или заглушкой
+            raise UpstreamUnavailable("Не удалось получить ответ от GPT")
+        except (KeyError, IndexError, ValueError) as e:
             logger.error(f"Ошибка обработки ответа GPT: {e}")
             raise Exception("Неверный формат ответа от GPT")
         except Exception as e:
             logger.error(f"Неожиданная ошибка в GPT сервисе: {e}")
-            raise Exception("Произошла внутренняя ошибка")
\ No newline at end of file
+            raise Exception("Произошла внутренняя ошибка")
+    
+    async def _stream(self, payload: Dict, headers: Dict, on_partial: Callable[[str], None]) -> str:
+        """
+        Потоковый запрос: ответ приходит строками JSON, в каждой - весь текст на данный момент
+        
+        Returns:
+            Окончательный текст ответа
+        """
+        answer = None
+        await self._enter()
+        started = time.monotonic()
+        latency, ok = None, None
+        status = "cancelled"
+        try:
+            async with self.client.stream("POST", self.endpoint, json=payload, headers=headers) as response:
+                # Для лимита важна задержка до начала ответа, а не длина генерации
+                latency = time.monotonic() - started
+                ok = not self._overloaded(response)
+                status = status_label(response)
+                if response.is_error:
+                    # Тело ошибки нужно прочитать до выхода из потока, чтобы его залогировать
+                    await response.aread()
+                response.raise_for_status()
+                
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    answer = chunk["result"]["alternatives"][0]["message"]["text"]
+                    on_partial(answer)
+        except httpx.TransportError:
+            ok = False
+            if latency is None:
+                status = "transport_error"
+            raise
+        finally:
+            latency = time.monotonic() - started if latency is None else latency
+            await self._settle(latency, ok)
+            GPT_REQUEST_DURATION.labels("stream", status).observe(latency)
+        
+        if answer is None:
+            raise ValueError("Пустой потоковый ответ")
+        return answer
+    
+    async def _post(self, payload: Dict, headers: Dict) -> Dict:
+        """
+        Обычный запрос с дублированием
+        
+        Если ответа нет дольше p95 недавних запросов и лимит позволяет,
+        отправляет такой же второй запрос и берет первый успешный ответ.
+        """
+        if not Config.GPT_HEDGE:
+            return await self._attempt(payload, headers)
+        
+        primary = asyncio.ensure_future(self._attempt(payload, headers))
+        pending = {primary}
+        try:
+            delay = max(self.latency.percentile(0.95) or 0, Config.GPT_HEDGE_MIN_DELAY)
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            # Дублируем только при замкнутом автомате и свободном слоте
+            if not done and self.breaker.state == CircuitBreaker.CLOSED and self.limiter.try_acquire():
+                self._hedged += 1
+                pending.add(asyncio.ensure_future(self._attempt(payload, headers, acquired=True)))
+            
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _attempt(self, payload: Dict, headers: Dict, acquired: bool = False) -> Dict:
+        """
+        Одна попытка обычного запроса через автомат и лимит
+        
+        Args:
+            acquired: Слот лимита уже занят вызывающим
+        """
+        await self._enter(acquired)
+        started = time.monotonic()
+        ok = None
+        # Проигравший дубль отменяется до ответа
+        status = "cancelled"
+        try:
+            response = await self.client.post(
+                self.endpoint,
+                json=payload,
+                headers=headers
+            )
+            ok = not self._overloaded(response)
+            status = status_label(response)
+            response.raise_for_status()
+            return response.json()
+        except httpx.TransportError:
+            ok = False
+            status = "transport_error"
+            raise
+        finally:
+            latency = time.monotonic() - started
+            await self._settle(latency, ok)
+            GPT_REQUEST_DURATION.labels("complete", status).observe(latency)
+    
+    async def _enter(self, acquired: bool = False):
+        """
+        Занять слот лимита и пройти автомат
+        
+        Raises:
+            UpstreamUnavailable: Автомат разомкнут или слот не освободился
+        """
+        if not acquired:
+            await self.limiter.acquire(Config.GPT_POOL_TIMEOUT)
+        
+        # Автомат проверяем после ожидания слота: за это время он мог разомкнуться
+        if not self.breaker.allow():
+            await self.limiter.release(0, None)
+            raise UpstreamUnavailable("автомат разомкнут")
+    
+    async def _settle(self, latency: float, ok: Optional[bool]):
+        """Освободить слот и учесть результат в лимите, автомате и перцентилях"""
+        await self.limiter.release(latency, ok)
+        self.breaker.record(ok)
+        if ok:
+            self.latency.add(latency)
+    
+    @staticmethod
+    def _overloaded(response: httpx.Response) -> bool:
+        """Ответ говорит о перегрузке апстрима"""
+        return response.status_code == 429 or response.status_code >= 500
+    
+    def get_stats(self) -> dict:
+        """
+        Получить статистику сервиса
+        
+        Returns:
+            Словарь со статистикой кэша, объединения запросов и защиты апстрима
+        """
+        return {
+            "cache": self.cache.get_stats(),
+            "single_flight": self.single_flight.get_stats(),
+            "prompt_index": self.prompt_index.get_stats() if self.prompt_index is not None else None,
+            "revalidations": {"in_flight": len(self._revalidations), "done": self._revalidated},
+            "upstream": {
+                **self.limiter.get_stats(),
+                "breaker": self.breaker.get_stats(),
+                "p50": self.latency.percentile(0.5),
+                "p95": self.latency.percentile(0.95),
+                "hedged": self._hedged
+            }
+        }
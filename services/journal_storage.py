@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import List, Dict
+from config.config import Config
+from services.storage import Storage, DATA_DIR, DATA_FILE
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = os.path.join(DATA_DIR, "notifications.snapshot.json")
+LOG_FILE = os.path.join(DATA_DIR, "notifications.log")
+ROTATED_LOG_FILE = LOG_FILE + ".1"
+
+
+class JournalStorage(Storage):
+    """
+    Хранилище напоминаний на основе журнала.
+
+    Каждое изменение дописывается одной компактной строкой в лог,
+    а фоновая компакция периодически сворачивает лог в снапшот.
+    При запуске состояние восстанавливается из снапшота и лога.
+    """
+
+    def __init__(self):
+        self.compact_threshold = Config.JOURNAL_COMPACT_THRESHOLD
+        self.fsync = Config.JOURNAL_FSYNC
+        self._compaction_lock = threading.Lock()
+        self._log_records = 0
+        self._log = None
+        self._buffer: List[Dict] = []
+        super().__init__()
+
+    def _ensure_storage(self):
+        """Создать директорию если ее нет"""
+        if not os.path.exists(DATA_DIR):
+            os.makedirs(DATA_DIR)
+
+    def _load(self):
+        """Восстановить состояние из снапшота и лога"""
+        imported = False
+        if os.path.exists(SNAPSHOT_FILE):
+            items = self._read_snapshot()
+        elif os.path.exists(DATA_FILE):
+            # Первый запуск: импортируем старый notifications.json
+            items = self._read_data()
+            imported = True
+            logger.info(f"Импортировано {len(items)} напоминаний из {DATA_FILE}")
+        else:
+            items = []
+
+        for n in items:
+            self._index.add(n)
+
+        for path in (ROTATED_LOG_FILE, LOG_FILE):
+            self._log_records += self._replay(path)
+
+        self._log = open(LOG_FILE, 'ab')
+
+        # Незавершенная компакция или импорт - сразу фиксируем снапшот
+        if imported or os.path.exists(ROTATED_LOG_FILE):
+            self.compact()
+
+    def data_files(self) -> List[str]:
+        """Снапшот и лог"""
+        return [SNAPSHOT_FILE, LOG_FILE]
+
+    def _read_snapshot(self) -> List[Dict]:
+        """Прочитать снапшот"""
+        try:
+            with open(SNAPSHOT_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Ошибка чтения снапшота: {e}")
+            return []
+
+    def _replay(self, path: str) -> int:
+        """
+        Применить записи лога к состоянию в памяти
+
+        Args:
+            path: Путь к файлу лога
+
+        Returns:
+            Количество примененных записей
+        """
+        if not os.path.exists(path):
+            return 0
+
+        count = 0
+        offset = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("оборванная запись")
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    # Падение посреди записи: отбрасываем хвост лога
+                    logger.warning(f"Поврежденный хвост журнала {path} на смещении {offset}: {e}")
+                    break
+                offset += len(line)
+                count += 1
+
+        if offset < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+
+        return count
+
+    def _apply(self, record: Dict):
+        """Применить одну запись журнала"""
+        op = record["op"]
+        if op == "add":
+            self._index.add(record["n"])
+        elif op == "sent":
+            self._index.mark_sent(record["id"])
+        elif op == "del":
+            self._index.remove(record["id"])
+        elif op == "batch":
+            for item in record["ops"]:
+                self._apply(item)
+        else:
+            raise ValueError(f"неизвестная операция {op}")
+
+    def _append(self, record: Dict):
+        """Применить запись и поставить ее в очередь на запись в журнал"""
+        with self._lock:
+            self._apply(record)
+            self._buffer.append(record)
+            self._log_records += 1
+
+            if self._log_records >= self.compact_threshold:
+                self._start_compaction()
+
+    def _insert(self, notification: Dict):
+        """Добавить напоминание в горячий набор"""
+        self._append({"op": "add", "n": notification})
+
+    def _remove(self, notification_id: str) -> bool:
+        """Убрать напоминание из горячего набора"""
+        if notification_id not in self._index:
+            return False
+        self._append({"op": "del", "id": notification_id})
+        return True
+
+    def flush(self):
+        """
+        Дописать архив и накопленные записи в журнал одним fsync
+
+        Несколько записей пишутся одной строкой-пакетом, поэтому
+        оборванный хвост не может применить пакет частично.
+        """
+        with self._lock:
+            self._flush_archive()
+            if not self._buffer:
+                return
+
+            if len(self._buffer) == 1:
+                record = self._buffer[0]
+            else:
+                record = {"op": "batch", "ops": self._buffer}
+            line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+
+            self._log.write(line.encode('utf-8'))
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            self._buffer = []
+
+    def _start_compaction(self):
+        """Запустить компакцию в фоновом потоке"""
+        if self._compaction_lock.locked():
+            return
+
+        threading.Thread(
+            target=self.compact,
+            name="journal-compaction",
+            daemon=True
+        ).start()
+
+    def compact(self):
+        """Свернуть журнал в снапшот"""
+        with self._compaction_lock:
+            try:
+                with self._lock:
+                    self.flush()
+                    snapshot = [dict(n) for n in self._index.all()]
+
+                    # Переключаемся на новый лог, старый удалим после записи снапшота
+                    self._log.close()
+                    if os.path.exists(ROTATED_LOG_FILE):
+                        with open(ROTATED_LOG_FILE, 'ab') as dst, open(LOG_FILE, 'rb') as src:
+                            shutil.copyfileobj(src, dst)
+                        os.remove(LOG_FILE)
+                    else:
+                        os.replace(LOG_FILE, ROTATED_LOG_FILE)
+                    self._log = open(LOG_FILE, 'ab')
+                    self._log_records = 0
+
+                tmp_file = SNAPSHOT_FILE + ".tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, SNAPSHOT_FILE)
+                os.remove(ROTATED_LOG_FILE)
+
+                logger.info(f"Журнал свернут в снапшот: {len(snapshot)} напоминаний")
+            except Exception as e:
+                logger.error(f"Ошибка компакции журнала: {e}")
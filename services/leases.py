@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Collection, Dict, FrozenSet, Iterator, Optional
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduler_instances (
+    instance_id TEXT PRIMARY KEY,
+    heartbeat_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    partition INTEGER PRIMARY KEY,
+    owner TEXT,
+    expires_at REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+def partition_of(chat_id: int, partitions: int = None) -> int:
+    """
+    Партиция чата
+
+    Args:
+        chat_id: ID чата
+        partitions: Количество партиций
+
+    Returns:
+        Номер партиции
+    """
+    return abs(chat_id) % (partitions or Config.SCHEDULER_PARTITIONS)
+
+
+class LeaseManager:
+    """
+    Аренда партиций напоминаний между экземплярами планировщика
+
+    Пространство напоминаний делится на партиции по chatId. Каждый
+    экземпляр держит продлеваемую аренду на свою долю партиций
+    (ceil(партиций / живых экземпляров)) в общей SQLite базе. Лишние
+    партиции отпускаются, освободившиеся и просроченные - забираются.
+    Локально аренда считается потерянной раньше, чем истекает в базе,
+    поэтому два экземпляра не отправляют напоминания одной партиции.
+    Партиции, пачка которых отправлена, но еще не записана в хранилище,
+    удерживаются (hold) и отпускаются только на следующем продлении.
+    """
+
+    def __init__(self, path: str = None, partitions: int = None, ttl: float = None, instance_id: str = None):
+        self.path = path or Config.SQLITE_PATH
+        self.partitions = partitions or Config.SCHEDULER_PARTITIONS
+        self.ttl = ttl or Config.SCHEDULER_LEASE_TTL
+        self.renew_interval = self.ttl / 3
+        self.instance_id = instance_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        # Партиция -> локальный срок аренды по time.monotonic()
+        self._owned: Dict[int, float] = {}
+        # Партиция -> число пачек, еще не записанных в хранилище
+        self._held: Dict[int, int] = {}
+        # Продление идет в отдельном потоке, а удержание - в event loop
+        self._state_lock = threading.Lock()
+        self._on_change: Optional[Callable[[], None]] = None
+        self._task: Optional[asyncio.Task] = None
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def owned(self) -> FrozenSet[int]:
+        """Партиции, аренда которых еще действует"""
+        now = time.monotonic()
+        return frozenset(p for p, expires in self._owned.items() if expires > now)
+
+    def owns(self, chat_id: int) -> bool:
+        """Принадлежит ли чат этому экземпляру"""
+        return partition_of(chat_id, self.partitions) in self.owned()
+
+    @contextmanager
+    def hold(self, partitions: Collection[int]) -> Iterator[FrozenSet[int]]:
+        """
+        Не отпускать партиции, пока пачка их напоминаний не записана в хранилище
+
+        Иначе новый владелец прочитает отправленные, но еще не отмеченные
+        напоминания и отправит их второй раз.
+
+        Args:
+            partitions: Партиции пачки
+
+        Yields:
+            Те из партиций, что еще принадлежат экземпляру
+        """
+        with self._state_lock:
+            held = frozenset(partitions) & self.owned()
+            for partition in held:
+                self._held[partition] = self._held.get(partition, 0) + 1
+        try:
+            yield held
+        finally:
+            with self._state_lock:
+                for partition in held:
+                    self._held[partition] -= 1
+                    if not self._held[partition]:
+                        del self._held[partition]
+
+    def renew(self) -> FrozenSet[int]:
+        """
+        Продлить свои аренды и перераспределить партиции
+
+        Returns:
+            Партиции этого экземпляра после перераспределения
+        """
+        # Локальный срок считаем от момента до запроса: он заведомо не позже срока в базе
+        started = time.monotonic()
+        now = time.time()
+        expires_at = now + self.ttl
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scheduler_instances (instance_id, heartbeat_at) VALUES (?, ?)",
+                (self.instance_id, now)
+            )
+            self._conn.execute("DELETE FROM scheduler_instances WHERE heartbeat_at < ?", (now - self.ttl,))
+            live = self._conn.execute("SELECT COUNT(*) FROM scheduler_instances").fetchone()[0]
+            fair_share = math.ceil(self.partitions / live)
+
+            leases = {
+                partition: (owner, lease_expires)
+                for partition, owner, lease_expires in self._conn.execute(
+                    "SELECT partition, owner, expires_at FROM scheduler_leases"
+                )
+            }
+            mine = sorted(
+                p for p, (owner, lease_expires) in leases.items()
+                if owner == self.instance_id and lease_expires > now
+            )
+
+            # Лишние партиции перестаем обслуживать до того, как отпустить их в базе;
+            # удерживаемые отпустим на следующем продлении
+            with self._state_lock:
+                release = [p for p in mine[fair_share:] if p not in self._held]
+                keep = [p for p in mine if p not in release]
+                for partition in release:
+                    self._owned.pop(partition, None)
+
+            for partition in release:
+                self._conn.execute(
+                    "UPDATE scheduler_leases SET owner = NULL, expires_at = 0 WHERE partition = ? AND owner = ?",
+                    (partition, self.instance_id)
+                )
+
+            free = [
+                p for p in range(self.partitions)
+                if p not in leases or leases[p][0] is None or leases[p][1] <= now
+            ]
+            acquired = free[:max(fair_share - len(keep), 0)]
+
+            for partition in keep + acquired:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO scheduler_leases (partition, owner, expires_at) VALUES (?, ?, ?)",
+                    (partition, self.instance_id, expires_at)
+                )
+
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        local_expires = started + self.ttl
+        with self._state_lock:
+            self._owned = {partition: local_expires for partition in keep + acquired}
+        return self.owned()
+
+    def release(self):
+        """Отпустить все аренды и выйти из группы"""
+        self._owned = {}
+        self._conn.execute(
+            "UPDATE scheduler_leases SET owner = NULL, expires_at = 0 WHERE owner = ?",
+            (self.instance_id,)
+        )
+        self._conn.execute("DELETE FROM scheduler_instances WHERE instance_id = ?", (self.instance_id,))
+
+    async def start(self, on_change: Callable[[], None] = None):
+        """
+        Получить первые аренды и запустить их продление
+
+        Args:
+            on_change: Вызывается, когда набор партиций меняется
+        """
+        self._on_change = on_change
+        await self._renew()
+        self._task = asyncio.create_task(self._renew_loop())
+
+    async def stop(self):
+        """Остановить продление и отпустить аренды"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await asyncio.to_thread(self.release)
+
+    async def _renew(self):
+        """Продлить аренды, не блокируя event loop"""
+        before = self.owned()
+        try:
+            after = await asyncio.to_thread(self.renew)
+        except Exception as e:
+            logger.error(f"Ошибка продления аренды партиций: {e}")
+            return
+
+        if after != before:
+            logger.info(f"Экземпляр {self.instance_id} обслуживает {len(after)} из {self.partitions} партиций")
+            if self._on_change is not None:
+                self._on_change()
+
+    async def _renew_loop(self):
+        """Периодически продлевать аренды"""
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            await self._renew()
+
+
+if __name__ == "__main__":
+    # Запустите несколько процессов с общим SQLITE_PATH, чтобы увидеть перераспределение
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+    async def _demo():
+        manager = LeaseManager()
+        await manager.start()
+        try:
+            while True:
+                await asyncio.sleep(manager.renew_interval)
+                logger.info(f"{manager.instance_id}: {sorted(manager.owned())}")
+        finally:
+            await manager.stop()
+
+    try:
+        asyncio.run(_demo())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,314 @@
+import asyncio
+import inspect
+import logging
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Awaitable, Callable, Dict, Iterator, List, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы корзин по умолчанию (секунды): от быстрых операций с памятью до ответа GPT
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Collector = Callable[[], Union[None, Awaitable[None]]]
+
+
+def escape_label(value: str) -> str:
+    """Экранировать значение метки для текстового формата Prometheus"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    """Записать число в текстовом формате Prometheus"""
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Собрать {name="value",...} или пустую строку"""
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Value:
+    """Значение счетчика или показателя для одного набора меток"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _Buckets:
+    """Гистограмма для одного набора меток"""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Последняя ячейка - значения больше всех границ (+Inf)
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Metric(ABC):
+    """
+    Метрика с набором меток
+
+    labels() возвращает дочернюю серию для конкретных значений меток и
+    запоминает ее: на горячем пути серию получают один раз заранее и
+    дальше только увеличивают числа, без поиска и форматирования. Метрика
+    без меток сама пишет в свою единственную серию.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._default = None if self.labelnames else self.labels()
+
+    @abstractmethod
+    def _new_child(self) -> object:
+        """Новая серия для одного набора меток"""
+
+    def labels(self, *values) -> object:
+        """
+        Серия для значений меток
+
+        Args:
+            *values: Значения меток в порядке labelnames
+
+        Returns:
+            Серия: у счетчика inc(), у показателя set()/inc()/dec(), у гистограммы observe()
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"Метрике {self.name} нужны метки {self.labelnames}, передано {values}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """Строки выгрузки: (имя, метки, значение)"""
+        for values, child in list(self._children.items()):
+            yield self.name, format_labels(self.labelnames, values), child.value
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(Metric):
+    """Текущее значение, которое может расти и убывать"""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам с суммой и количеством"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _Buckets:
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        names = self.labelnames + ("le",)
+        for values, child in list(self._children.items()):
+            # Копия, чтобы корзины, сумма и количество были из одного момента
+            counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", format_labels(names, values + (format_value(bound),)), cumulative
+            labels = format_labels(self.labelnames, values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    """
+    Набор метрик процесса и выгрузка в текстовом формате Prometheus
+
+    Запись в метрики идет без блокировок: каждую серию пишет один поток
+    (цикл событий или поток хранилища), а выгрузка только читает числа.
+    Показатели, которые дешевле снять по запросу, чем обновлять на каждом
+    событии, заполняют сборщики: они вызываются перед каждой выгрузкой.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """Добавить метрику"""
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Collector):
+        """
+        Подписать сборщик, обновляющий метрики перед выгрузкой
+
+        Args:
+            collector: Функция или корутина без аргументов
+        """
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Collector):
+        """Отписать сборщик"""
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    async def collect(self):
+        """Вызвать сборщики; ошибка одного не мешает остальным"""
+        for collector in list(self._collectors):
+            try:
+                result = collector()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Ошибка сборщика метрик: {e}")
+
+    def render(self) -> str:
+        """
+        Текущие значения в текстовом формате Prometheus
+
+        Returns:
+            Текст выгрузки
+        """
+        lines = []
+        for metric in self._metrics.values():
+            documentation = metric.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append(f"# HELP {metric.name} {documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    async def expose(self) -> str:
+        """Собрать показатели и выгрузить все метрики"""
+        await self.collect()
+        return self.render()
+
+
+# Метрики процесса: модули объявляют свои метрики здесь при импорте
+REGISTRY = Registry()
+
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Ответить на один HTTP-запрос к серверу метрик"""
+    try:
+        request = await asyncio.wait_for(reader.readline(), 5)
+        # Заголовки не нужны, но их надо дочитать до пустой строки
+        while (await asyncio.wait_for(reader.readline(), 5)).strip():
+            pass
+
+        parts = request.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, content_type, body = "200 OK", CONTENT_TYPE, (await REGISTRY.expose()).encode("utf-8")
+        else:
+            status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"not found\n"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(host: str, port: int) -> asyncio.AbstractServer:
+    """
+    Запустить HTTP-сервер с GET /metrics
+
+    Нужен в режиме long polling, где своего веб-сервера у бота нет.
+
+    Args:
+        host: Адрес прослушивания
+        port: Порт
+
+    Returns:
+        Запущенный сервер; остановить - close() и wait_closed()
+    """
+    server = await asyncio.start_server(_handle_scrape, host, port)
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,235 @@
+import heapq
+from typing import Callable, List, Dict, Optional, Tuple
+from dateutil import parser as date_parser
+
+
+def due_timestamp(iso_date: str) -> float:
+    """
+    Перевести дату напоминания в UTC epoch
+
+    В файле встречаются как даты с 'Z', так и наивные isoformat() строки.
+    Наивные даты считаются локальным временем, поэтому наивные и aware
+    значения никогда не сравниваются напрямую.
+
+    Args:
+        iso_date: Дата в ISO формате
+
+    Returns:
+        Время срабатывания в секундах с эпохи
+    """
+    return date_parser.parse(iso_date).timestamp()
+
+
+def notification_due(notification: Dict) -> float:
+    """
+    Время следующей попытки отправки напоминания
+
+    Args:
+        notification: Напоминание
+
+    Returns:
+        Дата напоминания или время повтора после неудачной отправки
+    """
+    due = due_timestamp(notification["date"])
+    if notification.get("retryAt"):
+        return max(due, due_timestamp(notification["retryAt"]))
+    return due
+
+
+class NotificationIndex:
+    """
+    Индекс напоминаний в памяти
+
+    Время срабатывания каждого напоминания разбирается один раз.
+    Куча по времени срабатывания дает выборку наступивших напоминаний
+    за O(k log n), индекс chat_id -> напоминания - список пользователя
+    за O(напоминаний пользователя).
+    """
+
+    def __init__(self, notifications: List[Dict] = None):
+        self._by_id: Dict[str, Dict] = {}
+        self._due_at: Dict[str, float] = {}
+        self._by_chat: Dict[int, Dict[str, Dict]] = {}
+        self._heap: List[Tuple[float, str]] = []
+        # Наступившие, но еще не отправленные напоминания
+        self._due: Dict[str, Dict] = {}
+        self._pending_count = 0
+
+        for n in notifications or []:
+            self.add(n)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, notification_id: str) -> bool:
+        return notification_id in self._by_id
+
+    def pending_count(self) -> int:
+        """Количество неотправленных напоминаний"""
+        return self._pending_count
+
+    def get(self, notification_id: str) -> Optional[Dict]:
+        """Получить напоминание по ID"""
+        return self._by_id.get(notification_id)
+
+    def all(self) -> List[Dict]:
+        """Все напоминания в порядке добавления"""
+        return list(self._by_id.values())
+
+    def due_at(self, notification_id: str) -> Optional[float]:
+        """Время срабатывания напоминания в UTC epoch"""
+        return self._due_at.get(notification_id)
+
+    def add(self, notification: Dict):
+        """
+        Добавить или заменить напоминание
+
+        Args:
+            notification: Напоминание
+        """
+        notification_id = notification["id"]
+        if notification_id in self._by_id:
+            self.remove(notification_id)
+
+        due = notification_due(notification)
+        self._by_id[notification_id] = notification
+        self._due_at[notification_id] = due
+        self._by_chat.setdefault(notification["chatId"], {})[notification_id] = notification
+
+        if not notification["sent"]:
+            self._pending_count += 1
+            heapq.heappush(self._heap, (due, notification_id))
+
+    def remove(self, notification_id: str) -> Optional[Dict]:
+        """
+        Удалить напоминание
+
+        Args:
+            notification_id: ID напоминания
+
+        Returns:
+            Удаленное напоминание или None
+        """
+        notification = self._by_id.pop(notification_id, None)
+        if notification is None:
+            return None
+
+        # Запись в куче удаляется лениво при следующей выборке
+        self._due_at.pop(notification_id)
+        self._due.pop(notification_id, None)
+        if not notification["sent"]:
+            self._pending_count -= 1
+
+        chat = self._by_chat[notification["chatId"]]
+        del chat[notification_id]
+        if not chat:
+            del self._by_chat[notification["chatId"]]
+
+        return notification
+
+    def mark_sent(self, notification_id: str) -> bool:
+        """
+        Отметить напоминание как отправленное
+
+        Args:
+            notification_id: ID напоминания
+
+        Returns:
+            True если напоминание найдено
+        """
+        notification = self._by_id.get(notification_id)
+        if notification is None:
+            return False
+
+        if not notification["sent"]:
+            notification["sent"] = True
+            self._pending_count -= 1
+        self._due.pop(notification_id, None)
+        return True
+
+    def pending(self, now: float) -> List[Dict]:
+        """
+        Напоминания, время которых наступило
+
+        Args:
+            now: Текущее время в UTC epoch
+
+        Returns:
+            Список неотправленных напоминаний с due <= now
+        """
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            due, notification_id = heapq.heappop(heap)
+            notification = self._by_id.get(notification_id)
+            if notification is None or notification["sent"] or self._due_at[notification_id] != due:
+                continue
+            self._due[notification_id] = notification
+
+        # Куча с ленивым удалением не должна разрастаться
+        if len(heap) > 2 * self._pending_count + 64:
+            self._rebuild_heap()
+
+        return [n for n in self._due.values() if self._due_at[n["id"]] <= now]
+
+    def next_due(self, chat_filter: Callable[[int], bool] = None) -> Optional[float]:
+        """
+        Время ближайшего неотправленного напоминания
+
+        Args:
+            chat_filter: Учитывать только чаты, для которых функция вернула True.
+                С фильтром выполняется полный просмотр за O(n).
+
+        Returns:
+            UTC epoch или None, если ожидающих напоминаний нет
+        """
+        if chat_filter is not None:
+            return min(
+                (
+                    self._due_at[notification_id]
+                    for chat_id, notifications in self._by_chat.items() if chat_filter(chat_id)
+                    for notification_id, n in notifications.items() if not n["sent"]
+                ),
+                default=None
+            )
+
+        if self._due:
+            return min(self._due_at[notification_id] for notification_id in self._due)
+
+        heap = self._heap
+        while heap:
+            due, notification_id = heap[0]
+            notification = self._by_id.get(notification_id)
+            if notification is None or notification["sent"] or self._due_at[notification_id] != due:
+                heapq.heappop(heap)
+                continue
+            return due
+
+        return None
+
+    def upcoming(self, chat_id: int, now: float) -> List[Dict]:
+        """
+        Будущие напоминания пользователя
+
+        Args:
+            chat_id: ID чата пользователя
+            now: Текущее время в UTC epoch
+
+        Returns:
+            Список неотправленных напоминаний с датой позже now по возрастанию даты
+        """
+        # Пользователю важна назначенная дата, а не время повторной попытки отправки
+        scheduled = [
+            (due_timestamp(n["date"]), n) for n in self._by_chat.get(chat_id, {}).values()
+            if not n["sent"]
+        ]
+        scheduled.sort(key=lambda item: item[0])
+        return [n for due, n in scheduled if due > now]
+
+    def _rebuild_heap(self):
+        """Пересобрать кучу без устаревших записей"""
+        self._heap = [
+            (self._due_at[notification_id], notification_id)
+            for notification_id, n in self._by_id.items()
+            if not n["sent"] and notification_id not in self._due
+        ]
+        heapq.heapify(self._heap)
@@ -0,0 +1,191 @@
+import random
+import unicodedata
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Простое число Мерсенна для универсального хеширования
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Нормализовать запрос для ключа кэша
+
+    Приводит Unicode к NFKC, регистр - к casefold, "ё" - к "е", схлопывает
+    пробелы и снимает пунктуацию по краям слов. Пунктуация внутри слов
+    ("2-2", "e-mail") сохраняется, чтобы не склеивать разные запросы.
+
+    Args:
+        text: Исходный запрос
+
+    Returns:
+        Нормализованный запрос
+    """
+    text = unicodedata.normalize("NFKC", text).casefold().replace("ё", "е")
+    words = []
+    for word in text.split():
+        start, end = 0, len(word)
+        while start < end and unicodedata.category(word[start]).startswith("P"):
+            start += 1
+        while end > start and unicodedata.category(word[end - 1]).startswith("P"):
+            end -= 1
+        if start < end:
+            words.append(word[start:end])
+
+    # Запрос из одной пунктуации ("???") оставляем как есть
+    return " ".join(words) or " ".join(text.split())
+
+
+class PromptIndex:
+    """
+    Индекс похожих запросов на MinHash/LSH
+
+    Для каждого запроса строится MinHash-подпись по символьным n-граммам,
+    подпись делится на полосы, по которым ищутся кандидаты. Сходство
+    кандидата оценивается долей совпавших позиций подписи (оценка
+    коэффициента Жаккара). Размер индекса ограничен max_entries, старые
+    записи вытесняются первыми.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        max_entries: int = 1000,
+        ngram: int = 3,
+        bands: int = 16,
+        rows: int = 4,
+        min_length: int = 8,
+        seed: int = 1
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ngram = ngram
+        self.bands = bands
+        self.rows = rows
+        # Короткие запросы слишком легко "похожи" друг на друга
+        self.min_length = min_length
+
+        rnd = random.Random(seed)
+        self._params = [
+            (rnd.randrange(1, _PRIME), rnd.randrange(0, _PRIME))
+            for _ in range(bands * rows)
+        ]
+        # Ключ -> подпись, в порядке добавления
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = defaultdict(set)
+        self._stats = {"lookups": 0, "hits": 0}
+
+    def _shingles(self, text: str) -> Set[int]:
+        """Хеши символьных n-грамм"""
+        padded = f" {text} "
+        return {
+            zlib.crc32(padded[i:i + self.ngram].encode("utf-8"))
+            for i in range(max(len(padded) - self.ngram + 1, 1))
+        }
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """
+        MinHash-подпись текста
+
+        Args:
+            text: Нормализованный запрос
+
+        Returns:
+            Кортеж из bands * rows минимальных хешей
+        """
+        shingles = self._shingles(text)
+        return tuple(
+            min(((a * s + b) % _PRIME) & _MAX_HASH for s in shingles)
+            for a, b in self._params
+        )
+
+    def _bands(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        """Ключи корзин LSH для подписи"""
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    def add(self, key: str, text: str):
+        """
+        Добавить запрос в индекс
+
+        Args:
+            key: Ключ кэша с ответом
+            text: Нормализованный запрос
+        """
+        if len(text) < self.min_length:
+            return
+
+        self.remove(key)
+        while len(self._signatures) >= self.max_entries:
+            self.remove(next(iter(self._signatures)))
+
+        signature = self.signature(text)
+        self._signatures[key] = signature
+        for bucket in self._bands(signature):
+            self._buckets[bucket].add(key)
+
+    def remove(self, key: str):
+        """
+        Убрать запрос из индекса
+
+        Args:
+            key: Ключ кэша
+        """
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+
+        for bucket in self._bands(signature):
+            keys = self._buckets.get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._buckets[bucket]
+
+    def find(self, text: str) -> Optional[str]:
+        """
+        Найти самый похожий запрос не ниже порога
+
+        Args:
+            text: Нормализованный запрос
+
+        Returns:
+            Ключ кэша похожего запроса или None
+        """
+        if len(text) < self.min_length or not self._signatures:
+            return None
+
+        self._stats["lookups"] += 1
+        signature = self.signature(text)
+        candidates = set()
+        for bucket in self._bands(signature):
+            candidates.update(self._buckets.get(bucket, ()))
+
+        best_key, best_score = None, self.threshold
+        for key in candidates:
+            other = self._signatures[key]
+            score = sum(x == y for x, y in zip(signature, other)) / len(signature)
+            if score >= best_score:
+                best_key, best_score = key, score
+
+        if best_key is not None:
+            self._stats["hits"] += 1
+        return best_key
+
+    def clear(self):
+        """Очистить индекс"""
+        self._signatures.clear()
+        self._buckets.clear()
+
+    def get_stats(self) -> dict:
+        """
+        Получить статистику индекса
+
+        Returns:
+            Словарь со статистикой
+        """
+        return {**self._stats, "entries": len(self._signatures), "buckets": len(self._buckets)}
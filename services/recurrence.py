@@ -0,0 +1,212 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional, Set
+from dateutil.relativedelta import relativedelta
+
+FREQUENCIES = ("daily", "weekly", "monthly", "cron")
+
+# Ответы пользователя на вопрос о повторе
+REPEAT_CHOICES = {
+    "нет": None,
+    "ежедневно": "daily",
+    "еженедельно": "weekly",
+    "ежемесячно": "monthly",
+}
+
+RULE_NAMES = {
+    "daily": "ежедневно",
+    "weekly": "еженедельно",
+    "monthly": "ежемесячно",
+}
+
+# Поиск следующего срабатывания cron не дальше этого горизонта
+CRON_HORIZON_DAYS = 366 * 5
+
+
+class CronExpression:
+    """
+    Cron-выражение из пяти полей: минута, час, день месяца, месяц, день недели
+
+    Поддерживаются *, числа, диапазоны a-b, списки через запятую и шаг /n.
+    День недели: 0-6, где 0 - воскресенье (7 тоже воскресенье).
+    """
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron-выражение должно содержать 5 полей: {expression}")
+
+        self.expression = " ".join(parts)
+        minutes, hours, days, months, weekdays = (
+            self._parse_field(part, low, high) for part, (low, high) in zip(parts, self.FIELDS)
+        )
+        self.minutes = sorted(minutes)
+        self.hours = sorted(hours)
+        self.days = days
+        self.months = months
+        self.weekdays = {d % 7 for d in weekdays}
+        # Как в cron: если оба поля дня ограничены, достаточно совпадения одного
+        self.days_restricted = parts[2] != "*"
+        self.weekdays_restricted = parts[4] != "*"
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        """Разобрать одно поле в множество значений"""
+        values = set()
+        for item in field.split(","):
+            step = 1
+            if "/" in item:
+                item, step_text = item.split("/", 1)
+                step = int(step_text)
+                if step <= 0:
+                    raise ValueError(f"Неверный шаг в cron-поле: {field}")
+
+            if item == "*":
+                start, end = low, high
+            elif "-" in item:
+                start_text, end_text = item.split("-", 1)
+                start, end = int(start_text), int(end_text)
+            else:
+                start = end = int(item)
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"Значение вне диапазона в cron-поле: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, day: datetime) -> bool:
+        """Подходит ли день под поля дня месяца и дня недели"""
+        if day.month not in self.months:
+            return False
+
+        day_ok = day.day in self.days
+        # isoweekday: 1 - понедельник ... 7 - воскресенье
+        weekday_ok = day.isoweekday() % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment: datetime, inclusive: bool = False) -> datetime:
+        """
+        Ближайшее срабатывание после момента
+
+        Args:
+            moment: Точка отсчета
+            inclusive: Считать ли сам момент срабатыванием
+
+        Returns:
+            Время срабатывания с точностью до минуты
+        """
+        start = moment.replace(second=0, microsecond=0)
+        if not inclusive or start != moment:
+            start += timedelta(minutes=1)
+
+        day = start.replace(hour=0, minute=0)
+        for _ in range(CRON_HORIZON_DAYS):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+
+        raise ValueError(f"Cron-выражение не срабатывает: {self.expression}")
+
+
+def parse_repeat(text: str) -> Optional[Dict]:
+    """
+    Разобрать ответ пользователя о повторе напоминания
+
+    Args:
+        text: "нет", "ежедневно", "еженедельно", "ежемесячно" или cron-выражение
+
+    Returns:
+        Правило повтора или None для разового напоминания
+
+    Raises:
+        ValueError: Если ответ не распознан
+    """
+    answer = text.strip().lower()
+    if answer in REPEAT_CHOICES:
+        freq = REPEAT_CHOICES[answer]
+        return {"freq": freq, "interval": 1} if freq else None
+
+    CronExpression(answer)
+    return {"freq": "cron", "cron": answer}
+
+
+def validate_rule(rule: Dict):
+    """
+    Проверить правило повтора
+
+    Raises:
+        ValueError: Если правило неверное
+    """
+    freq = rule.get("freq")
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Неизвестная периодичность: {freq}")
+    if freq == "cron":
+        CronExpression(rule["cron"])
+    elif int(rule.get("interval", 1)) < 1:
+        raise ValueError("Интервал повтора должен быть положительным")
+
+
+def first_occurrence(rule: Dict, start: datetime) -> datetime:
+    """
+    Первое срабатывание правила не раньше start
+
+    Для daily/weekly/monthly это сам start, для cron - ближайшее совпадение.
+    """
+    if rule["freq"] == "cron":
+        return CronExpression(rule["cron"]).next_after(start, inclusive=True)
+    return start
+
+
+def next_occurrence(rule: Dict, current: datetime) -> datetime:
+    """
+    Следующее срабатывание после текущего
+
+    Args:
+        rule: Правило повтора
+        current: Текущее срабатывание
+
+    Returns:
+        Время следующего срабатывания
+    """
+    freq = rule["freq"]
+    interval = int(rule.get("interval", 1))
+
+    if freq == "daily":
+        return current + timedelta(days=interval)
+    if freq == "weekly":
+        return current + timedelta(weeks=interval)
+    if freq == "monthly":
+        # День месяца берем из правила, чтобы 31-е не сползало на 28-е
+        return current + relativedelta(months=interval, day=rule.get("day", current.day))
+    return CronExpression(rule["cron"]).next_after(current)
+
+
+def iter_occurrences(rule: Dict, current: datetime, count: int) -> Iterator[datetime]:
+    """
+    Лениво перечислить ближайшие срабатывания, начиная с текущего
+
+    Args:
+        rule: Правило повтора
+        current: Текущее срабатывание
+        count: Сколько срабатываний выдать
+    """
+    for _ in range(count):
+        yield current
+        current = next_occurrence(rule, current)
+
+
+def describe_rule(rule: Dict) -> str:
+    """Человекочитаемое описание правила"""
+    if rule["freq"] == "cron":
+        return f"cron: {rule['cron']}"
+
+    interval = int(rule.get("interval", 1))
+    name = RULE_NAMES[rule["freq"]]
+    return name if interval == 1 else f"{name} (интервал {interval})"
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Пауза перед повторным подключением после сбоя (секунды)
+RECONNECT_DELAY = 1.0
+# Сколько ключей просить за один шаг SCAN при очистке
+SCAN_COUNT = 500
+
+
+class RedisError(Exception):
+    """Ошибка, которую вернул сервер Redis"""
+
+
+def encode_command(args: Sequence[Any]) -> bytes:
+    """Закодировать команду в RESP"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif not isinstance(arg, bytes):
+            arg = str(arg).encode("ascii")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """
+    Прочитать один ответ RESP
+
+    Ошибка сервера возвращается как RedisError, а не выбрасывается,
+    чтобы не сбить сопоставление ответов с командами.
+    """
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Соединение с Redis закрыто")
+
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode("utf-8")
+    if kind == b"-":
+        return RedisError(body.decode("utf-8"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(body)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Неожиданный ответ Redis: {line[:64]!r}")
+
+
+class RespClient:
+    """
+    Минимальный асинхронный клиент протокола Redis
+
+    Держит одно соединение и конвейеризует запросы: команды, отправленные
+    за одну итерацию цикла событий, уходят в сокет одной записью, не
+    дожидаясь ответов на предыдущие. Ответы сопоставляются с командами
+    по порядку. После обрыва соединение восстанавливается при следующей
+    команде, но не чаще раза в RECONNECT_DELAY.
+    """
+
+    def __init__(self, url: str, timeout: float):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Deque[asyncio.Future] = deque()
+        self._buffer = bytearray()
+        self._flush_scheduled = False
+        self._connect_lock = asyncio.Lock()
+        self._down_until = 0.0
+        self._stats = {"commands": 0, "writes": 0, "errors": 0, "connects": 0}
+
+    async def _connect(self):
+        """Подключиться, если соединения нет"""
+        if self._writer is not None:
+            return
+
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            if time.monotonic() < self._down_until:
+                raise ConnectionError("Redis недоступен")
+
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port),
+                    self.timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                self._down_until = time.monotonic() + RECONNECT_DELAY
+                raise ConnectionError(f"Не удалось подключиться к Redis: {e}") from e
+
+            self._writer = writer
+            self._reader_task = asyncio.create_task(self._read_loop(reader))
+            self._stats["connects"] += 1
+
+            handshake = []
+            if self.password:
+                credentials = (self.username, self.password) if self.username else (self.password,)
+                handshake.append(self._send(("AUTH", *credentials)))
+            if self.db:
+                handshake.append(self._send(("SELECT", self.db)))
+            if handshake:
+                try:
+                    for reply in await asyncio.wait_for(asyncio.gather(*handshake), self.timeout):
+                        if isinstance(reply, RedisError):
+                            raise reply
+                except Exception as e:
+                    self._disconnect(e)
+                    raise ConnectionError(f"Redis отклонил подключение: {e}") from e
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        """Раздавать ответы ожидающим командам по порядку"""
+        try:
+            while True:
+                reply = await read_reply(reader)
+                future = self._pending.popleft()
+                # Команду могли отменить по таймауту, ответ на нее просто пропускаем
+                if not future.done():
+                    future.set_result(reply)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._disconnect(e)
+
+    def _disconnect(self, error: Exception, failed: bool = True):
+        """Закрыть соединение и отказать всем ожидающим командам"""
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        self._buffer.clear()
+        if failed:
+            logger.warning(f"Соединение с Redis разорвано: {error}")
+            self._down_until = time.monotonic() + RECONNECT_DELAY
+
+        pending, self._pending = self._pending, deque()
+        for future in pending:
+            if not future.done():
+                future.set_exception(ConnectionError(f"Соединение с Redis разорвано: {error}"))
+
+    def _send(self, args: Sequence[Any]) -> asyncio.Future:
+        """Поставить команду в буфер отправки"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        self._buffer += encode_command(args)
+        self._stats["commands"] += 1
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+        return future
+
+    def _flush(self):
+        """Отправить накопленные команды одной записью"""
+        self._flush_scheduled = False
+        if self._writer is None or not self._buffer:
+            return
+        self._writer.write(bytes(self._buffer))
+        self._buffer.clear()
+        self._stats["writes"] += 1
+
+    async def execute(self, *args: Any) -> Any:
+        """
+        Выполнить команду
+
+        Returns:
+            Ответ сервера
+
+        Raises:
+            ConnectionError: Redis недоступен
+            asyncio.TimeoutError: Нет ответа за timeout
+            RedisError: Сервер вернул ошибку
+        """
+        try:
+            await self._connect()
+            reply = await asyncio.wait_for(self._send(args), self.timeout)
+        except (ConnectionError, asyncio.TimeoutError):
+            self._stats["errors"] += 1
+            raise
+
+        if isinstance(reply, RedisError):
+            self._stats["errors"] += 1
+            raise reply
+        return reply
+
+    async def close(self):
+        """Закрыть соединение"""
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+        if self._writer is not None:
+            self._disconnect(ConnectionError("клиент закрыт"), failed=False)
+
+    def get_stats(self) -> dict:
+        """
+        Получить статистику клиента
+
+        Returns:
+            Словарь со статистикой
+        """
+        return {
+            **self._stats,
+            "connected": self._writer is not None,
+            "in_flight": len(self._pending)
+        }
+
+
+class RedisBackend:
+    """
+    Общий для всех копий бота уровень кэша в Redis
+
+    Значения хранятся в JSON вместе со сроком годности, сам ключ живет
+    в Redis еще CACHE_STALE_TTL секунд после истечения для ответов при
+    недоступном GPT. Ключи отделены префиксом REDIS_PREFIX, поэтому
+    clear() не трогает чужие данные в той же базе.
+    """
+
+    shared = True
+
+    def __init__(self, url: str = None, prefix: str = None, stale_ttl: float = None, timeout: float = None):
+        self.client = RespClient(url or Config.REDIS_URL, timeout or Config.REDIS_TIMEOUT)
+        self.prefix = prefix or Config.REDIS_PREFIX
+        self.stale_ttl = Config.CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+
+    async def get(self, key: str, stale: bool = False) -> Optional[Tuple[Any, float]]:
+        data = await self.client.execute("GET", self.prefix + key)
+        if data is None:
+            return None
+        value, expires_at = json.loads(data)
+        if not stale and expires_at <= time.time():
+            return None
+        return value, expires_at
+
+    async def set(self, key: str, value: Any, expires_at: float):
+        keep_ms = int((expires_at + self.stale_ttl - time.time()) * 1000)
+        if keep_ms <= 0:
+            return
+        data = json.dumps([value, expires_at], ensure_ascii=False)
+        await self.client.execute("SET", self.prefix + key, data, "PX", keep_ms)
+
+    async def delete(self, key: str):
+        await self.client.execute("DEL", self.prefix + key)
+
+    async def clear(self):
+        cursor = b"0"
+        while True:
+            cursor, keys = await self.client.execute(
+                "SCAN", cursor, "MATCH", f"{self.prefix}*", "COUNT", SCAN_COUNT
+            )
+            if keys:
+                await self.client.execute("UNLINK", *keys)
+            if cursor == b"0":
+                break
+
+    def hottest(self, limit: int) -> List[Tuple[str, Any, float]]:
+        # Общий кэш не прогреваем: ближний кэш наполнится по первым обращениям
+        return []
+
+    async def close(self):
+        await self.client.close()
+
+    def get_stats(self) -> dict:
+        return {"backend": "redis", **self.client.get_stats()}
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Callable, List, Dict, Optional
+from services.async_storage import AsyncStorage
+from services.leases import LeaseManager, partition_of
+
+logger = logging.getLogger(__name__)
+
+# Максимальный сон без пересчета: защита от перевода системных часов
+MAX_SLEEP = 300
+# Пауза после ошибки хранилища
+ERROR_DELAY = 5
+
+
+class ReminderScheduler:
+    """
+    Планировщик напоминаний по событиям
+
+    Спит ровно до ближайшего напоминания и просыпается раньше, если
+    добавленное или удаленное напоминание меняет начало очереди.
+    В простое не делает ничего, задержка доставки - миллисекунды.
+
+    С LeaseManager обслуживает только арендованные партиции и
+    перепроверяет очередь на каждом продлении аренды: напоминания,
+    добавленные другими процессами, не приходят через notify().
+    Пока deliver не вернулась, партиции пачки не отпускаются, поэтому
+    deliver должна записать результаты доставки в хранилище до возврата.
+    """
+
+    def __init__(
+        self,
+        storage: AsyncStorage,
+        deliver: Callable[[List[Dict]], Awaitable[None]],
+        leases: Optional[LeaseManager] = None
+    ):
+        self.storage = storage
+        self.deliver = deliver
+        self.leases = leases
+        self._wakeup = asyncio.Event()
+        # Время, до которого спит планировщик; None - идет пересчет
+        self._armed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Запустить планировщик"""
+        if self.leases is not None:
+            await self.leases.start(self.wake)
+        self.storage.add_listener(self.notify)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить планировщик"""
+        self.storage.remove_listener(self.notify)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self.leases is not None:
+            await self.leases.stop()
+
+    def wake(self):
+        """Пересчитать очередь немедленно"""
+        self._wakeup.set()
+
+    def notify(self, due_at: float):
+        """
+        Сообщить об изменении напоминания
+
+        Args:
+            due_at: Время срабатывания добавленного или удаленного напоминания
+        """
+        if self._armed_at is None or due_at <= self._armed_at:
+            self._wakeup.set()
+
+    async def _deliver(self, pending: List[Dict]):
+        """Доставить пачку, удерживая ее партиции до записи результатов"""
+        if self.leases is None:
+            await self.deliver(pending)
+            return
+
+        count = self.leases.partitions
+        with self.leases.hold({partition_of(n["chatId"], count) for n in pending}) as held:
+            # Партиции, отпущенные после чтения очереди, доставит новый владелец
+            pending = [n for n in pending if partition_of(n["chatId"], count) in held]
+            if pending:
+                await self.deliver(pending)
+
+    async def _run(self):
+        """Основной цикл: доставить наступившие и уснуть до следующего"""
+        while True:
+            self._wakeup.clear()
+            self._armed_at = None
+
+            partitions = self.leases.owned() if self.leases is not None else None
+            partition_count = self.leases.partitions if self.leases is not None else None
+            max_sleep = self.leases.renew_interval if self.leases is not None else MAX_SLEEP
+
+            try:
+                if partitions is not None and not partitions:
+                    next_due = None
+                else:
+                    pending = await self.storage.get_pending_notifications(partitions, partition_count)
+                    if pending:
+                        await self._deliver(pending)
+                    next_due = await self.storage.next_due_at(partitions, partition_count)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка планировщика напоминаний: {e}")
+                next_due = time.time() + ERROR_DELAY
+
+            self._armed_at = math.inf if next_due is None else next_due
+            timeout = min(max(self._armed_at - time.time(), 0), max_sleep)
+
+            # Таймер вместо asyncio.wait_for: в Python 3.11 wait_for теряет отмену,
+            # пришедшую одновременно с wake(), и stop() зависает
+            timer = asyncio.get_running_loop().call_later(timeout, self._wakeup.set)
+            try:
+                await self._wakeup.wait()
+            finally:
+                timer.cancel()
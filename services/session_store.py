@@ -0,0 +1,267 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from config.config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at);
+"""
+
+SELECT_SQL = "SELECT version, value, expires_at FROM sessions WHERE key = ?"
+SELECT_PREFIX_SQL = "SELECT key, value FROM sessions WHERE key >= ? AND key < ? AND expires_at > ?"
+INSERT_SQL = "INSERT OR IGNORE INTO sessions (key, version, value, expires_at) VALUES (?, 1, ?, ?)"
+UPDATE_SQL = (
+    "UPDATE sessions SET version = version + 1, value = ?, expires_at = ? "
+    "WHERE key = ? AND version = ?"
+)
+DELETE_SQL = "DELETE FROM sessions WHERE key = ?"
+DELETE_VERSION_SQL = "DELETE FROM sessions WHERE key = ? AND version = ?"
+EXPIRE_SQL = "DELETE FROM sessions WHERE expires_at <= ?"
+
+# Как часто удалять истекшие сессии (секунды). Удаляются сессии, истекшие
+# раньше предыдущей очистки: версию недавно истекшей еще может предъявить
+# тот, кто только что прочитал ее из get()
+PURGE_INTERVAL = 60
+
+
+class VersionConflict(Exception):
+    """Сессию изменили после того, как ее прочитали"""
+
+
+def encode(value: Dict) -> str:
+    """Компактная запись сессии"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class SessionStore:
+    """
+    Хранилище состояний сессий в памяти процесса
+
+    Каждая запись - небольшой словарь с версией и сроком жизни ttl
+    секунд с последней записи. Запись меняется только с версией, под
+    которой ее прочитали (оптимистичная блокировка): если ее успели
+    изменить, put и delete выбрасывают VersionConflict. Истекшая запись
+    читается как отсутствующая, но сохраняет версию до удаления.
+    """
+
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl or Config.SESSION_TTL
+        # Ключ -> (версия, запись в JSON, срок жизни)
+        self._sessions: Dict[str, Tuple[int, str, float]] = {}
+        self._last_purge = 0.0
+        self._stats = {"reads": 0, "writes": 0, "conflicts": 0}
+
+    async def get(self, key: str) -> Tuple[Optional[Dict], int]:
+        """
+        Прочитать сессию
+
+        Args:
+            key: Ключ сессии
+
+        Returns:
+            Сессия или None и ее версия (0, если записи нет)
+        """
+        self._stats["reads"] += 1
+        record = self._sessions.get(key)
+        if record is None:
+            return None, 0
+        version, value, expires_at = record
+        if expires_at <= time.time():
+            return None, version
+        return json.loads(value), version
+
+    async def put(self, key: str, value: Dict, version: int) -> int:
+        """
+        Записать сессию
+
+        Args:
+            key: Ключ сессии
+            value: Сессия
+            version: Версия, полученная при чтении
+
+        Returns:
+            Новая версия
+
+        Raises:
+            VersionConflict: Сессию изменили после чтения
+        """
+        now = time.time()
+        record = self._sessions.get(key)
+        if (record[0] if record is not None else 0) != version:
+            self._stats["conflicts"] += 1
+            raise VersionConflict(key)
+
+        self._sessions[key] = (version + 1, encode(value), now + self.ttl)
+        self._stats["writes"] += 1
+        self._purge(now)
+        return version + 1
+
+    async def delete(self, key: str, version: Optional[int] = None):
+        """
+        Удалить сессию
+
+        Args:
+            key: Ключ сессии
+            version: Версия, полученная при чтении; None - удалить без проверки
+
+        Raises:
+            VersionConflict: Сессию изменили после чтения
+        """
+        record = self._sessions.get(key)
+        if version is not None and (record[0] if record is not None else 0) != version:
+            self._stats["conflicts"] += 1
+            raise VersionConflict(key)
+        self._sessions.pop(key, None)
+        self._stats["writes"] += 1
+
+    async def items(self, prefix: str) -> List[Tuple[str, Dict]]:
+        """
+        Живые сессии с ключами, начинающимися с prefix
+
+        Returns:
+            Список (ключ, сессия)
+        """
+        now = time.time()
+        return [
+            (key, json.loads(value))
+            for key, (_, value, expires_at) in list(self._sessions.items())
+            if key.startswith(prefix) and expires_at > now
+        ]
+
+    def _purge(self, now: float):
+        """Удалить сессии, истекшие до предыдущей очистки"""
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        cutoff = now - PURGE_INTERVAL
+        for key in [key for key, record in self._sessions.items() if record[2] <= cutoff]:
+            del self._sessions[key]
+
+    async def close(self):
+        """Закрыть хранилище"""
+
+    def get_stats(self) -> dict:
+        """
+        Получить статистику хранилища
+
+        Returns:
+            Словарь со статистикой
+        """
+        return {"sessions": len(self._sessions), **self._stats}
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Хранилище состояний сессий в SQLite
+
+    Переживает перезапуск и общее для всех процессов, работающих с
+    одним файлом. Версия проверяется в самом UPDATE/DELETE, поэтому из
+    двух процессов, прочитавших одну версию, записать сможет только один.
+    """
+
+    def __init__(self, path: str = None, ttl: float = None):
+        super().__init__(ttl)
+        self.path = path or Config.SESSION_DB_PATH
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    async def get(self, key: str) -> Tuple[Optional[Dict], int]:
+        return await asyncio.to_thread(self._get, key)
+
+    def _get(self, key: str) -> Tuple[Optional[Dict], int]:
+        self._stats["reads"] += 1
+        with self._lock:
+            row = self._conn.execute(SELECT_SQL, (key,)).fetchone()
+        if row is None:
+            return None, 0
+        version, value, expires_at = row
+        if expires_at <= time.time():
+            return None, version
+        return json.loads(value), version
+
+    async def put(self, key: str, value: Dict, version: int) -> int:
+        return await asyncio.to_thread(self._put, key, value, version)
+
+    def _put(self, key: str, value: Dict, version: int) -> int:
+        now = time.time()
+        with self._lock:
+            if version == 0:
+                cursor = self._conn.execute(INSERT_SQL, (key, encode(value), now + self.ttl))
+            else:
+                cursor = self._conn.execute(UPDATE_SQL, (encode(value), now + self.ttl, key, version))
+
+            if now - self._last_purge >= PURGE_INTERVAL:
+                self._last_purge = now
+                self._conn.execute(EXPIRE_SQL, (now - PURGE_INTERVAL,))
+        if cursor.rowcount == 0:
+            self._stats["conflicts"] += 1
+            raise VersionConflict(key)
+
+        self._stats["writes"] += 1
+        return version + 1
+
+    async def delete(self, key: str, version: Optional[int] = None):
+        await asyncio.to_thread(self._delete, key, version)
+
+    def _delete(self, key: str, version: Optional[int]):
+        with self._lock:
+            if version is None:
+                self._conn.execute(DELETE_SQL, (key,))
+            elif self._conn.execute(DELETE_VERSION_SQL, (key, version)).rowcount == 0 and version != 0:
+                self._stats["conflicts"] += 1
+                raise VersionConflict(key)
+        self._stats["writes"] += 1
+
+    async def items(self, prefix: str) -> List[Tuple[str, Dict]]:
+        return await asyncio.to_thread(self._items, prefix)
+
+    def _items(self, prefix: str) -> List[Tuple[str, Dict]]:
+        # Диапазон ключей вместо LIKE, чтобы использовать первичный ключ
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._lock:
+            rows = self._conn.execute(SELECT_PREFIX_SQL, (prefix, upper, time.time())).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {"sessions": sessions, **self._stats}
+
+
+def create_session_store() -> SessionStore:
+    """
+    Создать хранилище сессий согласно Config.SESSION_BACKEND
+
+    Returns:
+        Экземпляр хранилища
+    """
+    backend = Config.SESSION_BACKEND
+
+    if backend == "memory":
+        return SessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+
+    raise ValueError(f"Неизвестный тип хранилища сессий: {backend}")
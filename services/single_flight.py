@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных вызовов
+
+    Пока вызов с ключом выполняется, остальные вызовы с тем же ключом
+    не идут в апстрим, а ждут его и получают тот же результат или ошибку.
+    Вызов выполняется отдельной задачей, поэтому отмена одного ожидающего
+    не прерывает остальных.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._stats = {"leaders": 0, "coalesced": 0, "errors": 0}
+
+    def _finish(self, key: str, task: asyncio.Future):
+        """Убрать завершенный вызов"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Ошибку забираем сами: ожидающих могло уже не остаться
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["errors"] += 1
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполнить вызов или присоединиться к уже идущему
+
+        Args:
+            key: Ключ объединения
+            func: Фабрика корутины вызова
+
+        Returns:
+            Результат вызова
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self._stats["leaders"] += 1
+        else:
+            self._stats["coalesced"] += 1
+
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> dict:
+        """
+        Получить статистику объединения
+
+        Returns:
+            Словарь со статистикой
+        """
+        return {**self._stats, "in_flight": len(self._calls)}
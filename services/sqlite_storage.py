@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import sqlite3
+from typing import Collection, List, Dict, Optional
+from config.config import Config
+from services.notification_index import due_timestamp, notification_due
+from services.storage import Storage, DATA_FILE
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notifications (
+    id TEXT PRIMARY KEY,
+    chat_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    due_at REAL NOT NULL,
+    text TEXT NOT NULL,
+    sent INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_notifications_sent_due ON notifications (sent, due_at);
+CREATE INDEX IF NOT EXISTS idx_notifications_chat ON notifications (chat_id);
+"""
+
+# Изменения схемы: версия -> выражения для перехода на нее
+MIGRATIONS = {
+    2: [
+        "ALTER TABLE notifications ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE notifications ADD COLUMN last_error TEXT",
+    ],
+    3: [
+        "ALTER TABLE notifications ADD COLUMN retry_at TEXT",
+    ],
+    4: [
+        "ALTER TABLE notifications ADD COLUMN rule TEXT",
+    ],
+}
+
+# Запросы держим константами: sqlite3 кэширует подготовленные
+# выражения по тексту запроса
+COLUMNS = "id, chat_id, date, text, sent, created_at, attempts, last_error, retry_at, rule"
+INSERT_SQL = (
+    "INSERT OR REPLACE INTO notifications "
+    "(id, chat_id, date, due_at, text, sent, created_at, attempts, last_error, retry_at, rule) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_USER_SQL = (
+    f"SELECT {COLUMNS} FROM notifications "
+    "WHERE chat_id = ? AND sent = 0 AND due_at > ? ORDER BY due_at"
+)
+SELECT_PENDING_SQL = (
+    f"SELECT {COLUMNS} FROM notifications "
+    "WHERE sent = 0 AND due_at <= ? ORDER BY due_at"
+)
+SELECT_ONE_SQL = f"SELECT {COLUMNS} FROM notifications WHERE id = ?"
+SELECT_SENT_SQL = f"SELECT {COLUMNS} FROM notifications WHERE sent = 1"
+DELETE_SQL = "DELETE FROM notifications WHERE id = ?"
+NEXT_DUE_SQL = "SELECT MIN(due_at) FROM notifications WHERE sent = 0"
+COUNT_PENDING_SQL = "SELECT COUNT(*) FROM notifications WHERE sent = 0"
+# Фильтр партиций передается JSON-массивом, чтобы текст запроса не менялся
+PARTITION_FILTER = "abs(chat_id) % ? IN (SELECT value FROM json_each(?))"
+SELECT_PENDING_PARTITIONS_SQL = (
+    f"SELECT {COLUMNS} FROM notifications "
+    f"WHERE sent = 0 AND due_at <= ? AND {PARTITION_FILTER} ORDER BY due_at"
+)
+NEXT_DUE_PARTITIONS_SQL = (
+    "SELECT due_at FROM notifications "
+    f"WHERE sent = 0 AND {PARTITION_FILTER} ORDER BY due_at LIMIT 1"
+)
+
+
+class SQLiteStorage(Storage):
+    """Хранилище напоминаний в SQLite (WAL, индексы по (sent, due_at) и chat_id)"""
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.SQLITE_PATH
+        self._conn = None
+        super().__init__()
+
+    def _ensure_storage(self):
+        """Открыть базу и создать схему"""
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _load(self):
+        """Обновить схему и однократно перенести данные из notifications.json"""
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        for target in range(max(version, 1) + 1, SCHEMA_VERSION + 1):
+            for statement in MIGRATIONS[target]:
+                self._conn.execute(statement)
+
+        if version == 0 and os.path.exists(DATA_FILE):
+            count = self.migrate_from_json(DATA_FILE)
+            logger.info(f"Перенесено {count} напоминаний из {DATA_FILE} в {self.path}")
+
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _begin(self):
+        """Открыть транзакцию, она фиксируется в flush()"""
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN")
+
+    def flush(self):
+        """Дописать архив и зафиксировать накопленные изменения"""
+        with self._lock:
+            self._flush_archive()
+            if self._conn.in_transaction:
+                self._conn.execute("COMMIT")
+
+    def migrate_from_json(self, path: str) -> int:
+        """
+        Перенести напоминания из JSON файла
+
+        Args:
+            path: Путь к notifications.json
+
+        Returns:
+            Количество перенесенных напоминаний
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            notifications = json.load(f)
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(INSERT_SQL, (self._to_row(n) for n in notifications))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return len(notifications)
+
+    @staticmethod
+    def _to_row(notification: Dict) -> tuple:
+        """Напоминание -> строка таблицы"""
+        return (
+            notification["id"],
+            notification["chatId"],
+            notification["date"],
+            notification_due(notification),
+            notification["text"],
+            int(notification["sent"]),
+            notification["createdAt"],
+            notification.get("attempts", 0),
+            notification.get("lastError"),
+            notification.get("retryAt"),
+            json.dumps(notification["rule"]) if notification.get("rule") else None
+        )
+
+    @staticmethod
+    def _from_row(row: tuple) -> Dict:
+        """Строка таблицы -> напоминание"""
+        notification = {
+            "id": row[0],
+            "chatId": row[1],
+            "date": row[2],
+            "text": row[3],
+            "sent": bool(row[4]),
+            "createdAt": row[5]
+        }
+        if row[6]:
+            notification["attempts"] = row[6]
+            notification["lastError"] = row[7]
+            notification["retryAt"] = row[8]
+        if row[9]:
+            notification["rule"] = json.loads(row[9])
+        return notification
+
+    def _insert(self, notification: Dict):
+        """Добавить напоминание в горячий набор"""
+        self._begin()
+        self._conn.execute(INSERT_SQL, self._to_row(notification))
+
+    def _get(self, notification_id: str) -> Optional[Dict]:
+        """Найти напоминание в горячем наборе"""
+        row = self._conn.execute(SELECT_ONE_SQL, (notification_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def _remove(self, notification_id: str) -> bool:
+        """Убрать напоминание из горячего набора"""
+        self._begin()
+        return self._conn.execute(DELETE_SQL, (notification_id,)).rowcount > 0
+
+    def _pending(
+        self,
+        now: float,
+        partitions: Optional[Collection[int]] = None,
+        partition_count: int = None
+    ) -> List[Dict]:
+        """Неотправленные напоминания с due <= now в партициях"""
+        if partitions is None:
+            rows = self._conn.execute(SELECT_PENDING_SQL, (now,)).fetchall()
+        else:
+            rows = self._conn.execute(
+                SELECT_PENDING_PARTITIONS_SQL,
+                (now, partition_count or Config.SCHEDULER_PARTITIONS, json.dumps(sorted(partitions)))
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def _upcoming(self, chat_id: int, now: float) -> List[Dict]:
+        """Неотправленные напоминания пользователя с датой позже now"""
+        rows = self._conn.execute(SELECT_USER_SQL, (chat_id, now)).fetchall()
+        # due_at сдвинут повтором отправки, а пользователю важна назначенная дата
+        scheduled = [(due_timestamp(row[2]), self._from_row(row)) for row in rows]
+        scheduled.sort(key=lambda item: item[0])
+        return [n for due, n in scheduled if due > now]
+
+    def _next_due(self, partitions: Optional[Collection[int]] = None, partition_count: int = None) -> Optional[float]:
+        """Время ближайшего неотправленного напоминания в партициях"""
+        if partitions is None:
+            return self._conn.execute(NEXT_DUE_SQL).fetchone()[0]
+
+        row = self._conn.execute(
+            NEXT_DUE_PARTITIONS_SQL,
+            (partition_count or Config.SCHEDULER_PARTITIONS, json.dumps(sorted(partitions)))
+        ).fetchone()
+        return row[0] if row else None
+
+    def _count_pending(self) -> int:
+        """Количество неотправленных напоминаний"""
+        return self._conn.execute(COUNT_PENDING_SQL).fetchone()[0]
+
+    def data_files(self) -> List[str]:
+        """База и ее WAL"""
+        return [self.path, self.path + "-wal"]
+
+    def _archive_sent(self):
+        """Перенести в архив отправленные напоминания, оставшиеся в таблице"""
+        with self._lock:
+            sent = [self._from_row(row) for row in self._conn.execute(SELECT_SENT_SQL).fetchall()]
+            for n in sent:
+                self._move_to_archive(n)
+
+            if sent:
+                self._persist()
+                logger.info(f"Перенесено в архив {len(sent)} отправленных напоминаний")
@@ -1,10 +1,16 @@
 import json
 import logging
 import os
-from datetime import datetime
-from typing import List, Dict, Optional
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Collection, Iterator, List, Dict, Optional
 from dateutil import parser as date_parser
-from dateutil.relativedelta import relativedelta
+from config.config import Config
+from services.archive import NotificationArchive
+from services.leases import partition_of
+from services.recurrence import first_occurrence, next_occurrence, validate_rule
+from services.notification_index import NotificationIndex
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +21,18 @@ DATA_FILE = os.path.join(DATA_DIR, "notifications.json")
 class Storage:
     """Сервис для хранения напоминаний в JSON файле"""
     
+    # False - изменения копятся в памяти до явного вызова flush()
+    autoflush = True
+    
     def __init__(self):
+        self._lock = threading.RLock()
+        self._index = NotificationIndex()
+        self._dirty = False
+        self._archive = NotificationArchive()
+        self._archive_buffer: List[Dict] = []
         self._ensure_storage()
+        self._load()
+        self._archive_sent()
     
     def _ensure_storage(self):
         """Создать директорию и файл если их нет"""
@@ -25,6 +41,11 @@ class Storage:
         if not os.path.exists(DATA_FILE):
             self._write_data([])
     
+    def _load(self):
+        """Загрузить напоминания в индекс"""
+        for n in self._read_data():
+            self._index.add(n)
+    
     def _read_data(self) -> List[Dict]:
         """Прочитать данные из файла"""
         try:
@@ -40,14 +61,161 @@ class Storage:
     def _write_data(self, data: List[Dict]) -> bool:
         """Записать данные в файл"""
         try:
-            with open(DATA_FILE, 'w', encoding='utf-8') as f:
+            # Пишем во временный файл и атомарно подменяем, чтобы падение
+            # посреди записи не портило notifications.json
+            tmp_file = DATA_FILE + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, DATA_FILE)
             return True
         except Exception as e:
             logger.error(f"Ошибка записи файла: {e}")
             return False
     
-    def add_notification(self, chat_id: int, date: str, text: str) -> Optional[Dict]:
+    def _insert(self, notification: Dict):
+        """Добавить напоминание в горячий набор"""
+        self._index.add(notification)
+    
+    def _get(self, notification_id: str) -> Optional[Dict]:
+        """Найти напоминание в горячем наборе"""
+        return self._index.get(notification_id)
+    
+    def _remove(self, notification_id: str) -> bool:
+        """Убрать напоминание из горячего набора"""
+        return self._index.remove(notification_id) is not None
+    
+    def _pending(
+        self,
+        now: float,
+        partitions: Optional[Collection[int]] = None,
+        partition_count: int = None
+    ) -> List[Dict]:
+        """Неотправленные напоминания с due <= now (фильтр партиций необязателен)"""
+        return self._index.pending(now)
+    
+    def _upcoming(self, chat_id: int, now: float) -> List[Dict]:
+        """Неотправленные напоминания пользователя с due > now"""
+        return self._index.upcoming(chat_id, now)
+    
+    def _next_due(self, partitions: Optional[Collection[int]] = None, partition_count: int = None) -> Optional[float]:
+        """Время ближайшего неотправленного напоминания в партициях"""
+        if partitions is None:
+            return self._index.next_due()
+        return self._index.next_due(lambda chat_id: partition_of(chat_id, partition_count) in partitions)
+    
+    def _count_pending(self) -> int:
+        """Количество неотправленных напоминаний"""
+        return self._index.pending_count()
+    
+    def data_files(self) -> List[str]:
+        """Файлы горячего набора на диске"""
+        return [DATA_FILE]
+    
+    def _move_to_archive(self, notification: Dict):
+        """Перенести напоминание из горячего набора в очередь архива"""
+        self._archive_buffer.append(notification)
+        self._remove(notification["id"])
+    
+    def _archive_sent(self):
+        """Перенести в архив отправленные напоминания, оставшиеся в горячем наборе"""
+        with self._lock:
+            sent = [n for n in self._index.all() if n["sent"]]
+            for n in sent:
+                self._move_to_archive(n)
+            
+            if sent:
+                self._persist()
+                logger.info(f"Перенесено в архив {len(sent)} отправленных напоминаний")
+    
+    def _flush_archive(self):
+        """Дописать накопленные архивные записи в сегменты"""
+        if self._archive_buffer:
+            self._archive.append(self._archive_buffer)
+            self._archive_buffer = []
+    
+    def _persist(self):
+        """Сохранить изменения сразу или отложить до flush()"""
+        self._dirty = True
+        if self.autoflush:
+            self.flush()
+    
+    def flush(self):
+        """
+        Записать накопленные изменения на диск
+        
+        Архив пишется раньше горячего набора: при падении между ними
+        напоминание окажется в обоих местах, но не потеряется.
+        
+        Raises:
+            IOError: Если записать не удалось
+        """
+        with self._lock:
+            self._flush_archive()
+            if not self._dirty:
+                return
+            if not self._write_data(self._index.all()):
+                raise IOError(f"Не удалось записать {DATA_FILE}")
+            self._dirty = False
+    
+    def _make_notification(self, chat_id: int, date: str, text: str, rule: Dict = None) -> Dict:
+        """
+        Создать запись напоминания
+        
+        Args:
+            chat_id: ID чата пользователя
+            date: Дата в формате DD.MM.YYYY
+            text: Текст напоминания
+            rule: Правило повтора (см. services.recurrence)
+            
+        Returns:
+            Новое напоминание
+            
+        Raises:
+            ValueError: Если дата или правило в неверном формате
+        """
+        # Парсим дату
+        parsed_date = datetime.strptime(date, '%d.%m.%Y')
+        
+        notification = {
+            "id": str(datetime.now().timestamp()),
+            "chatId": chat_id,
+            "date": parsed_date.isoformat(),
+            "text": text,
+            "sent": False,
+            "createdAt": datetime.now().isoformat()
+        }
+        
+        if rule:
+            validate_rule(rule)
+            if rule["freq"] == "monthly":
+                rule = dict(rule, day=parsed_date.day)
+            notification["date"] = first_occurrence(rule, parsed_date).isoformat()
+            notification["rule"] = rule
+        
+        return notification
+    
+    def _advance(self, notification: Dict):
+        """
+        Перевести повторяющееся напоминание на следующее срабатывание
+        
+        Пропущенные срабатывания (бот был выключен) не догоняются.
+        """
+        now = datetime.now()
+        current = date_parser.parse(notification["date"])
+        next_date = next_occurrence(notification["rule"], current)
+        while next_date.timestamp() <= now.timestamp():
+            next_date = next_occurrence(notification["rule"], next_date)
+        
+        advanced = {
+            k: v for k, v in notification.items()
+            if k not in ("attempts", "lastError", "retryAt")
+        }
+        advanced["date"] = next_date.isoformat()
+        self._insert(advanced)
+    
+    def add_notification(self, chat_id: int, date: str, text: str, rule: Dict = None) -> Optional[Dict]:
         """
         Добавить новое напоминание
         
@@ -55,26 +223,17 @@ class Storage:
             chat_id: ID чата пользователя
             date: Дата в формате DD.MM.YYYY
             text: Текст напоминания
+            rule: Правило повтора, None - разовое напоминание
             
         Returns:
             Созданное напоминание или None
         """
         try:
-            # Парсим дату
-            parsed_date = datetime.strptime(date, '%d.%m.%Y')
-            
-            notification = {
-                "id": str(datetime.now().timestamp()),
-                "chatId": chat_id,
-                "date": parsed_date.isoformat(),
-                "text": text,
-                "sent": False,
-                "createdAt": datetime.now().isoformat()
-            }
-            
-            data = self._read_data()
-            data.append(notification)
-            self._write_data(data)
+            notification = self._make_notification(chat_id, date, text, rule)
+            
+            with self._lock:
+                self._insert(notification)
+                self._persist()
             
             return notification
         except ValueError as e:
@@ -94,35 +253,66 @@ class Storage:
         Returns:
             Список активных напоминаний
         """
-        now = datetime.now()
-        notifications = self._read_data()
-        
-        return [
-            n for n in notifications 
-            if n["chatId"] == chat_id 
-            and not n["sent"] 
-            and date_parser.parse(n["date"]) > now
-        ]
+        with self._lock:
+            return self._upcoming(chat_id, time.time())
     
-    def get_pending_notifications(self) -> List[Dict]:
+    def get_pending_notifications(
+        self,
+        partitions: Optional[Collection[int]] = None,
+        partition_count: int = None
+    ) -> List[Dict]:
         """
         Получить напоминания, которые пора отправить
         
+        Args:
+            partitions: Только чаты из этих партиций (см. services.leases)
+            partition_count: Общее число партиций, по умолчанию SCHEDULER_PARTITIONS
+            
         Returns:
             Список ожидающих отправки напоминаний
         """
-        now = datetime.now()
-        notifications = self._read_data()
+        with self._lock:
+            pending = self._pending(time.time(), partitions, partition_count)
+        
+        if partitions is None:
+            return pending
+        return [n for n in pending if partition_of(n["chatId"], partition_count) in partitions]
+    
+    def get_notification(self, notification_id: str) -> Optional[Dict]:
+        """
+        Получить напоминание из горячего набора
+        
+        Args:
+            notification_id: ID напоминания
+            
+        Returns:
+            Напоминание или None
+        """
+        with self._lock:
+            return self._get(notification_id)
+    
+    def next_due_at(self, partitions: Optional[Collection[int]] = None, partition_count: int = None) -> Optional[float]:
+        """
+        Время ближайшего неотправленного напоминания
         
-        return [
-            n for n in notifications 
-            if not n["sent"] 
-            and date_parser.parse(n["date"]) <= now
-        ]
+        Args:
+            partitions: Только чаты из этих партиций
+            partition_count: Общее число партиций, по умолчанию SCHEDULER_PARTITIONS
+            
+        Returns:
+            UTC epoch или None, если ожидающих напоминаний нет
+        """
+        with self._lock:
+            return self._next_due(partitions, partition_count)
+    
+    @staticmethod
+    def _retry_delay(attempts: int) -> float:
+        """Экспоненциальная пауза перед повторной отправкой"""
+        return min(Config.REMINDER_RETRY_DELAY * 2 ** (attempts - 1), Config.REMINDER_RETRY_MAX_DELAY)
     
     def mark_as_sent(self, notification_id: str) -> bool:
         """
-        Отметить напоминание как отправленное
+        Отметить напоминание как отправленное и перенести его в архив
         
         Args:
             notification_id: ID напоминания
@@ -130,23 +320,78 @@ class Storage:
         Returns:
             True если успешно, False иначе
         """
-        try:
-            data = self._read_data()
-            updated = False
+        return self.record_deliveries([notification_id]) > 0
+    
+    def mark_many_sent(self, notification_ids: List[str]) -> int:
+        """
+        Отметить несколько напоминаний отправленными одной записью
+        
+        Args:
+            notification_ids: ID напоминаний
             
-            for n in data:
-                if n["id"] == notification_id:
-                    n["sent"] = True
-                    updated = True
-                    break
+        Returns:
+            Количество отмеченных напоминаний
+        """
+        return self.record_deliveries(notification_ids)
+    
+    def record_deliveries(self, sent_ids: List[str], failed: Dict[str, str] = None) -> int:
+        """
+        Записать результаты доставки за один проход планировщика
+        
+        Доставленные напоминания уходят в архив, у недоставленных
+        увеличивается счетчик попыток, и они остаются в горячем наборе
+        для повторной отправки. Все изменения сохраняются одной записью.
+        
+        Args:
+            sent_ids: ID доставленных напоминаний
+            failed: ID недоставленных напоминаний -> текст ошибки
             
-            if updated:
-                self._write_data(data)
+        Returns:
+            Количество напоминаний, отмеченных отправленными
+        """
+        failed = failed or {}
+        
+        try:
+            with self._lock:
+                sent_at = datetime.now().isoformat()
+                count = 0
+                
+                for notification_id in sent_ids:
+                    notification = self._get(notification_id)
+                    if notification is None:
+                        continue
+                    if notification.get("rule"):
+                        # В архив уходит срабатывание, само правило остается
+                        self._archive_buffer.append(dict(
+                            notification,
+                            id=f"{notification_id}@{notification['date']}",
+                            sent=True,
+                            sentAt=sent_at
+                        ))
+                        self._advance(notification)
+                    else:
+                        self._move_to_archive(dict(notification, sent=True, sentAt=sent_at))
+                    count += 1
+                
+                for notification_id, error in failed.items():
+                    notification = self._get(notification_id)
+                    if notification is None:
+                        continue
+                    attempts = notification.get("attempts", 0) + 1
+                    self._insert(dict(
+                        notification,
+                        attempts=attempts,
+                        lastError=error,
+                        retryAt=(datetime.now() + timedelta(seconds=self._retry_delay(attempts))).isoformat()
+                    ))
+                
+                if count or failed:
+                    self._persist()
             
-            return updated
+            return count
         except Exception as e:
-            logger.error(f"Ошибка отметки напоминания: {e}")
-            return False
+            logger.error(f"Ошибка записи результатов доставки: {e}")
+            return 0
     
     def delete_notification(self, notification_id: str) -> bool:
         """
@@ -159,14 +404,93 @@ class Storage:
             True если успешно, False иначе
         """
         try:
-            data = self._read_data()
-            data = [n for n in data if n["id"] != notification_id]
-            self._write_data(data)
+            with self._lock:
+                if self._remove(notification_id):
+                    self._persist()
             return True
         except Exception as e:
             logger.error(f"Ошибка удаления напоминания: {e}")
             return False
     
+    def archive_expired(
+        self,
+        max_age_days: int = None,
+        partitions: Optional[Collection[int]] = None,
+        partition_count: int = None
+    ) -> int:
+        """
+        Перенести в архив напоминания, которые так и не удалось отправить
+        
+        Args:
+            max_age_days: Сколько дней после даты напоминания ждать отправки
+            partitions: Только чаты из этих партиций
+            partition_count: Общее число партиций, по умолчанию SCHEDULER_PARTITIONS
+            
+        Returns:
+            Количество перенесенных напоминаний
+        """
+        if max_age_days is None:
+            max_age_days = Config.ARCHIVE_EXPIRE_DAYS
+        cutoff = time.time() - max_age_days * 86400
+        
+        try:
+            with self._lock:
+                expired = self._pending(cutoff, partitions, partition_count)
+                if partitions is not None:
+                    expired = [n for n in expired if partition_of(n["chatId"], partition_count) in partitions]
+                for n in expired:
+                    if n.get("rule"):
+                        self._advance(n)
+                    else:
+                        self._move_to_archive(dict(n, expired=True))
+                
+                if expired:
+                    self._persist()
+            
+            return len(expired)
+        except Exception as e:
+            logger.error(f"Ошибка архивации просроченных напоминаний: {e}")
+            return 0
+    
+    def query_archive(
+        self,
+        chat_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Iterator[Dict]:
+        """
+        Потоково прочитать архив
+        
+        Args:
+            chat_id: Только напоминания этого чата
+            since: Только напоминания с датой не раньше
+            until: Только напоминания с датой раньше
+            
+        Returns:
+            Итератор архивных напоминаний
+        """
+        with self._lock:
+            self._flush_archive()
+        return self._archive.query(chat_id, since, until)
+    
+    def get_stats(self) -> dict:
+        """
+        Получить статистику хранилища
+        
+        Returns:
+            Словарь: количество неотправленных напоминаний и размер файлов
+        """
+        with self._lock:
+            pending = self._count_pending()
+        
+        size = 0
+        for path in self.data_files():
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        return {"pending": pending, "file_bytes": size}
+    
     def format_date(self, iso_date: str) -> str:
         """
         Форматировать ISO дату в DD.MM.YYYY
@@ -181,4 +505,25 @@ class Storage:
             dt = date_parser.parse(iso_date)
             return dt.strftime('%d.%m.%Y')
         except Exception:
-            return iso_date
\ No newline at end of file
+            return iso_date
+
+
+def create_storage() -> Storage:
+    """
+    Создать хранилище напоминаний согласно Config.STORAGE_BACKEND
+    
+    Returns:
+        Экземпляр хранилища
+    """
+    backend = Config.STORAGE_BACKEND
+    
+    if backend == "json":
+        return Storage()
+    if backend == "journal":
+        from services.journal_storage import JournalStorage
+        return JournalStorage()
+    if backend == "sqlite":
+        from services.sqlite_storage import SQLiteStorage
+        return SQLiteStorage()
+    
+    raise ValueError(f"Неизвестный тип хранилища: {backend}")
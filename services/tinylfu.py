@@ -0,0 +1,312 @@
+import heapq
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+# Доля окна допуска и защищенного сегмента (как в Caffeine)
+WINDOW_RATIO = 0.01
+PROTECTED_RATIO = 0.8
+# Счетчики частоты - 4 бита, при насыщении все делятся пополам
+MAX_COUNT = 15
+SKETCH_DEPTH = 4
+SKETCH_SEEDS = (
+    0x9E3779B97F4A7C15,
+    0xC2B2AE3D27D4EB4F,
+    0x165667B19E3779F9,
+    0xD6E8FEB86659FD93
+)
+MASK64 = (1 << 64) - 1
+
+WINDOW = "window"
+PROBATION = "probation"
+PROTECTED = "protected"
+
+
+class FrequencySketch:
+    """
+    Приблизительные частоты обращений к ключам (Count-Min Sketch)
+
+    Счетчики ограничены MAX_COUNT. После sample_size увеличений все
+    счетчики делятся пополам, чтобы старая популярность постепенно
+    забывалась.
+    """
+
+    def __init__(self, capacity: int):
+        width = 16
+        while width < capacity:
+            width <<= 1
+        self._bits = width.bit_length() - 1
+        self._width = width
+        self._table = bytearray(width * SKETCH_DEPTH)
+        self.sample_size = max(capacity, 16) * 10
+        self._additions = 0
+
+    def _slots(self, key: Hashable) -> List[int]:
+        h = hash(key) & MASK64
+        shift = 64 - self._bits
+        return [
+            row * self._width + (((h * seed) & MASK64) >> shift)
+            for row, seed in enumerate(SKETCH_SEEDS)
+        ]
+
+    def frequency(self, key: Hashable) -> int:
+        """Оценка числа обращений к ключу"""
+        table = self._table
+        return min(table[slot] for slot in self._slots(key))
+
+    def increment(self, key: Hashable):
+        """Учесть обращение к ключу"""
+        table = self._table
+        added = False
+        for slot in self._slots(key):
+            if table[slot] < MAX_COUNT:
+                table[slot] += 1
+                added = True
+
+        if added:
+            self._additions += 1
+            if self._additions >= self.sample_size:
+                self._reset()
+
+    def _reset(self):
+        """Состарить все счетчики"""
+        self._table = bytearray(count >> 1 for count in self._table)
+        self._additions //= 2
+
+
+class TinyLFUCache:
+    """
+    Кэш с ограничением объема в байтах и политикой допуска W-TinyLFU
+
+    Новые записи попадают в небольшое LRU-окно. Вытесненная из окна
+    запись допускается в основную часть (сегментированный LRU: испытательный
+    и защищенный сегменты), только если к ней обращались чаще, чем к
+    записи, которую придется вытеснить. Поэтому поток разовых ключей не
+    вымывает популярные.
+
+    У каждой записи свой срок удаления по time.time(). Об уходе ключа
+    из кэша по любой причине сообщается через on_evict(key).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        expected_entries: int,
+        on_evict: Optional[Callable[[Hashable], None]] = None,
+        timer: Callable[[], float] = time.time
+    ):
+        self.max_bytes = max_bytes
+        self.expected_entries = expected_entries
+        self._on_evict = on_evict
+        self._timer = timer
+        self._sketch = FrequencySketch(expected_entries)
+
+        self._window_max = max(int(max_bytes * WINDOW_RATIO), 1)
+        self._main_max = max_bytes - self._window_max
+        self._protected_max = int(self._main_max * PROTECTED_RATIO)
+
+        # Сегмент -> ключ -> (значение, размер, срок удаления), от давних к недавним
+        self._segments: Dict[str, "OrderedDict[Hashable, Tuple[Any, int, float]]"] = {
+            WINDOW: OrderedDict(),
+            PROBATION: OrderedDict(),
+            PROTECTED: OrderedDict()
+        }
+        self._bytes = {WINDOW: 0, PROBATION: 0, PROTECTED: 0}
+        self._where: Dict[Hashable, str] = {}
+        # Сроки удаления; устаревшие после перезаписи пропускаются при разборе
+        self._deadlines: List[Tuple[float, int, Hashable]] = []
+        self._seq = 0
+        self._stats = {"evictions": 0, "expirations": 0, "rejections": 0}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._where))
+
+    @property
+    def currsize(self) -> int:
+        """Занятый объем в байтах"""
+        return sum(self._bytes.values())
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Получить значение и отметить обращение
+
+        Returns:
+            Значение или None, если ключа нет или срок вышел
+        """
+        self._sketch.increment(key)
+        segment = self._where.get(key)
+        if segment is None:
+            return None
+
+        value, size, deadline = self._segments[segment][key]
+        if deadline <= self._timer():
+            self._remove(key)
+            self._stats["expirations"] += 1
+            self._notify(key)
+            return None
+
+        if segment == PROBATION:
+            # Повторное обращение переводит запись в защищенный сегмент
+            self._move(key, PROBATION, PROTECTED)
+            self._demote()
+        else:
+            self._segments[segment].move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, size: int, deadline: float) -> bool:
+        """
+        Сохранить значение
+
+        Args:
+            key: Ключ
+            value: Значение
+            size: Оценка объема записи в байтах
+            deadline: Когда удалить запись (по time.time())
+
+        Returns:
+            False, если запись больше всего кэша или уже истекла
+        """
+        self.expire()
+        existed = key in self._where
+        if existed:
+            self._remove(key)
+        elif size <= self.max_bytes:
+            self._sketch.increment(key)
+
+        if size > self.max_bytes or deadline <= self._timer():
+            self._stats["rejections"] += 1
+            if existed:
+                self._notify(key)
+            return False
+
+        self._where[key] = WINDOW
+        self._segments[WINDOW][key] = (value, size, deadline)
+        self._bytes[WINDOW] += size
+        self._seq += 1
+        heapq.heappush(self._deadlines, (deadline, self._seq, key))
+
+        self._evict()
+        if len(self._deadlines) > 2 * len(self._where) + 64:
+            self._compact_deadlines()
+        return True
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Удалить ключ; возвращает значение или None"""
+        if key not in self._where:
+            return None
+        value = self._remove(key)
+        self._notify(key)
+        return value
+
+    def clear(self):
+        """Удалить все записи"""
+        keys = list(self._where)
+        for segment in self._segments.values():
+            segment.clear()
+        self._bytes = {name: 0 for name in self._bytes}
+        self._where.clear()
+        self._deadlines = []
+        for key in keys:
+            self._notify(key)
+
+    def expire(self, now: float = None):
+        """Удалить записи с истекшим сроком"""
+        if now is None:
+            now = self._timer()
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            deadline, _, key = heapq.heappop(deadlines)
+            segment = self._where.get(key)
+            if segment is None or self._segments[segment][key][2] != deadline:
+                continue
+            self._remove(key)
+            self._stats["expirations"] += 1
+            self._notify(key)
+
+    def _evict(self):
+        """Разгрузить окно в основную часть, решая, кого из кандидатов оставить"""
+        window = self._segments[WINDOW]
+        probation = self._segments[PROBATION]
+        protected = self._segments[PROTECTED]
+
+        while self._bytes[WINDOW] > self._window_max and window:
+            candidate = next(iter(window))
+            self._move(candidate, WINDOW, PROBATION)
+            size = probation[candidate][1]
+
+            while self._bytes[PROBATION] + self._bytes[PROTECTED] > self._main_max:
+                victim = next((key for key in probation if key != candidate), None)
+                if victim is None:
+                    victim = next(iter(protected), None)
+                if victim is None:
+                    break
+
+                if self._sketch.frequency(candidate) > self._sketch.frequency(victim):
+                    self._remove(victim)
+                    self._stats["evictions"] += 1
+                    self._notify(victim)
+                else:
+                    self._remove(candidate)
+                    self._stats["evictions"] += 1
+                    self._notify(candidate)
+                    break
+
+            # Запись больше основной части целиком не удержать
+            if candidate in probation and size > self._main_max:
+                self._remove(candidate)
+                self._stats["evictions"] += 1
+                self._notify(candidate)
+
+    def _demote(self):
+        """Вернуть давние записи защищенного сегмента в испытательный"""
+        protected = self._segments[PROTECTED]
+        while self._bytes[PROTECTED] > self._protected_max and protected:
+            self._move(next(iter(protected)), PROTECTED, PROBATION)
+
+    def _move(self, key: Hashable, source: str, target: str):
+        """Перенести запись в конец другого сегмента"""
+        entry = self._segments[source].pop(key)
+        self._bytes[source] -= entry[1]
+        self._segments[target][key] = entry
+        self._bytes[target] += entry[1]
+        self._where[key] = target
+
+    def _remove(self, key: Hashable) -> Any:
+        """Убрать запись без уведомления"""
+        segment = self._where.pop(key)
+        value, size, _ = self._segments[segment].pop(key)
+        self._bytes[segment] -= size
+        return value
+
+    def _compact_deadlines(self):
+        """Выбросить из кучи сроки перезаписанных и удаленных ключей"""
+        self._deadlines = [
+            item for item in self._deadlines
+            if item[2] in self._where
+            and self._segments[self._where[item[2]]][item[2]][2] == item[0]
+        ]
+        heapq.heapify(self._deadlines)
+
+    def _notify(self, key: Hashable):
+        if self._on_evict is not None:
+            self._on_evict(key)
+
+    def get_stats(self) -> dict:
+        """
+        Получить статистику вытеснения
+
+        Returns:
+            Словарь со статистикой
+        """
+        return {
+            **self._stats,
+            "window_bytes": self._bytes[WINDOW],
+            "probation_bytes": self._bytes[PROBATION],
+            "protected_bytes": self._bytes[PROTECTED]
+        }
@@ -0,0 +1,193 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional
+
+
+class UpstreamUnavailable(Exception):
+    """Апстрим недоступен: открыт автомат или нет свободных слотов"""
+
+
+class AdaptiveLimiter:
+    """
+    Адаптивный лимит одновременных запросов (AIMD)
+
+    Пока ответы быстрее latency_target, лимит растет примерно на единицу
+    за каждые limit запросов. Медленный ответ или перегрузка апстрима
+    (таймаут, 429, 5xx) уменьшают лимит в backoff раз, но не чаще раза
+    за latency_target, чтобы одна волна ошибок не обнуляла лимит.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        backoff: float = 0.7
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+        self._last_decrease = 0.0
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self, timeout: Optional[float] = None):
+        """
+        Занять слот, дождавшись его освобождения
+
+        Raises:
+            UpstreamUnavailable: Если слот не освободился за timeout
+        """
+        async with self._cond:
+            try:
+                await asyncio.wait_for(self._cond.wait_for(self._has_slot), timeout)
+            except asyncio.TimeoutError:
+                raise UpstreamUnavailable("Нет свободных слотов для запроса к GPT")
+            self.in_flight += 1
+
+    def try_acquire(self) -> bool:
+        """Занять слот, только если он свободен прямо сейчас"""
+        if not self._has_slot():
+            return False
+        self.in_flight += 1
+        return True
+
+    async def release(self, latency: float, ok: Optional[bool]):
+        """
+        Освободить слот и подстроить лимит
+
+        Args:
+            latency: Длительность запроса
+            ok: True - апстрим ответил, False - перегрузка, None - не учитывать (отмена)
+        """
+        self.in_flight -= 1
+        now = time.monotonic()
+        if ok and latency <= self.latency_target:
+            self.limit = min(self.limit + 1 / self.limit, self.max_limit)
+        elif ok is not None and now - self._last_decrease >= self.latency_target:
+            self.limit = max(self.limit * self.backoff, self.min_limit)
+            self._last_decrease = now
+
+        async with self._cond:
+            self._cond.notify_all()
+
+    def get_stats(self) -> dict:
+        """
+        Получить статистику лимита
+
+        Returns:
+            Словарь со статистикой
+        """
+        return {"limit": round(self.limit, 2), "in_flight": self.in_flight}
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель запросов к апстриму
+
+    Размыкается, когда доля ошибок среди последних window вызовов достигает
+    threshold. Разомкнутый сразу отказывает, через cooldown пропускает
+    один пробный вызов: успех замыкает цепь, ошибка снова размыкает.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: float, window: int, cooldown: float, min_calls: int = None):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.min_calls = min_calls or max(window // 2, 1)
+        self.state = self.CLOSED
+        self._results: deque = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {"opened": 0, "rejected": 0}
+
+    def allow(self) -> bool:
+        """Можно ли сейчас обращаться к апстриму"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.cooldown:
+                self._stats["rejected"] += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                self._stats["rejected"] += 1
+                return False
+            self._probing = True
+        return True
+
+    def record(self, ok: Optional[bool]):
+        """
+        Учесть результат вызова
+
+        Args:
+            ok: True - успех, False - ошибка апстрима, None - вызов отменен
+        """
+        if self.state == self.HALF_OPEN:
+            self._probing = False
+            if ok:
+                self.state = self.CLOSED
+                self._results.clear()
+            elif ok is not None:
+                self._open()
+            return
+
+        if ok is None:
+            return
+        self._results.append(ok)
+        failures = self._results.count(False)
+        if len(self._results) >= self.min_calls and failures / len(self._results) >= self.threshold:
+            self._open()
+
+    def _open(self):
+        """Разомкнуть цепь"""
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._results.clear()
+        self._stats["opened"] += 1
+
+    def get_stats(self) -> dict:
+        """
+        Получить статистику выключателя
+
+        Returns:
+            Словарь со статистикой
+        """
+        return {"state": self.state, **self._stats}
+
+
+class LatencyWindow:
+    """Скользящее окно длительностей успешных запросов для перцентилей"""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque = deque(maxlen=size)
+
+    def add(self, latency: float):
+        self._samples.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Перцентиль длительности
+
+        Args:
+            q: Доля от 0 до 1
+
+        Returns:
+            Значение или None, пока замеров нет
+        """
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(math.ceil(q * len(ordered)) - 1, len(ordered) - 1)]
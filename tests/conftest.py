@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Пустой рабочий каталог: хранилища пишут в data/ относительно него"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
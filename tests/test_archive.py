@@ -0,0 +1,47 @@
+import json
+from datetime import datetime, timezone
+from services.archive import NotificationArchive
+from services.storage import DATA_FILE, Storage
+
+
+def make(notification_id, chat_id, date):
+    return {"id": notification_id, "chatId": chat_id, "date": date, "text": "", "sent": True, "createdAt": date}
+
+
+def test_segments_by_month_and_filters(tmp_path):
+    archive = NotificationArchive(str(tmp_path))
+    archive.append([
+        make("jan", 1, "2024-01-10T00:00:00+00:00"),
+        make("feb", 1, "2024-02-10T00:00:00+00:00"),
+        make("feb-other", 2, "2024-02-20T00:00:00+00:00"),
+    ])
+    archive.append([make("mar", 1, "2024-03-10T00:00:00+00:00")])
+
+    assert archive.months() == ["2024-01", "2024-02", "2024-03"]
+    assert [n["id"] for n in archive.query(chat_id=1)] == ["jan", "feb", "mar"]
+    since = datetime(2024, 2, 15, tzinfo=timezone.utc)
+    until = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    assert [n["id"] for n in archive.query(since=since, until=until)] == ["feb-other"]
+
+
+def test_torn_member_keeps_earlier_records(tmp_path):
+    archive = NotificationArchive(str(tmp_path))
+    archive.append([make("kept", 1, "2024-01-10T00:00:00+00:00")])
+    path = archive._segment_path("2024-01")
+    with open(path, "ab") as f:
+        f.write(b"\x1f\x8b\x08\x00broken")
+
+    assert [n["id"] for n in archive.query()] == ["kept"]
+
+
+def test_sent_reminders_leave_hot_set(workdir):
+    storage = Storage()
+    created = storage.add_notification(1, "01.01.2099", "отправлено")
+    storage.mark_as_sent(created["id"])
+
+    assert storage.get_notification(created["id"]) is None
+    archived = list(storage.query_archive(chat_id=1))
+    assert [n["id"] for n in archived] == [created["id"]]
+    assert archived[0]["sent"] is True
+    with open(DATA_FILE, encoding="utf-8") as f:
+        assert json.load(f) == []
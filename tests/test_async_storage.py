@@ -0,0 +1,61 @@
+import asyncio
+import json
+from services.async_storage import STORAGE_DURATION, AsyncStorage
+from services.storage import DATA_FILE, Storage
+
+
+def saved_texts():
+    with open(DATA_FILE, encoding="utf-8") as f:
+        return [n["text"] for n in json.load(f)]
+
+
+async def test_concurrent_writes_share_one_flush(workdir):
+    storage = Storage()
+    flushes = []
+    flush = storage.flush
+    storage.flush = lambda: flushes.append(1) or flush()
+    async_storage = AsyncStorage(storage, flush_interval=0.01)
+
+    created = await asyncio.gather(*(
+        async_storage.add_notification(1, "01.01.2099", f"напоминание {i}") for i in range(10)
+    ))
+
+    assert all(created)
+    assert len(flushes) == 1
+    assert len(saved_texts()) == 10
+    await async_storage.close()
+
+
+async def test_failed_add_is_not_persisted_later(workdir):
+    storage = Storage()
+    write_data = storage._write_data
+    failures = [True]
+    storage._write_data = lambda data: False if failures and failures.pop() else write_data(data)
+    async_storage = AsyncStorage(storage, flush_interval=0.01)
+    notified = []
+    async_storage.add_listener(notified.append)
+
+    assert await async_storage.add_notification(1, "01.01.2099", "не сохранилось") is None
+    assert notified == []
+
+    # Следующий успешный сброс не должен дописать напоминание, о котором сообщили ошибку
+    assert await async_storage.add_notification(1, "02.01.2099", "сохранилось")
+    assert saved_texts() == ["сохранилось"]
+    assert [n["text"] for n in await async_storage.get_user_notifications(1)] == ["сохранилось"]
+    await async_storage.close()
+
+
+async def test_operation_series_are_bound_once(workdir, monkeypatch):
+    async_storage = AsyncStorage(Storage(), flush_interval=0)
+    added = STORAGE_DURATION.labels("add_notification")
+    before = sum(added.counts)
+
+    def lookup(*values):
+        raise AssertionError(f"серия {values} ищется на каждый вызов")
+
+    monkeypatch.setattr(STORAGE_DURATION, "labels", lookup)
+    await async_storage.add_notification(1, "01.01.2099", "раз")
+    await async_storage.add_notification(1, "01.01.2099", "два")
+
+    assert sum(added.counts) == before + 2
+    await async_storage.close()
@@ -0,0 +1,99 @@
+import time
+import pytest
+from config.config import Config
+from services.cache_service import CacheService
+
+
+class MemoryBackend:
+    """Второй уровень кэша в словаре"""
+
+    def __init__(self, shared: bool = False):
+        self.shared = shared
+        self.entries = {}
+        self.fail = False
+
+    async def get(self, key, stale=False):
+        if self.fail:
+            raise ConnectionError("backend down")
+        entry = self.entries.get(key)
+        if entry is None or (not stale and entry[1] <= time.time()):
+            return None
+        return entry
+
+    async def set(self, key, value, expires_at):
+        if self.fail:
+            raise ConnectionError("backend down")
+        self.entries[key] = (value, expires_at)
+
+    async def delete(self, key):
+        self.entries.pop(key, None)
+
+    async def clear(self):
+        self.entries.clear()
+
+    def hottest(self, limit):
+        return [(key, *entry) for key, entry in self.entries.items()][:limit]
+
+    async def close(self):
+        pass
+
+    def get_stats(self):
+        return {"backend": "memory"}
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch):
+    monkeypatch.setattr(Config, "CACHE_TTL", 60)
+    monkeypatch.setattr(Config, "CACHE_SWR_TTL", 60)
+    monkeypatch.setattr(Config, "CACHE_NEAR_TTL", 5)
+
+
+async def test_second_level_survives_restart():
+    backend = MemoryBackend()
+    cache = CacheService(backend)
+    assert await cache.set("k", "v")
+    assert backend.entries["k"][0] == "v"
+
+    # Новый процесс видит запись через второй уровень
+    restarted = CacheService(backend)
+    assert await restarted.get("k") == "v"
+    assert restarted.get_stats()["backend_hits"] == 1
+    assert "k" in restarted.keys()
+    assert await restarted.get("k") == "v"
+    assert restarted.get_stats()["hits"] == 1
+
+
+async def test_expired_entry_is_served_as_stale():
+    cache = CacheService(MemoryBackend())
+    cache.ttl = 0
+    await cache.set("k", "v")
+
+    assert await cache.get("k") is None
+    assert await cache.get_entry("k") == ("v", True)
+    assert cache.get_stats()["stale_hits"] == 1
+
+
+async def test_shared_backend_keeps_memory_copy_short():
+    backend = MemoryBackend(shared=True)
+    cache = CacheService(backend)
+    await cache.set("k", "v")
+
+    evicted = []
+    cache.add_eviction_listener(evicted.append)
+    cache.cache.expire(time.time() + Config.CACHE_NEAR_TTL + 1)
+    assert evicted == ["k"]
+
+    # Другая копия бота перезаписала значение - видим его после ближнего кэша
+    backend.entries["k"] = ("new", time.time() + 60)
+    assert await cache.get("k") == "new"
+
+
+async def test_backend_errors_do_not_break_cache():
+    backend = MemoryBackend()
+    cache = CacheService(backend)
+    backend.fail = True
+
+    assert await cache.set("k", "v")
+    assert await cache.get("k") == "v"
+    assert await cache.get("other") is None
+    assert cache.get_stats()["backend_errors"] == 2
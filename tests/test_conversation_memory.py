@@ -0,0 +1,65 @@
+from services.conversation_memory import SUMMARY_BATCH, ConversationMemory, estimate_tokens
+
+
+def memory(**kwargs):
+    options = dict(max_turns=4, token_budget=1000, max_chats=100, max_chars=100_000, idle_ttl=3600)
+    options.update(kwargs)
+    return ConversationMemory(**options)
+
+
+def test_keeps_last_turns_in_order():
+    chat = memory()
+    for i in range(6):
+        chat.append(1, "user" if i % 2 == 0 else "assistant", f"реплика {i}")
+
+    assert [turn["text"] for turn in chat.context(1, "вопрос")] == [f"реплика {i}" for i in range(2, 6)]
+    assert chat.context(2, "вопрос") == []
+    assert chat.get_stats()["chars"] == sum(len(f"реплика {i}") for i in range(2, 6))
+
+
+def test_token_budget_drops_oldest_turns():
+    prompt = "новый вопрос"
+    text = "х" * 30
+    budget = estimate_tokens(prompt) + 2 * estimate_tokens(text)
+    chat = memory(token_budget=budget)
+    for i in range(4):
+        chat.append(1, "user", text)
+
+    assert len(chat.context(1, prompt)) == 2
+
+
+def test_global_limits_evict_idle_chats_first():
+    chat = memory(max_chats=2)
+    for chat_id in (1, 2):
+        chat.append(chat_id, "user", "привет")
+    chat.context(1, "снова")
+    chat.append(3, "user", "привет")
+
+    assert chat.context(2, "вопрос") == []
+    assert chat.context(1, "вопрос") and chat.context(3, "вопрос")
+
+
+def test_idle_chat_is_forgotten():
+    chat = memory(idle_ttl=0.000001)
+    chat.append(1, "user", "привет")
+
+    assert chat.context(1, "вопрос") == []
+    assert chat.get_stats()["chars"] == 0
+
+
+async def test_evicted_turns_are_summarized():
+    calls = []
+
+    async def summarizer(summary, turns):
+        calls.append((summary, [turn["text"] for turn in turns]))
+        return "краткое содержание"
+
+    chat = memory(max_turns=2, summarizer=summarizer)
+    for i in range(2 + SUMMARY_BATCH):
+        chat.append(1, "user", f"реплика {i}")
+    await chat.summarize(1)
+
+    assert calls == [(None, [f"реплика {i}" for i in range(SUMMARY_BATCH)])]
+    context = chat.context(1, "вопрос")
+    assert context[0]["role"] == "system" and "краткое содержание" in context[0]["text"]
+    assert [turn["text"] for turn in context[1:]] == [f"реплика {i}" for i in range(SUMMARY_BATCH, SUMMARY_BATCH + 2)]
@@ -0,0 +1,50 @@
+import asyncio
+from bot.debounce import Debouncer
+
+
+async def test_messages_in_window_form_one_batch():
+    batches = []
+
+    async def handler(items):
+        batches.append(items)
+
+    debouncer = Debouncer(0.05, handler)
+    debouncer.push(1, "раз")
+    await asyncio.sleep(0.02)
+    debouncer.push(1, "два")
+    debouncer.push(2, "другой чат")
+    await asyncio.sleep(0.1)
+
+    assert sorted(batches) == [["другой чат"], ["раз", "два"]]
+    assert debouncer.get_stats() == {"messages": 3, "batches": 2, "superseded": 1, "pending": 0}
+
+
+async def test_batch_waits_no_longer_than_max_delay():
+    batches = []
+
+    async def handler(items):
+        batches.append(items)
+
+    debouncer = Debouncer(0.05, handler, max_delay=0.08)
+    # Сообщения идут чаще окна, но пачка все равно уходит через max_delay
+    for i in range(6):
+        debouncer.push(1, i)
+        await asyncio.sleep(0.03)
+
+    assert batches and batches[0][0] == 0
+    await debouncer.close()
+
+
+async def test_close_drops_pending_batches():
+    batches = []
+
+    async def handler(items):
+        batches.append(items)
+
+    debouncer = Debouncer(0.05, handler)
+    debouncer.push(1, "раз")
+    await debouncer.close()
+    await asyncio.sleep(0.07)
+
+    assert batches == []
+    assert debouncer.get_stats()["pending"] == 0
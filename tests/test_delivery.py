@@ -0,0 +1,83 @@
+import time
+import pytest
+from telegram.error import BadRequest, NetworkError, RetryAfter
+from bot.delivery import DeliveryPipeline, TokenBucket
+from config.config import Config
+
+
+@pytest.fixture(autouse=True)
+def fast_limits(monkeypatch):
+    monkeypatch.setattr(Config, "DELIVERY_CONCURRENCY", 4)
+    monkeypatch.setattr(Config, "DELIVERY_GLOBAL_RATE", 1000)
+    monkeypatch.setattr(Config, "DELIVERY_CHAT_RATE", 1000)
+    monkeypatch.setattr(Config, "DELIVERY_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(Config, "DELIVERY_RETRY_DELAY", 0.01)
+
+
+def make(notification_id, chat_id=1):
+    return {"id": notification_id, "chatId": chat_id, "text": notification_id}
+
+
+async def test_results_per_error_kind():
+    calls = {}
+
+    async def send(n):
+        calls[n["id"]] = calls.get(n["id"], 0) + 1
+        if n["id"] == "flaky" and calls["flaky"] == 1:
+            raise NetworkError("timeout")
+        if n["id"] == "down":
+            raise NetworkError("timeout")
+        if n["id"] == "blocked":
+            raise BadRequest("Chat not found")
+
+    pipeline = DeliveryPipeline(send)
+    sent, failed = await pipeline.deliver([make("ok"), make("flaky"), make("down"), make("blocked")])
+
+    assert sorted(sent) == ["flaky", "ok"]
+    assert set(failed) == {"down", "blocked"}
+    # Сетевые ошибки повторяются до DELIVERY_MAX_ATTEMPTS, BadRequest - нет
+    assert calls == {"ok": 1, "flaky": 2, "down": 3, "blocked": 1}
+    stats = pipeline.get_stats()
+    assert stats["sent"] == 2 and stats["failed"] == 2 and stats["backlog"] == 0
+
+
+async def test_retry_after_pauses_all_sends():
+    sent_at = []
+    limited = []
+
+    async def send(n):
+        if not limited:
+            limited.append(time.monotonic())
+            raise RetryAfter(0.2)
+        sent_at.append(time.monotonic())
+
+    pipeline = DeliveryPipeline(send)
+    sent, failed = await pipeline.deliver([make(f"n{i}", i) for i in range(3)])
+
+    assert len(sent) == 3 and not failed
+    assert min(sent_at) - limited[0] >= 0.15
+    assert pipeline.get_stats()["rate_limited"] == 1
+
+
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+
+    assert time.monotonic() - started >= 0.09
+
+
+async def test_throughput_window_is_trimmed_while_sending(monkeypatch):
+    monkeypatch.setattr("bot.delivery.THROUGHPUT_WINDOW", 0.05)
+
+    async def send(n):
+        pass
+
+    pipeline = DeliveryPipeline(send)
+    await pipeline.deliver([make(f"n{i}", i) for i in range(5)])
+    time.sleep(0.06)
+    await pipeline.deliver([make("last")])
+
+    # Старые отправки забываются без вызова get_stats
+    assert len(pipeline._sent_times) == 1
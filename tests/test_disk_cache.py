@@ -0,0 +1,40 @@
+import time
+from services.disk_cache import DiskCache
+
+
+def test_values_survive_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = DiskCache(path, max_bytes=1 << 20, stale_ttl=60)
+    cache.set("gpt:вопрос", "ответ", time.time() + 60)
+    cache.close()
+
+    reopened = DiskCache(path, max_bytes=1 << 20, stale_ttl=60)
+    value, expires_at = reopened.get("gpt:вопрос")
+    assert value == "ответ"
+    assert expires_at > time.time()
+    assert [key for key, _, _ in reopened.hottest(10)] == ["gpt:вопрос"]
+
+
+def test_expired_entry_is_only_stale(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), max_bytes=1 << 20, stale_ttl=60)
+    cache.set("old", "устарело", time.time() - 1)
+
+    assert cache.get("old") is None
+    assert cache.get("old", stale=True)[0] == "устарело"
+
+    cache.stale_ttl = 0
+    cache.purge()
+    assert cache.get("old", stale=True) is None
+
+
+def test_evicts_least_recently_read(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), max_bytes=200_000, stale_ttl=60)
+    expires_at = time.time() + 60
+    cache.set("hot", "x" * 10_000, expires_at)
+    for i in range(40):
+        cache.get("hot")
+        cache.set(f"cold{i}", "x" * 10_000, expires_at)
+
+    assert cache.get("hot") is not None
+    assert cache.get("cold0") is None
+    assert cache.get_stats()["used_bytes"] <= 200_000
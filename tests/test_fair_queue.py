@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from services.fair_queue import FairQueue, QueueRejected
+
+
+async def test_slots_go_round_robin_between_users():
+    queue = FairQueue(capacity=lambda: 1, max_depth=10, max_per_user=5, deadline=1)
+    order = []
+    gate = asyncio.Event()
+
+    async def ask(user_id: int, n: int):
+        async with queue.slot(user_id):
+            order.append((user_id, n))
+            await gate.wait()
+
+    first = asyncio.ensure_future(ask(1, 0))
+    await asyncio.sleep(0)
+    rest = [asyncio.ensure_future(ask(1, n)) for n in (1, 2, 3)]
+    rest.append(asyncio.ensure_future(ask(2, 1)))
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(first, *rest)
+
+    # Второй пользователь не ждет, пока первый выберет все свои запросы
+    assert order == [(1, 0), (1, 1), (2, 1), (1, 2), (1, 3)]
+    assert queue.get_stats()["admitted"] == 5
+    assert queue.get_stats()["active"] == 0
+
+
+async def test_full_queue_and_user_limit_reject_at_once():
+    queue = FairQueue(capacity=lambda: 1, max_depth=3, max_per_user=2, deadline=1)
+    gate = asyncio.Event()
+
+    async def ask(user_id: int):
+        async with queue.slot(user_id):
+            await gate.wait()
+
+    # Первый запрос занимает единственный слот, остальные ждут
+    asking = [asyncio.ensure_future(ask(user_id)) for user_id in (3, 1, 1, 2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(QueueRejected) as e:
+        await ask(2)
+    assert e.value.reason == QueueRejected.FULL
+
+    queue.max_depth = 10
+    with pytest.raises(QueueRejected) as e:
+        await ask(1)
+    assert e.value.reason == QueueRejected.USER_LIMIT
+
+    gate.set()
+    await asyncio.gather(*asking)
+    stats = queue.get_stats()
+    assert (stats["admitted"], stats["rejected"], stats["depth"]) == (4, 2, 0)
+
+
+async def test_request_past_deadline_is_shed():
+    queue = FairQueue(capacity=lambda: 1, max_depth=10, max_per_user=5, deadline=0.05)
+
+    async with queue.slot(1):
+        with pytest.raises(QueueRejected) as e:
+            async with queue.slot(2):
+                pass
+    assert e.value.reason == QueueRejected.DEADLINE
+
+    stats = queue.get_stats()
+    assert (stats["shed"], stats["depth"], stats["active"]) == (1, 0, 0)
+
+
+async def test_release_skips_waiter_cancelled_before_removal():
+    queue = FairQueue(capacity=lambda: 1, max_depth=10, max_per_user=5, deadline=1)
+
+    async def ask(user_id: int):
+        async with queue.slot(user_id):
+            pass
+
+    async with queue.slot(1):
+        waiting = asyncio.ensure_future(ask(2))
+        await asyncio.sleep(0)
+        # Так wait_for снимает ожидание по сроку: будущее уже отменено,
+        # а слот освобождается раньше, чем ожидающий успевает убрать себя
+        queue._waiting[2][0].cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    stats = queue.get_stats()
+    assert (stats["depth"], stats["active"]) == (0, 0)
+
+    # Слоты по-прежнему выдаются
+    await asyncio.wait_for(ask(3), 0.1)
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import httpx
+import pytest
+from config.config import Config
+from services.fair_queue import QueueRejected
+from services.gpt_service import GPTService, GPTUnavailableError
+
+
+def completion(text: str) -> dict:
+    return {"result": {"alternatives": [{"message": {"role": "assistant", "text": text}}]}}
+
+
+class FakeUpstream:
+    """Ответы YandexGPT для httpx.MockTransport"""
+
+    def __init__(self):
+        self.requests = []
+        self.status = 200
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.status != 200:
+            return httpx.Response(self.status, json={"error": "fail"})
+        payload = json.loads(request.content)
+        answer = f"ответ на {payload['messages'][-1]['text']}"
+        if payload["completionOptions"]["stream"]:
+            # Каждая строка потока - весь текст на данный момент
+            lines = [json.dumps(completion(answer[:end]), ensure_ascii=False) for end in (5, 10, len(answer))]
+            return httpx.Response(200, content="\n".join(lines).encode("utf-8"))
+        return httpx.Response(200, json=completion(answer))
+
+
+@pytest.fixture
+def upstream():
+    return FakeUpstream()
+
+
+@pytest.fixture
+async def gpt(workdir, monkeypatch, upstream):
+    monkeypatch.setattr(Config, "CACHE_BACKEND", "none")
+    monkeypatch.setattr(Config, "GPT_HEDGE", False)
+    monkeypatch.setattr(Config, "YANDEX_API_KEY", "key")
+    monkeypatch.setattr(Config, "YANDEX_FOLDER_ID", "folder")
+    service = GPTService()
+    await service.client.aclose()
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    yield service
+    await service.close()
+
+
+async def test_request_and_cached_answer(gpt, upstream):
+    context = [{"role": "user", "text": "привет"}, {"role": "assistant", "text": "здравствуйте"}]
+
+    assert await gpt.generate_response("Как дела?", context) == "ответ на Как дела?"
+    assert await gpt.generate_response("Как дела?", context) == "ответ на Как дела?"
+
+    assert len(upstream.requests) == 1
+    request = upstream.requests[0]
+    assert request.headers["Authorization"] == "Api-Key key"
+    payload = json.loads(request.content)
+    assert payload["modelUri"] == f"gpt://folder/{Config.YANDEX_GPT_MODEL}"
+    assert payload["completionOptions"]["stream"] is False
+    assert [m["role"] for m in payload["messages"]] == ["system", "user", "assistant", "user"]
+
+
+async def test_client_error_is_not_overload(gpt, upstream):
+    upstream.status = 400
+
+    with pytest.raises(Exception, match="Не удалось получить ответ"):
+        await gpt.generate_response("вопрос")
+    assert gpt.breaker.get_stats()["state"] == "closed"
+
+
+async def test_overload_without_cache_raises_unavailable(gpt, upstream):
+    upstream.status = 503
+
+    with pytest.raises(GPTUnavailableError):
+        await gpt.generate_response("вопрос")
+
+
+async def test_stream_yields_growing_text_then_caches(gpt, upstream):
+    parts = [part async for part in gpt.stream_response("расскажи сказку")]
+
+    assert parts == ["ответ", "ответ на р", "ответ на расскажи сказку", "ответ на расскажи сказку"]
+    assert json.loads(upstream.requests[0].content)["completionOptions"]["stream"] is True
+    # Повторный запрос отвечается из кэша одним куском
+    assert [part async for part in gpt.stream_response("Расскажи сказку!")] == ["ответ на расскажи сказку"]
+    assert len(upstream.requests) == 1
+
+
+async def test_hedged_request_takes_faster_answer(gpt, upstream, monkeypatch):
+    monkeypatch.setattr(Config, "GPT_HEDGE", True)
+    monkeypatch.setattr(Config, "GPT_HEDGE_MIN_DELAY", 0.05)
+    answer = upstream.__call__
+
+    async def slow_first(request):
+        if not upstream.requests:
+            upstream.requests.append(request)
+            await asyncio.sleep(1)
+            return httpx.Response(200, json=completion("медленный"))
+        return await answer(request)
+
+    gpt.client = httpx.AsyncClient(transport=httpx.MockTransport(slow_first))
+
+    assert await gpt.generate_response("вопрос") == "ответ на вопрос"
+    assert gpt.get_stats()["upstream"]["hedged"] == 1
+    assert gpt.limiter.in_flight == 0
+
+
+async def test_open_breaker_answers_from_stale_cache(gpt, upstream, monkeypatch):
+    monkeypatch.setattr(gpt.cache, "ttl", 0)
+    assert await gpt.generate_response("вопрос") == "ответ на вопрос"
+
+    upstream.status = 503
+    for _ in range(gpt.breaker.min_calls):
+        gpt.breaker.record(False)
+    assert gpt.breaker.state == "open"
+    assert await gpt.generate_response("вопрос") == "ответ на вопрос"
+    assert len(upstream.requests) == 1
+
+
+async def test_queue_slot_covers_only_upstream_call(gpt, upstream, monkeypatch):
+    assert await gpt.generate_response("вопрос", user_id=1) == "ответ на вопрос"
+    assert gpt.queue.get_stats()["admitted"] == 1
+
+    # Переполненная очередь не мешает ответам из кэша
+    monkeypatch.setattr(gpt.queue, "max_depth", 0)
+    assert await gpt.generate_response("вопрос", user_id=1) == "ответ на вопрос"
+    assert [part async for part in gpt.stream_response("вопрос", user_id=1)] == ["ответ на вопрос"]
+
+    with pytest.raises(QueueRejected):
+        await gpt.generate_response("другой вопрос", user_id=1)
+    assert len(upstream.requests) == 1
+    assert gpt.queue.get_stats()["rejected"] == 1
+
+
+async def test_rejected_leader_does_not_fail_coalesced_callers(gpt, upstream, monkeypatch):
+    monkeypatch.setattr(gpt.queue, "capacity", lambda: 1)
+    monkeypatch.setattr(gpt.queue, "max_per_user", 1)
+    gate = asyncio.Event()
+
+    async def hold(user_id: int):
+        async with gpt.queue.slot(user_id):
+            await gate.wait()
+
+    # Слот занят, а у первого пользователя уже есть запрос в очереди
+    holders = [asyncio.ensure_future(hold(3)), asyncio.ensure_future(hold(1))]
+    await asyncio.sleep(0)
+    leader = asyncio.ensure_future(gpt.generate_response("вопрос", user_id=1))
+    follower = asyncio.ensure_future(gpt.generate_response("вопрос", user_id=2))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(QueueRejected) as e:
+        await leader
+    assert e.value.reason == QueueRejected.USER_LIMIT
+    assert gpt.single_flight.get_stats()["coalesced"] == 1
+
+    # Отказ касается только первого пользователя: второй встает в очередь сам
+    gate.set()
+    assert await follower == "ответ на вопрос"
+    await asyncio.gather(*holders)
+    assert len(upstream.requests) == 1
+
+
+async def test_prompt_index_keeps_only_admitted_answers(workdir, monkeypatch, upstream):
+    monkeypatch.setattr(Config, "CACHE_BACKEND", "none")
+    monkeypatch.setattr(Config, "GPT_HEDGE", False)
+    monkeypatch.setattr(Config, "GPT_CACHE_FUZZY", True)
+    monkeypatch.setattr(Config, "YANDEX_API_KEY", "key")
+    monkeypatch.setattr(Config, "YANDEX_FOLDER_ID", "folder")
+    service = GPTService()
+    await service.client.aclose()
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    max_bytes = service.cache.cache.max_bytes
+
+    # Запись больше всего кэша не принимается, и в индексе ее быть не должно
+    service.cache.cache.max_bytes = 1
+    await service.generate_response("какая завтра будет погода в москве")
+    assert service.prompt_index.get_stats()["entries"] == 0
+
+    service.cache.cache.max_bytes = max_bytes
+    await service.generate_response("какая завтра будет погода в казани")
+    assert service.prompt_index.get_stats()["entries"] == 1
+    await service.close()
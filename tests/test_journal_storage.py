@@ -0,0 +1,92 @@
+import json
+import os
+import pytest
+from services.journal_storage import JournalStorage, LOG_FILE, ROTATED_LOG_FILE, SNAPSHOT_FILE
+from services.storage import DATA_DIR, DATA_FILE
+
+
+@pytest.fixture
+def journal(workdir):
+    storage = JournalStorage()
+    storage.compact_threshold = 10_000
+    return storage
+
+
+def test_changes_survive_restart(journal):
+    first = journal.add_notification(1, "01.01.2099", "первое")
+    second = journal.add_notification(1, "02.01.2099", "второе")
+    journal.delete_notification(first["id"])
+
+    reopened = JournalStorage()
+    assert reopened.get_notification(first["id"]) is None
+    assert reopened.get_notification(second["id"])["text"] == "второе"
+
+
+def test_deferred_records_written_as_one_batch(journal):
+    journal.autoflush = False
+    journal.add_notification(1, "01.01.2099", "первое")
+    journal.add_notification(2, "01.01.2099", "второе")
+    journal.flush()
+
+    with open(LOG_FILE, encoding="utf-8") as f:
+        lines = f.readlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["op"] == "batch"
+
+
+def test_compaction_folds_log_into_snapshot(journal):
+    created = [journal.add_notification(1, "01.01.2099", f"напоминание {i}") for i in range(5)]
+    journal.delete_notification(created[0]["id"])
+    journal.compact()
+
+    assert os.path.getsize(LOG_FILE) == 0
+    assert not os.path.exists(ROTATED_LOG_FILE)
+    with open(SNAPSHOT_FILE, encoding="utf-8") as f:
+        assert {n["id"] for n in json.load(f)} == {n["id"] for n in created[1:]}
+
+    # Записи после компакции дописываются к снапшоту
+    journal.add_notification(1, "03.01.2099", "после компакции")
+    reopened = JournalStorage()
+    assert len(reopened.get_user_notifications(1)) == 5
+
+
+def test_unfinished_compaction_is_completed_on_start(journal):
+    kept = journal.add_notification(1, "01.01.2099", "до падения")
+    journal._log.close()
+    # Падение между переключением лога и записью снапшота
+    os.replace(LOG_FILE, ROTATED_LOG_FILE)
+
+    reopened = JournalStorage()
+    assert reopened.get_notification(kept["id"]) is not None
+    assert not os.path.exists(ROTATED_LOG_FILE)
+    assert os.path.exists(SNAPSHOT_FILE)
+
+
+def test_torn_tail_is_discarded(journal):
+    kept = journal.add_notification(1, "01.01.2099", "целая запись")
+    size = os.path.getsize(LOG_FILE)
+    with open(LOG_FILE, "ab") as f:
+        f.write(b'{"op":"add","n":{"id":"x"')
+
+    reopened = JournalStorage()
+    assert reopened.get_notification(kept["id"]) is not None
+    assert reopened.get_notification("x") is None
+    assert os.path.getsize(LOG_FILE) == size
+
+
+def test_imports_legacy_json_file(workdir):
+    os.makedirs(DATA_DIR)
+    legacy = {
+        "id": "legacy",
+        "chatId": 7,
+        "date": "2099-01-01T00:00:00",
+        "text": "из JSON",
+        "sent": False,
+        "createdAt": "2024-01-01T00:00:00"
+    }
+    with open(DATA_FILE, "w", encoding="utf-8") as f:
+        json.dump([legacy], f)
+
+    storage = JournalStorage()
+    assert storage.get_notification("legacy")["text"] == "из JSON"
+    assert os.path.exists(SNAPSHOT_FILE)
@@ -0,0 +1,116 @@
+import asyncio
+import multiprocessing
+import os
+from collections import Counter
+from services.async_storage import AsyncStorage
+from services.leases import LeaseManager, partition_of
+from services.scheduler import ReminderScheduler
+from services.sqlite_storage import SQLiteStorage
+
+PARTITIONS = 8
+TTL = 0.6
+REMINDERS = 120
+SEND_TIME = 0.01
+
+
+def test_partitions_split_between_instances(tmp_path):
+    path = str(tmp_path / "leases.db")
+    first = LeaseManager(path, partitions=PARTITIONS, ttl=60, instance_id="first")
+    second = LeaseManager(path, partitions=PARTITIONS, ttl=60, instance_id="second")
+
+    assert first.renew() == frozenset(range(PARTITIONS))
+    assert second.renew() == frozenset()
+    # Первый отпускает лишнее, второй забирает освободившееся
+    assert len(first.renew()) == PARTITIONS // 2
+    assert second.renew() == frozenset(range(PARTITIONS)) - first.owned()
+
+    first.release()
+    assert second.renew() == frozenset(range(PARTITIONS))
+
+
+def test_held_partitions_are_released_after_the_batch(tmp_path):
+    path = str(tmp_path / "leases.db")
+    first = LeaseManager(path, partitions=PARTITIONS, ttl=60, instance_id="first")
+    second = LeaseManager(path, partitions=PARTITIONS, ttl=60, instance_id="second")
+    first.renew()
+    second.renew()
+
+    with first.hold({6, 7}) as held:
+        assert held == {6, 7}
+        first.renew()
+        assert {6, 7} <= first.owned()
+        assert not {6, 7} & second.renew()
+
+    first.renew()
+    assert not {6, 7} & first.owned()
+    assert {6, 7} <= second.renew()
+
+
+def test_hold_skips_partitions_not_owned(tmp_path):
+    manager = LeaseManager(str(tmp_path / "leases.db"), partitions=PARTITIONS, ttl=60, instance_id="only")
+
+    with manager.hold({1}) as held:
+        assert held == frozenset()
+
+
+def run_instance(path: str, instance_id: str, delay: float, duration: float, log_path: str):
+    """Экземпляр планировщика в отдельном процессе; отправки пишет в log_path"""
+    asyncio.run(_instance(path, instance_id, delay, duration, log_path))
+
+
+async def _instance(path: str, instance_id: str, delay: float, duration: float, log_path: str):
+    await asyncio.sleep(delay)
+    storage = AsyncStorage(SQLiteStorage(path), flush_interval=0.05)
+    leases = LeaseManager(path, partitions=PARTITIONS, ttl=TTL, instance_id=instance_id)
+
+    async def deliver(pending):
+        sent = []
+        for n in pending:
+            if not leases.owns(n["chatId"]):
+                continue
+            await asyncio.sleep(SEND_TIME)
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(f"{n['id']}\n")
+            sent.append(n["id"])
+        await storage.record_deliveries(sent)
+
+    scheduler = ReminderScheduler(storage, deliver, leases)
+    await scheduler.start()
+    await asyncio.sleep(duration)
+    await scheduler.stop()
+    await storage.close()
+
+
+def test_two_processes_deliver_each_reminder_once(workdir):
+    path = os.path.join("data", "notifications.db")
+    storage = SQLiteStorage(path)
+    for i in range(REMINDERS):
+        storage._insert({
+            "id": f"n{i}",
+            "chatId": 1000 + i,
+            "date": "2000-01-01T00:00:00",
+            "text": "",
+            "sent": False,
+            "createdAt": "2000-01-01T00:00:00"
+        })
+    storage.flush()
+    assert {partition_of(1000 + i, PARTITIONS) for i in range(REMINDERS)} == set(range(PARTITIONS))
+
+    # Второй процесс подключается, пока первый отправляет пачку, и забирает часть партиций
+    log_path = str(workdir / "sent.log")
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_instance, args=(path, "first", 0, 4, log_path)),
+        context.Process(target=run_instance, args=(path, "second", 0.4, 3.6, log_path)),
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    with open(log_path, encoding="utf-8") as f:
+        sent = Counter(line.strip() for line in f)
+    assert [i for i, count in sent.items() if count > 1] == []
+    assert len(sent) == REMINDERS
+    assert storage.get_pending_notifications() == []
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from services import metrics
+from services.metrics import CONTENT_TYPE, Metric, Registry
+
+
+def test_metric_without_series_type_cannot_be_created():
+    with pytest.raises(TypeError):
+        Metric("raw", "Без типа серии")
+
+
+def test_counter_and_gauge_exposition():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Запросы\nпо результату", ["result"])
+    in_flight = registry.gauge("in_flight", "Запросы в работе")
+
+    requests.labels("ok").inc()
+    requests.labels("ok").inc(2)
+    requests.labels('bad "quoted"\\').inc(0.5)
+    in_flight.inc(3)
+    in_flight.dec()
+
+    assert registry.render() == (
+        "# HELP requests_total Запросы\\nпо результату\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{result="ok"} 3\n'
+        'requests_total{result="bad \\"quoted\\"\\\\"} 0.5\n'
+        "# HELP in_flight Запросы в работе\n"
+        "# TYPE in_flight gauge\n"
+        "in_flight 2\n"
+    )
+
+
+def test_histogram_exposition_is_cumulative():
+    registry = Registry()
+    duration = registry.histogram("duration_seconds", "Время", ["mode"], buckets=(0.5, 0.1))
+    for value in (0.05, 0.1, 0.3, 2):
+        duration.labels("fast").observe(value)
+
+    assert registry.render() == (
+        "# HELP duration_seconds Время\n"
+        "# TYPE duration_seconds histogram\n"
+        'duration_seconds_bucket{mode="fast",le="0.1"} 2\n'
+        'duration_seconds_bucket{mode="fast",le="0.5"} 3\n'
+        'duration_seconds_bucket{mode="fast",le="+Inf"} 4\n'
+        'duration_seconds_sum{mode="fast"} 2.45\n'
+        'duration_seconds_count{mode="fast"} 4\n'
+    )
+
+
+def test_labels_are_checked_and_names_unique():
+    registry = Registry()
+    counter = registry.counter("events_total", "События", ["kind"])
+    with pytest.raises(ValueError):
+        counter.labels()
+    assert counter.labels("a") is counter.labels("a")
+    with pytest.raises(ValueError):
+        registry.gauge("events_total", "Повтор")
+
+
+async def test_collectors_run_before_scrape(monkeypatch):
+    registry = Registry()
+    size = registry.gauge("queue_size", "Размер очереди")
+
+    async def collect():
+        size.set(7)
+
+    def broken():
+        raise RuntimeError("сбой")
+
+    registry.add_collector(broken)
+    registry.add_collector(collect)
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+
+    server = await metrics.start_server("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: bot\r\n\r\n")
+        response = (await reader.read()).decode("utf-8")
+        writer.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+
+    assert response.startswith("HTTP/1.1 200 OK\r\n")
+    assert f"Content-Type: {CONTENT_TYPE}" in response
+    assert response.endswith("queue_size 7\n")
@@ -0,0 +1,76 @@
+from services.notification_index import NotificationIndex, due_timestamp
+
+
+def make(notification_id, chat_id, due, sent=False, **extra):
+    return dict(
+        id=notification_id,
+        chatId=chat_id,
+        date=f"2030-01-01T00:00:{due:02d}+00:00",
+        text=notification_id,
+        sent=sent,
+        createdAt="2024-01-01T00:00:00",
+        **extra
+    )
+
+
+def at(second):
+    return due_timestamp(f"2030-01-01T00:00:{second:02d}+00:00")
+
+
+def test_pending_returns_only_due_unsent():
+    index = NotificationIndex([make("a", 1, 10), make("b", 1, 20), make("c", 2, 5, sent=True)])
+
+    assert [n["id"] for n in index.pending(at(15))] == ["a"]
+    assert {n["id"] for n in index.pending(at(30))} == {"a", "b"}
+    assert index.pending_count() == 2
+
+
+def test_replaced_and_removed_notifications_leave_the_heap():
+    index = NotificationIndex([make("a", 1, 10), make("b", 1, 20)])
+    index.add(make("a", 1, 40))
+    index.remove("b")
+
+    assert index.pending(at(30)) == []
+    assert index.next_due() == at(40)
+    assert len(index) == 1
+
+
+def test_mark_sent_drops_from_pending():
+    index = NotificationIndex([make("a", 1, 10)])
+    assert index.pending(at(15))
+
+    assert index.mark_sent("a")
+    assert index.pending(at(15)) == []
+    assert index.pending_count() == 0
+    assert index.next_due() is None
+
+
+def test_retry_at_postpones_due_time():
+    index = NotificationIndex([make("a", 1, 10, retryAt="2030-01-01T00:00:50+00:00")])
+
+    assert index.pending(at(30)) == []
+    assert index.due_at("a") == at(50)
+
+
+def test_upcoming_per_chat_sorted_by_due():
+    index = NotificationIndex([make("late", 1, 30), make("early", 1, 20), make("past", 1, 5), make("other", 2, 25)])
+
+    assert [n["id"] for n in index.upcoming(1, at(10))] == ["early", "late"]
+
+
+def test_upcoming_uses_scheduled_date_not_retry_time():
+    index = NotificationIndex([
+        make("retrying", 1, 5, retryAt="2030-01-01T00:00:50+00:00"),
+        make("later", 1, 20, retryAt="2030-01-01T00:00:40+00:00"),
+        make("next", 1, 30)
+    ])
+
+    # Повтор отправки не делает прошедшее напоминание будущим и не меняет порядок
+    assert [n["id"] for n in index.upcoming(1, at(10))] == ["later", "next"]
+
+
+def test_next_due_with_chat_filter():
+    index = NotificationIndex([make("a", 1, 10), make("b", 2, 20)])
+
+    assert index.next_due(lambda chat_id: chat_id == 2) == at(20)
+    assert index.next_due(lambda chat_id: chat_id == 3) is None
@@ -0,0 +1,40 @@
+from services.prompt_index import PromptIndex, normalize_prompt
+
+
+def test_normalize_prompt():
+    assert normalize_prompt("  Привет,   МИР!! ") == "привет мир"
+    assert normalize_prompt("Ёлка?") == "елка"
+    assert normalize_prompt("график 2-2, e-mail") == "график 2-2 e-mail"
+    assert normalize_prompt("ｆｕｌｌ width") == "full width"
+    assert normalize_prompt("???") == "???"
+
+
+def test_finds_near_duplicate():
+    index = PromptIndex(threshold=0.7)
+    index.add("gpt:a", normalize_prompt("как приготовить борщ с говядиной"))
+    index.add("gpt:b", normalize_prompt("сколько стоит билет на поезд до москвы"))
+
+    assert index.find(normalize_prompt("как приготовить борщ с говядиной?")) == "gpt:a"
+    assert index.find(normalize_prompt("как приготовить борщ из говядины")) == "gpt:a"
+    assert index.find(normalize_prompt("какая погода завтра в казани")) is None
+
+
+def test_short_prompts_are_not_indexed():
+    index = PromptIndex()
+    index.add("gpt:short", "привет")
+
+    assert index.find("привет") is None
+    assert index.get_stats()["entries"] == 0
+
+
+def test_bounded_and_removable():
+    index = PromptIndex(max_entries=2)
+    for i in range(3):
+        index.add(f"gpt:{i}", f"длинный запрос номер {i}")
+
+    assert index.get_stats()["entries"] == 2
+    assert index.find("длинный запрос номер 0") != "gpt:0"
+    index.remove("gpt:2")
+    index.remove("gpt:1")
+    stats = index.get_stats()
+    assert (stats["entries"], stats["buckets"]) == (0, 0)
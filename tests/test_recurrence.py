@@ -0,0 +1,95 @@
+from datetime import datetime
+import pytest
+from services.recurrence import (
+    CronExpression,
+    describe_rule,
+    first_occurrence,
+    iter_occurrences,
+    next_occurrence,
+    parse_repeat,
+    validate_rule
+)
+from services.storage import Storage
+
+
+def test_parse_repeat_choices_and_cron():
+    assert parse_repeat("нет") is None
+    assert parse_repeat(" Ежедневно ") == {"freq": "daily", "interval": 1}
+    assert parse_repeat("0  9 * * 1-5") == {"freq": "cron", "cron": "0  9 * * 1-5"}
+    with pytest.raises(ValueError):
+        parse_repeat("иногда")
+
+
+@pytest.mark.parametrize("expression", ["0 9 * *", "60 * * * *", "* 24 * * *", "*/0 * * * *", "5-1 * * * *"])
+def test_invalid_cron(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+
+def test_cron_weekdays():
+    cron = CronExpression("0 9 * * 1-5")
+    # 2024-06-07 - пятница
+    friday_evening = datetime(2024, 6, 7, 18, 0)
+    assert cron.next_after(friday_evening) == datetime(2024, 6, 10, 9, 0)
+    assert cron.next_after(datetime(2024, 6, 10, 9, 0)) == datetime(2024, 6, 11, 9, 0)
+    assert cron.next_after(datetime(2024, 6, 10, 9, 0), inclusive=True) == datetime(2024, 6, 10, 9, 0)
+
+
+def test_cron_steps_lists_and_sunday_as_seven():
+    assert CronExpression("*/15 * * * *").minutes == [0, 15, 30, 45]
+    assert CronExpression("0 8,20 * * *").hours == [8, 20]
+    assert CronExpression("0 0 * * 7").weekdays == {0}
+
+
+def test_cron_day_or_weekday_when_both_restricted():
+    # 13-е число или пятница, как в cron
+    cron = CronExpression("0 0 13 * 5")
+    assert cron.next_after(datetime(2024, 6, 8)) == datetime(2024, 6, 13)
+    assert cron.next_after(datetime(2024, 6, 13, 1)) == datetime(2024, 6, 14)
+
+
+def test_cron_that_never_fires():
+    with pytest.raises(ValueError):
+        CronExpression("0 0 31 2 *").next_after(datetime(2024, 1, 1))
+
+
+def test_monthly_keeps_day_of_month():
+    rule = {"freq": "monthly", "interval": 1, "day": 31}
+    dates = list(iter_occurrences(rule, datetime(2024, 1, 31), 4))
+    assert [d.date().isoformat() for d in dates] == ["2024-01-31", "2024-02-29", "2024-03-31", "2024-04-30"]
+
+
+def test_daily_weekly_and_first_occurrence():
+    start = datetime(2024, 6, 7, 12, 0)
+    assert next_occurrence({"freq": "daily", "interval": 2}, start) == datetime(2024, 6, 9, 12, 0)
+    assert next_occurrence({"freq": "weekly"}, start) == datetime(2024, 6, 14, 12, 0)
+    assert first_occurrence({"freq": "daily"}, start) == start
+    assert first_occurrence({"freq": "cron", "cron": "30 8 * * *"}, start) == datetime(2024, 6, 8, 8, 30)
+
+
+def test_validate_and_describe():
+    with pytest.raises(ValueError):
+        validate_rule({"freq": "hourly"})
+    with pytest.raises(ValueError):
+        validate_rule({"freq": "daily", "interval": 0})
+    assert describe_rule({"freq": "weekly", "interval": 2}) == "еженедельно (интервал 2)"
+    assert describe_rule({"freq": "cron", "cron": "0 9 * * *"}) == "cron: 0 9 * * *"
+
+
+def test_delivered_rule_advances_instead_of_archiving(workdir):
+    storage = Storage()
+    storage._insert({
+        "id": "rule",
+        "chatId": 1,
+        "date": "2000-01-03T09:00:00",
+        "text": "зарядка",
+        "sent": False,
+        "createdAt": "2000-01-01T00:00:00",
+        "rule": {"freq": "daily", "interval": 1}
+    })
+
+    assert storage.record_deliveries(["rule"]) == 1
+    advanced = storage.get_notification("rule")
+    assert datetime.fromisoformat(advanced["date"]) > datetime.now()
+    assert advanced["date"].endswith("09:00:00")
+    assert [n["id"] for n in storage.query_archive()] == ["rule@2000-01-03T09:00:00"]
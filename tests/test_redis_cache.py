@@ -0,0 +1,154 @@
+import asyncio
+import fnmatch
+import time
+import pytest
+from services.redis_cache import RedisBackend, RedisError, RespClient, encode_command, read_reply
+
+
+def encode_reply(value) -> bytes:
+    if isinstance(value, RedisError):
+        return b"-%s\r\n" % str(value).encode()
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(encode_reply(item) for item in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class FakeRedis:
+    """Redis в памяти с нужными кэшу командами"""
+
+    def __init__(self, password: str = None):
+        self.password = password
+        self.data = {}
+        self.commands = []
+        self.server = None
+        self.connections = set()
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"redis://127.0.0.1:{port}"
+
+    async def stop(self):
+        self.server.close()
+        for writer in self.connections:
+            writer.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        authorized = self.password is None
+        self.connections.add(writer)
+        try:
+            while True:
+                args = await read_reply(reader)
+                name = args[0].decode().upper()
+                self.commands.append(name)
+                if name == "AUTH":
+                    authorized = args[-1].decode() == self.password
+                    reply = "OK" if authorized else RedisError("WRONGPASS invalid password")
+                elif not authorized:
+                    reply = RedisError("NOAUTH Authentication required")
+                else:
+                    reply = self.execute(name, args[1:])
+                writer.write(encode_reply(reply))
+        except ConnectionError:
+            writer.close()
+        finally:
+            self.connections.discard(writer)
+
+    def execute(self, name: str, args: list):
+        if name == "SELECT":
+            return "OK"
+        if name == "GET":
+            return self.data.get(args[0])
+        if name == "SET":
+            self.data[args[0]] = args[1]
+            return "OK"
+        if name in ("DEL", "UNLINK"):
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if name == "SCAN":
+            pattern = args[2].decode()
+            keys = [key for key in self.data if fnmatch.fnmatch(key.decode(), pattern)]
+            return [b"0", keys]
+        return RedisError(f"ERR unknown command '{name}'")
+
+
+@pytest.fixture
+async def redis():
+    server = FakeRedis(password="secret")
+    url = await server.start()
+    server.url = url.replace("redis://", "redis://:secret@") + "/2"
+    yield server
+    await server.stop()
+
+
+def test_encode_command():
+    assert encode_command(("SET", "ключ", 5)) == "*3\r\n$3\r\nSET\r\n$8\r\nключ\r\n$1\r\n5\r\n".encode()
+
+
+async def test_commands_are_pipelined_after_handshake(redis):
+    client = RespClient(redis.url, timeout=1)
+    assert await client.execute("GET", "k3") is None
+    assert redis.commands == ["AUTH", "SELECT", "GET"]
+    writes = client.get_stats()["writes"]
+
+    replies = await asyncio.gather(*(client.execute("SET", f"k{i}", i) for i in range(10)))
+    assert replies == ["OK"] * 10
+    # Десять одновременных SET ушли одной записью
+    assert client.get_stats()["writes"] == writes + 1
+    assert await client.execute("GET", "k3") == b"3"
+
+    with pytest.raises(RedisError):
+        await client.execute("FLUSHALL")
+
+    stats = client.get_stats()
+    assert stats["commands"] == 15
+    assert (stats["connects"], stats["in_flight"], stats["errors"]) == (1, 0, 1)
+    await client.close()
+
+
+async def test_wrong_password_is_rejected(redis):
+    client = RespClient(redis.url.replace("secret", "wrong"), timeout=1)
+    with pytest.raises(ConnectionError, match="отклонил"):
+        await client.execute("GET", "k")
+    assert not client.get_stats()["connected"]
+    await client.close()
+
+
+async def test_reconnects_after_server_restart(redis):
+    client = RespClient(redis.url, timeout=1)
+    await client.execute("SET", "k", "v")
+    await redis.stop()
+
+    with pytest.raises(ConnectionError):
+        await client.execute("GET", "k")
+
+    await redis.start()
+    client.port = redis.server.sockets[0].getsockname()[1]
+    # Повторное подключение не чаще раза в RECONNECT_DELAY
+    with pytest.raises(ConnectionError, match="недоступен"):
+        await client.execute("GET", "k")
+    client._down_until = 0
+    assert await client.execute("GET", "k") == b"v"
+    assert client.get_stats()["connects"] == 2
+    await client.close()
+
+
+async def test_backend_keeps_stale_entries_and_clears_only_prefix(redis):
+    backend = RedisBackend(redis.url, prefix="bot:", stale_ttl=60, timeout=1)
+    redis.data[b"other"] = b"x"
+
+    await backend.set("fresh", "ответ", time.time() + 60)
+    await backend.set("old", "старый", time.time() - 1)
+    assert (await backend.get("fresh"))[0] == "ответ"
+    assert await backend.get("old") is None
+    assert (await backend.get("old", stale=True))[0] == "старый"
+
+    await backend.clear()
+    assert list(redis.data) == [b"other"]
+    await backend.close()
@@ -0,0 +1,56 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from services.async_storage import AsyncStorage
+from services.scheduler import ReminderScheduler
+from services.storage import Storage
+
+
+def make(notification_id, due_in):
+    date = (datetime.now() + timedelta(seconds=due_in)).isoformat()
+    return {"id": notification_id, "chatId": 1, "date": date, "text": "", "sent": False, "createdAt": date}
+
+
+async def test_wakes_for_reminder_added_while_sleeping(workdir):
+    storage = AsyncStorage(Storage(), flush_interval=0)
+    delivered = []
+
+    async def deliver(pending):
+        delivered.extend((n["id"], time.time()) for n in pending)
+        await storage.record_deliveries([n["id"] for n in pending])
+
+    scheduler = ReminderScheduler(storage, deliver)
+    await scheduler.start()
+    try:
+        # Планировщик уснул на пустой очереди, новое напоминание должно его разбудить
+        await asyncio.sleep(0.05)
+        soon = make("soon", 0.2)
+        storage.storage._insert(soon)
+        storage._notify(soon)
+        due = datetime.fromisoformat(soon["date"]).timestamp()
+
+        for _ in range(50):
+            if delivered:
+                break
+            await asyncio.sleep(0.02)
+        assert [i for i, _ in delivered] == ["soon"]
+        assert 0 <= delivered[0][1] - due < 0.2
+    finally:
+        await scheduler.stop()
+        await storage.close()
+
+
+async def test_later_reminder_does_not_wake(workdir):
+    storage = AsyncStorage(Storage(), flush_interval=0)
+    storage.storage._insert(make("first", 60))
+    scheduler = ReminderScheduler(storage, lambda pending: asyncio.sleep(0))
+    await scheduler.start()
+    try:
+        await asyncio.sleep(0.05)
+        scheduler.notify(time.time() + 120)
+        assert not scheduler._wakeup.is_set()
+        scheduler.notify(time.time() + 30)
+        assert scheduler._wakeup.is_set()
+    finally:
+        await scheduler.stop()
+        await storage.close()
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+import pytest
+from services import session_store
+from services.session_store import PURGE_INTERVAL, SessionStore, SQLiteSessionStore, VersionConflict
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+async def store(request, workdir, clock):
+    if request.param == "memory":
+        store = SessionStore(ttl=10)
+    else:
+        store = SQLiteSessionStore("sessions.db", ttl=10)
+    yield store
+    await store.close()
+
+
+async def test_put_checks_version(store):
+    assert await store.get("k") == (None, 0)
+    assert await store.put("k", {"step": 1}, 0) == 1
+    assert await store.get("k") == ({"step": 1}, 1)
+
+    with pytest.raises(VersionConflict):
+        await store.put("k", {"step": 2}, 0)
+    assert await store.put("k", {"step": 2}, 1) == 2
+
+    with pytest.raises(VersionConflict):
+        await store.delete("k", 1)
+    await store.delete("k", 2)
+    assert await store.get("k") == (None, 0)
+    assert store.get_stats()["conflicts"] == 2
+
+
+async def test_expired_session_can_be_written_when_purge_is_due(store, clock):
+    await store.put("k", {"step": 1}, 0)
+    clock.now += PURGE_INTERVAL + 10
+
+    # Истекшая сессия читается пустой, но с версией
+    assert await store.get("k") == (None, 1)
+    assert await store.put("k", {"step": 1}, 1) == 2
+    assert await store.get("k") == ({"step": 1}, 2)
+
+
+async def test_purge_by_other_key_keeps_recently_expired(store, clock):
+    await store.put("old", {}, 0)
+    await store.put("k", {}, 0)
+    clock.now += 11
+    _, version = await store.get("k")
+
+    # Очистка, запущенная записью другого ключа, не сбивает версию
+    await store.put("other", {}, 0)
+    assert await store.put("k", {"step": 1}, version) == version + 1
+
+    clock.now += PURGE_INTERVAL + 1
+    await store.put("other", {}, 1)
+    assert await store.get("old") == (None, 0)
+    assert await store.get("k") == (None, version + 1)
+    assert await store.get("other") == ({}, 2)
@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from services.single_flight import SingleFlight
+
+
+async def test_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    release = asyncio.Event()
+
+    async def call():
+        calls.append(1)
+        await release.wait()
+        return "ответ"
+
+    waiters = [asyncio.ensure_future(flight.do("key", call)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == ["ответ"] * 5
+    assert calls == [1]
+    assert flight.get_stats() == {"leaders": 1, "coalesced": 4, "errors": 0, "in_flight": 0}
+
+
+async def test_error_reaches_every_waiter_and_next_call_retries():
+    flight = SingleFlight()
+    attempts = []
+
+    async def fail():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("апстрим упал")
+
+    results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    with pytest.raises(RuntimeError):
+        await flight.do("key", fail)
+    assert len(attempts) == 2
+
+
+async def test_cancelled_waiter_does_not_cancel_the_call():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "готово"
+
+    first = asyncio.ensure_future(flight.do("key", slow))
+    second = asyncio.ensure_future(flight.do("key", slow))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "готово"
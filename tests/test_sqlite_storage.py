@@ -0,0 +1,87 @@
+import json
+import os
+import sqlite3
+import time
+from services.sqlite_storage import SCHEMA_VERSION, SQLiteStorage
+from services.storage import DATA_DIR, DATA_FILE
+
+DB_PATH = os.path.join(DATA_DIR, "notifications.db")
+
+
+def make(notification_id, chat_id, date, sent=False):
+    return {
+        "id": notification_id,
+        "chatId": chat_id,
+        "date": date,
+        "text": notification_id,
+        "sent": sent,
+        "createdAt": "2024-01-01T00:00:00"
+    }
+
+
+def test_migrates_json_once(workdir):
+    os.makedirs(DATA_DIR)
+    with open(DATA_FILE, "w", encoding="utf-8") as f:
+        json.dump([make("a", 1, "2099-01-01T00:00:00"), make("b", 2, "2099-01-02T00:00:00")], f)
+
+    storage = SQLiteStorage(DB_PATH)
+    assert storage.get_notification("a")["chatId"] == 1
+    storage.delete_notification("a")
+
+    # Повторный запуск не импортирует JSON заново
+    reopened = SQLiteStorage(DB_PATH)
+    assert reopened.get_notification("a") is None
+    assert reopened.get_notification("b") is not None
+    assert reopened._conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+
+def test_pending_and_user_queries(workdir):
+    storage = SQLiteStorage(DB_PATH)
+    past = storage.add_notification(1, "01.01.2099", "будущее")
+    storage._insert(make("due", 1, "2000-01-01T00:00:00"))
+    storage.flush()
+
+    assert [n["id"] for n in storage.get_pending_notifications()] == ["due"]
+    assert [n["id"] for n in storage.get_user_notifications(1)] == [past["id"]]
+    assert storage.next_due_at() <= time.time()
+
+
+def test_deliveries_archive_sent_and_retry_failed(workdir):
+    storage = SQLiteStorage(DB_PATH)
+    storage._insert(make("sent", 1, "2000-01-01T00:00:00"))
+    storage._insert(make("failed", 2, "2000-01-01T00:00:00"))
+    storage.flush()
+
+    assert storage.record_deliveries(["sent"], {"failed": "Forbidden"}) == 1
+    assert storage.get_notification("sent") is None
+    failed = storage.get_notification("failed")
+    assert failed["attempts"] == 1
+    assert failed["lastError"] == "Forbidden"
+    # До retryAt напоминание не считается наступившим
+    assert storage.get_pending_notifications() == []
+    # Но и в будущие напоминания пользователя не попадает
+    assert storage.get_user_notifications(2) == []
+    assert [n["id"] for n in storage.query_archive()] == ["sent"]
+
+
+def test_deferred_writes_commit_on_flush(workdir):
+    storage = SQLiteStorage(DB_PATH)
+    storage.autoflush = False
+    created = storage.add_notification(1, "01.01.2099", "отложено")
+
+    other = sqlite3.connect(DB_PATH)
+    assert other.execute("SELECT COUNT(*) FROM notifications").fetchone()[0] == 0
+    storage.flush()
+    assert other.execute("SELECT id FROM notifications").fetchall() == [(created["id"],)]
+
+
+def test_partition_filter_uses_given_partition_count(workdir):
+    storage = SQLiteStorage(DB_PATH)
+    for chat_id in range(8):
+        storage._insert(make(f"n{chat_id}", chat_id, "2000-01-01T00:00:00"))
+    storage.flush()
+
+    pending = storage.get_pending_notifications(partitions={1}, partition_count=4)
+    assert sorted(n["chatId"] for n in pending) == [1, 5]
+    assert storage.next_due_at(partitions={1}, partition_count=4) is not None
+    assert storage.archive_expired(0, partitions={1}, partition_count=4) == 2
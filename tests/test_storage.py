@@ -0,0 +1,29 @@
+from services.storage import Storage
+
+
+def make(notification_id, chat_id, date="2000-01-01T00:00:00"):
+    return {"id": notification_id, "chatId": chat_id, "date": date, "text": notification_id, "sent": False, "createdAt": date}
+
+
+def test_record_deliveries_is_one_write(workdir):
+    storage = Storage()
+    for i in range(5):
+        storage._insert(make(f"n{i}", i))
+    writes = []
+    write_data = storage._write_data
+    storage._write_data = lambda data: writes.append(len(data)) or write_data(data)
+
+    count = storage.record_deliveries(["n0", "n1", "n2", "missing"], {"n3": "Forbidden"})
+
+    assert count == 3
+    assert writes == [2]
+    assert [n["id"] for n in storage.get_pending_notifications()] == ["n4"]
+    assert storage.get_notification("n3")["attempts"] == 1
+
+
+def test_retry_delay_grows_and_is_capped(workdir, monkeypatch):
+    from config.config import Config
+    monkeypatch.setattr(Config, "REMINDER_RETRY_DELAY", 10)
+    monkeypatch.setattr(Config, "REMINDER_RETRY_MAX_DELAY", 35)
+
+    assert [Storage._retry_delay(a) for a in (1, 2, 3, 4)] == [10, 20, 35, 35]
@@ -0,0 +1,176 @@
+from types import SimpleNamespace
+import asyncio
+import pytest
+from telegram.error import BadRequest
+from telegram.ext import ConversationHandler
+from bot.telegram_bot import AWAITING_DATE, AWAITING_REPEAT, AWAITING_TEXT, BUSY_REPLIES, TelegramBot
+from config.config import Config
+from services.fair_queue import QueueRejected
+
+CHAT_ID = 42
+
+
+def check_markdown(text: str):
+    """
+    Разобрать текст как legacy Markdown Telegram
+
+    Raises:
+        BadRequest: Как Telegram, если сущность не закрыта
+    """
+    opened = None
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if opened == "`":
+            if char == "`":
+                opened = None
+        elif char == "\\" and i + 1 < len(text) and text[i + 1] in "_*`[":
+            i += 1
+        elif char in "*_`":
+            if opened is None:
+                opened = char
+            elif opened == char:
+                opened = None
+        i += 1
+    if opened is not None:
+        raise BadRequest(f"Can't parse entities: can't find end of the entity starting with {opened}")
+
+
+class FakeBot:
+    """Bot API для правки ответов: в replies остается последний текст сообщения"""
+
+    def __init__(self, replies: list):
+        self.replies = replies
+        self.edits = 0
+
+    async def edit_message_text(self, text: str, chat_id: int, message_id: int):
+        self.edits += 1
+        self.replies[message_id] = text
+
+
+class FakeMessage:
+    """Сообщение пользователя; ответы бота проверяются как в Bot API"""
+
+    def __init__(self, text: str, replies: list):
+        self.text = text
+        self.replies = replies
+        self.bot = FakeBot(replies)
+
+    async def reply_text(self, text: str, parse_mode: str = None, **kwargs):
+        if parse_mode == "Markdown":
+            check_markdown(text)
+        self.replies.append(text)
+        return SimpleNamespace(chat_id=CHAT_ID, message_id=len(self.replies) - 1, get_bot=lambda: self.bot)
+
+
+def make_update(text: str, replies: list):
+    return SimpleNamespace(
+        message=FakeMessage(text, replies),
+        effective_chat=SimpleNamespace(id=CHAT_ID),
+        effective_user=SimpleNamespace(id=CHAT_ID)
+    )
+
+
+@pytest.fixture
+async def bot(workdir, monkeypatch):
+    monkeypatch.setattr(Config, "SESSION_BACKEND", "memory")
+    monkeypatch.setattr(Config, "CACHE_BACKEND", "none")
+    monkeypatch.setattr(Config, "STORAGE_FLUSH_INTERVAL", 0)
+    bot = TelegramBot()
+    yield bot
+    await bot.storage.close()
+    await bot.sessions.close()
+    await bot.gpt.close()
+
+
+def test_check_markdown_rejects_unclosed_entity():
+    check_markdown("cron `0 9 * * 1-5` и день\\_недели")
+    with pytest.raises(BadRequest):
+        check_markdown("день_недели")
+
+
+async def test_reminder_conversation_creates_recurring_reminder(bot):
+    replies = []
+    steps = [
+        ("/set_reminder", bot.set_reminder_start, AWAITING_DATE),
+        ("01.01.2099", bot.set_reminder_date, AWAITING_TEXT),
+        ("полить цветы", bot.set_reminder_text, AWAITING_REPEAT),
+        ("0 9 * * 1-5", bot.set_reminder_repeat, ConversationHandler.END),
+    ]
+    for text, handler, state in steps:
+        assert await handler(make_update(text, replies), None) == state
+
+    assert replies[-1].startswith("✅ Напоминание создано!")
+    reminders = await bot.storage.get_user_notifications(CHAT_ID)
+    assert [r["rule"] for r in reminders] == [{"freq": "cron", "cron": "0 9 * * 1-5"}]
+    assert await bot.sessions.get(bot.reminder_session_key(make_update("", []))) == (None, 0)
+
+
+async def test_markdown_replies_parse(bot):
+    replies = []
+    await bot.start_command(make_update("/start", replies), None)
+    await bot.help_command(make_update("/help", replies), None)
+    assert len(replies) == 2
+
+
+async def test_stream_reply_throttles_edits(bot, monkeypatch):
+    monkeypatch.setattr(Config, "GPT_STREAM_EDIT_INTERVAL", 0.05)
+
+    async def stream_response(text, history=None, user_id=None):
+        for i in range(1, 21):
+            await asyncio.sleep(0.01)
+            yield "слово " * i
+
+    monkeypatch.setattr(bot.gpt, "stream_response", stream_response)
+    replies = []
+    update = make_update("вопрос", replies)
+
+    answer = await bot.stream_reply(update, "вопрос")
+
+    assert answer == "слово " * 20
+    assert replies == [answer]
+    # 20 частей за ~0.2 с при интервале 0.05 с - несколько правок, а не 20
+    assert 2 <= update.message.bot.edits <= 6
+
+
+async def test_rejected_question_gets_busy_reply(bot, monkeypatch):
+    monkeypatch.setattr(Config, "GPT_STREAMING", False)
+
+    async def generate_response(text, history=None, user_id=None):
+        assert user_id == CHAT_ID
+        raise QueueRejected(QueueRejected.USER_LIMIT)
+
+    monkeypatch.setattr(bot.gpt, "generate_response", generate_response)
+    update = make_update("вопрос", [])
+    update.message.chat = SimpleNamespace(send_action=lambda action: asyncio.sleep(0))
+    replies = update.message.replies
+
+    await bot.answer(update, "вопрос")
+
+    assert replies == [BUSY_REPLIES[QueueRejected.USER_LIMIT]]
+    assert bot.memory.context(CHAT_ID, "вопрос") == []
+
+
+async def test_debounced_batch_answers_in_chat_order(bot, monkeypatch):
+    answered = []
+
+    async def answer(update, text):
+        answered.append(text)
+
+    monkeypatch.setattr(bot, "answer", answer)
+    busy = asyncio.Event()
+
+    async def handle_update():
+        await busy.wait()
+        answered.append("обновление")
+
+    # Пока обрабатывается другое сообщение чата, пачка ждет своей очереди
+    update = asyncio.ensure_future(bot.updates.run_in_chat(CHAT_ID, handle_update()))
+    await asyncio.sleep(0)
+    batch = asyncio.ensure_future(bot.answer_batch([make_update("раз", []), make_update("два", [])]))
+    await asyncio.sleep(0.01)
+    assert answered == []
+
+    busy.set()
+    await asyncio.gather(update, batch)
+    assert answered == ["обновление", "раз\nдва"]
@@ -0,0 +1,64 @@
+from services.tinylfu import FrequencySketch, TinyLFUCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sketch_counts_and_ages():
+    sketch = FrequencySketch(16)
+    for _ in range(3):
+        sketch.increment("a")
+    assert sketch.frequency("a") == 3
+    assert sketch.frequency("b") == 0
+
+    # Следующее увеличение завершает выборку, и счетчики делятся пополам
+    sketch._additions = sketch.sample_size - 1
+    sketch.increment("b")
+    assert sketch.frequency("a") == 1
+    assert sketch.frequency("b") == 0
+
+
+def test_one_hit_keys_do_not_flush_popular_ones():
+    evicted = []
+    cache = TinyLFUCache(max_bytes=100, expected_entries=1000, on_evict=evicted.append)
+    hot = [f"hot{i}" for i in range(9)]
+    for key in hot:
+        assert cache.set(key, key, 10, 10 ** 12)
+    for _ in range(3):
+        for key in hot:
+            assert cache.get(key) == key
+
+    for i in range(100):
+        cache.set(f"cold{i}", i, 10, 10 ** 12)
+
+    assert all(key in cache for key in hot)
+    assert cache.currsize <= 100
+    assert cache.get_stats()["evictions"] == len(evicted) >= 90
+
+
+def test_expiry_and_rejections_notify_listener():
+    clock = Clock()
+    evicted = []
+    cache = TinyLFUCache(max_bytes=1000, expected_entries=10, on_evict=evicted.append, timer=clock)
+
+    assert not cache.set("huge", "x", 1001, clock.now + 10)
+    assert not cache.set("old", "x", 10, clock.now)
+    assert cache.set("a", 1, 10, clock.now + 10)
+    assert cache.set("b", 2, 10, clock.now + 20)
+
+    clock.now += 15
+    assert cache.get("a") is None
+    cache.expire()
+    assert "b" in cache
+    clock.now += 10
+    cache.expire()
+
+    assert evicted == ["a", "b"]
+    assert len(cache) == 0 and cache.currsize == 0
+    assert cache.get_stats()["expirations"] == 2
+    assert cache.get_stats()["rejections"] == 2
@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+import asyncio
+from telegram import Chat, Message, Update
+from bot.update_processor import ChatOrderedUpdateProcessor
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    chat = Chat(chat_id, Chat.PRIVATE)
+    message = Message(update_id, datetime.now(timezone.utc), chat, text=str(update_id))
+    return Update(update_id, message=message)
+
+
+async def test_work_outside_updates_waits_for_chat_queue():
+    processor = ChatOrderedUpdateProcessor(workers=4, max_pending=16)
+    log = []
+    gate = asyncio.Event()
+
+    async def handle(name: str):
+        log.append(f"{name}:start")
+        await gate.wait()
+        log.append(f"{name}:end")
+
+    update = asyncio.ensure_future(processor.do_process_update(make_update(1, 7), handle("update")))
+    await asyncio.sleep(0)
+    batch = asyncio.ensure_future(processor.run_in_chat(7, handle("batch")))
+    other = asyncio.ensure_future(processor.run_in_chat(8, handle("other")))
+    await asyncio.sleep(0.01)
+
+    # Работа того же чата ждет обновления, другой чат - нет
+    assert log == ["update:start", "other:start"]
+    assert processor.get_stats()["chat_queues"] == {7: 2}
+
+    gate.set()
+    await asyncio.gather(update, batch, other)
+    assert log.index("batch:start") > log.index("update:end")
+    assert processor.get_stats()["processed"] == 3
+
+
+async def test_updates_of_one_chat_keep_order_across_chats_run_in_parallel():
+    processor = ChatOrderedUpdateProcessor(workers=2, max_pending=16)
+    log = []
+    running = 0
+    peak = 0
+
+    async def handle(chat_id: int, n: int, delay: float):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(delay)
+        log.append((chat_id, n))
+        running -= 1
+
+    # Первое сообщение чата самое долгое: следующие не должны его обогнать
+    tasks = [
+        asyncio.ensure_future(processor.do_process_update(make_update(n, chat_id), handle(chat_id, n, delay)))
+        for n, (chat_id, delay) in enumerate([(1, 0.03), (1, 0), (2, 0.01), (1, 0), (2, 0), (3, 0)])
+    ]
+    await asyncio.gather(*tasks)
+
+    assert [n for chat_id, n in log if chat_id == 1] == [0, 1, 3]
+    assert [n for chat_id, n in log if chat_id == 2] == [2, 4]
+    assert peak == processor.workers
+    stats = processor.get_stats()
+    assert (stats["processed"], stats["in_flight"], stats["waiting"], stats["chats"]) == (6, 0, 0, 0)
+
+
+async def test_updates_without_chat_are_not_serialized():
+    processor = ChatOrderedUpdateProcessor(workers=4, max_pending=16)
+    gate = asyncio.Event()
+    started = []
+
+    async def handle(n: int):
+        started.append(n)
+        await gate.wait()
+
+    tasks = [asyncio.ensure_future(processor.do_process_update(object(), handle(n))) for n in range(3)]
+    await asyncio.sleep(0.01)
+    assert started == [0, 1, 2]
+    assert processor.get_stats()["chats"] == 0
+
+    gate.set()
+    await asyncio.gather(*tasks)
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from services.upstream import AdaptiveLimiter, CircuitBreaker, LatencyWindow, UpstreamUnavailable
+
+
+async def test_limiter_grows_on_fast_and_backs_off_on_overload():
+    limiter = AdaptiveLimiter(initial=4, min_limit=1, max_limit=8, latency_target=0.5)
+    for _ in range(8):
+        await limiter.acquire()
+        await limiter.release(0.01, True)
+    assert 5 <= limiter.limit <= 6
+
+    grown = limiter.limit
+    await limiter.acquire()
+    await limiter.release(0.01, False)
+    assert limiter.limit == pytest.approx(grown * 0.7)
+
+    # Вторая ошибка в пределах latency_target лимит не уменьшает
+    await limiter.acquire()
+    await limiter.release(0.01, False)
+    assert limiter.limit == pytest.approx(grown * 0.7)
+
+
+async def test_limiter_acquire_times_out_when_full():
+    limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1, latency_target=1)
+    await limiter.acquire()
+    assert not limiter.try_acquire()
+
+    with pytest.raises(UpstreamUnavailable):
+        await limiter.acquire(timeout=0.02)
+
+    waiter = asyncio.ensure_future(limiter.acquire(timeout=1))
+    await asyncio.sleep(0)
+    await limiter.release(0.01, None)
+    await waiter
+    assert limiter.in_flight == 1
+
+
+def test_breaker_opens_on_error_share():
+    breaker = CircuitBreaker(threshold=0.5, window=4, cooldown=60)
+    for ok in (True, True, True, False):
+        assert breaker.allow()
+        breaker.record(ok)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+async def test_breaker_half_open_lets_one_probe():
+    breaker = CircuitBreaker(threshold=0.5, window=2, cooldown=0.02)
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    await asyncio.sleep(0.03)
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    await asyncio.sleep(0.03)
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.get_stats() == {"state": "closed", "opened": 2, "rejected": 1}
+
+
+def test_latency_window_percentiles():
+    window = LatencyWindow(size=100)
+    assert window.percentile(0.5) is None
+    for i in range(1, 101):
+        window.add(i / 100)
+
+    assert window.percentile(0.5) == 0.5
+    assert window.percentile(0.95) == 0.95
@@ -0,0 +1,45 @@
+import httpx
+import pytest
+from config.config import Config
+from bot.webhook import SECRET_HEADER, create_app
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Иван"},
+        "text": "привет"
+    }
+}
+
+
+@pytest.fixture
+async def webhook(workdir, monkeypatch):
+    monkeypatch.setattr(Config, "TELEGRAM_BOT_TOKEN", "123:token")
+    monkeypatch.setattr(Config, "WEBHOOK_SECRET", "secret-ok")
+    monkeypatch.setattr(Config, "SESSION_BACKEND", "memory")
+    monkeypatch.setattr(Config, "CACHE_BACKEND", "none")
+    monkeypatch.setattr(Config, "STORAGE_FLUSH_INTERVAL", 0)
+    api = create_app()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://bot") as client:
+        yield client
+
+
+async def test_update_requires_secret_token(webhook):
+    path = Config.WEBHOOK_PATH
+
+    assert (await webhook.post(path, json=UPDATE)).status_code == 403
+    wrong = {SECRET_HEADER: "wrong"}
+    assert (await webhook.post(path, json=UPDATE, headers=wrong)).status_code == 403
+
+    secret = {SECRET_HEADER: "secret-ok"}
+    assert (await webhook.post(path, content=b"not json", headers=secret)).status_code == 400
+    assert (await webhook.post(path, json=UPDATE, headers=secret)).status_code == 200
+
+
+async def test_probes_before_start(webhook):
+    assert (await webhook.get("/healthz")).json() == {"status": "ok"}
+    assert (await webhook.get("/readyz")).status_code == 503
+    assert (await webhook.get("/metrics")).status_code == 200